@@ -1,20 +1,27 @@
 import pandas as pd
 import os
 import json
-import time
 import logging
 import sys
+import threading
 from google import genai
 from datetime import datetime
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+from llm_cache import get_cache
+from rate_limiter import RateLimiter
 
 load_dotenv()
 
 API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL_NAME = "gemma-3-27b-it"
-OPTIMAL_RPM = 25
-BATCH_SIZE = 10
+# Requests are spread evenly over the minute by one token bucket shared by all workers
+OPTIMAL_RPM = int(os.getenv("GEMINI_RPM", "25"))
+NUM_WORKERS = int(os.getenv("GEMINI_WORKERS", "4"))
 MAX_RETRIES = 3
+QUOTA_WAIT = 70
 
 logging.basicConfig(
     level=logging.INFO,
@@ -33,18 +40,14 @@ class RobustCourseGenerator:
         
         self.client = genai.Client(api_key=api_key)
         self.model_name = MODEL_NAME
-        self.min_delay = 60.0 / OPTIMAL_RPM
-        self.last_request_time = 0
+        self.limiter = RateLimiter(OPTIMAL_RPM, burst=1)
+        self.cache = get_cache()
+        # Set on Ctrl+C: workers stop before their next request or retry instead of finishing the queue
+        self.stop = threading.Event()
 
     def enforce_rate_limit(self):
-        current_time = time.time()
-        elapsed = current_time - self.last_request_time
-        
-        if elapsed < self.min_delay:
-            sleep_time = self.min_delay - elapsed + 0.5
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        # Blocks this worker until the shared bucket has a request slot (False once stopped)
+        return self.limiter.acquire_sync(stop=self.stop)
 
     def _get_department_hint(self, department: str, course_code: str) -> str:
         if "Informatics" in department:
@@ -117,9 +120,16 @@ class RobustCourseGenerator:
         Output ONLY the course description text.
         """
         
+        # Only validated descriptions are stored, so a cached one is used as-is
+        cached = self.cache.get(self.model_name, prompt)
+        if cached is not None:
+            return cached
+        
         for retry in range(MAX_RETRIES):
+            # A stopped run returns nothing, so the course is not logged and is generated on resume
+            if self.stop.is_set() or not self.enforce_rate_limit():
+                return None
             try:
-                self.enforce_rate_limit()
                 
                 response = self.client.models.generate_content(
                     model=self.model_name,
@@ -128,7 +138,9 @@ class RobustCourseGenerator:
                 
                 desc = response.text.strip()
                 
+                self.limiter.record_success()
                 if self.validate_response(desc):
+                    self.cache.put(self.model_name, prompt, None, desc)
                     return desc
                 else:
                     logger.warning(f"Invalid response for {course_code}. Retry {retry+1}")
@@ -138,13 +150,38 @@ class RobustCourseGenerator:
                 logger.error(f"API error for {course_code}: {error_msg[:100]}")
                 
                 if "quota" in error_msg.lower() or "429" in error_msg:
-                    logger.warning("Quota limit hit. Waiting 70 seconds...")
-                    time.sleep(70)
+                    # Pauses every worker, not just this one
+                    delay = self.limiter.record_rate_limited(QUOTA_WAIT)
+                    logger.warning(f"Quota limit hit. Waiting {delay:.0f} seconds...")
                 else:
-                    time.sleep(5)
+                    self.stop.wait(5)
         
+        if self.stop.is_set():
+            return None
         return self.get_fallback_description(course_name, department)
 
+    def _generate_record(self, row_number, row):
+        code = str(row['Course_Code']).strip()
+        name = str(row['Course_Name']).strip()
+        english = str(row.get('Taught_in_English', 'false')).lower() == 'true'
+        dept = str(row.get('Department', 'General')).strip()
+        
+        desc = self.generate_course_description(name, code, english, dept)
+        if desc is None:
+            return None
+        
+        return {
+            "id": str(row_number),
+            "code": code,
+            "name": name,
+            "description": desc,
+            "taught_in_english": english,
+            "department": dept,
+            "credits": 3,
+            "level": 1,
+            "generated_at": datetime.now().isoformat()
+        }
+
     def process_courses(self, input_file: str, output_file: str):
         if not os.path.exists(input_file):
             logger.error(f"Input file not found at: {input_file}")
@@ -158,95 +195,108 @@ class RobustCourseGenerator:
             if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir)
             
-            results = []
-            progress_file = output_file.replace('.json', '_progress.json')
+            # One JSON line per finished course; the final JSON is rebuilt from it
+            log_file = output_file.replace('.json', '_log.jsonl')
+            self._import_progress(output_file.replace('.json', '_progress.json'), log_file)
             
-            # Resume Logic
-            if os.path.exists(progress_file):
-                try:
-                    with open(progress_file, 'r', encoding='utf-8') as f:
-                        progress_data = json.load(f)
-                        results = progress_data.get('courses', [])
-                        logger.info(f"Resumed {len(results)} previously processed courses")
-                except Exception as e:
-                    logger.warning(f"Could not load progress: {e}")
+            # Resume Logic: a row is done when the log has its id with the same course code
+            done = {(c['id'], c['code']) for c in load_generation_log(log_file)}
+            if done:
+                logger.info(f"Resumed {len(done)} previously processed courses")
             
-            processed_codes = {c.get('code') for c in results if c.get('code')}
-            total_to_process = len(df)
+            rows = df.to_dict('records')
+            total_to_process = len(rows)
+            pending = [(idx + 1, row) for idx, row in enumerate(rows)
+                       if (str(idx + 1), str(row['Course_Code']).strip()) not in done]
+            logger.info(f"{len(pending)} courses to generate with {NUM_WORKERS} workers at {OPTIMAL_RPM} RPM")
             
-            for idx, row in df.iterrows():
-                try:
-                    code = str(row['Course_Code']).strip()
-                    
-                    if code in processed_codes:
-                        continue
-                    
-                    name = str(row['Course_Name']).strip()
-                    english = str(row.get('Taught_in_English', 'false')).lower() == 'true'
-                    dept = str(row.get('Department', 'General')).strip()
-                    
-                    logger.info(f"[{idx+1}/{total_to_process}] Processing {code}")
-                    
-                    desc = self.generate_course_description(name, code, english, dept)
-                    
-                    course_data = {
-                        "id": str(idx + 1),
-                        "code": code,
-                        "name": name,
-                        "description": desc,
-                        "taught_in_english": english,
-                        "department": dept,
-                        "credits": 3,
-                        "level": 1,
-                        "generated_at": datetime.now().isoformat()
-                    }
-                    results.append(course_data)
-                    
-                    if len(results) % BATCH_SIZE == 0:
-                        self._save_with_progress(results, output_file, progress_file, idx)
-                        logger.info(f"Checkpoint saved: {len(results)} courses")
+            executor = ThreadPoolExecutor(max_workers=NUM_WORKERS)
+            try:
+                with open_generation_log(log_file) as log:
+                    futures = {executor.submit(self._generate_record, number, row): number for number, row in pending}
+                    for finished, future in enumerate(as_completed(futures), 1):
+                        try:
+                            course_data = future.result()
+                        except Exception as e:
+                            logger.error(f"Error processing row {futures[future] - 1}: {e}")
+                            continue
+                        if course_data is None:
+                            continue
                         
-                except KeyboardInterrupt:
-                    logger.warning("Interrupted by user (Ctrl+C). Saving progress...")
-                    self._save_with_progress(results, output_file, progress_file, idx)
-                    logger.info(f"Progress saved. Processed {len(results)} courses.")
-                    sys.exit(0)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing row {idx}: {e}")
-                    continue
+                        # Durable per-course record: a restart skips exactly these
+                        log.write(json.dumps(course_data, ensure_ascii=False) + '\n')
+                        log.flush()
+                        os.fsync(log.fileno())
+                        logger.info(f"[{finished}/{len(pending)}] Generated {course_data['code']} "
+                                    f"(row {course_data['id']}/{total_to_process})")
+            except KeyboardInterrupt:
+                logger.warning("Interrupted by user (Ctrl+C). Finished courses are in the log.")
+                # Workers see the event before their next request or retry, so only in-flight calls are waited for
+                self.stop.set()
+                executor.shutdown(wait=True, cancel_futures=True)
+                sys.exit(130)
+            executor.shutdown()
 
             # Final Save
-            self._save_with_progress(results, output_file, progress_file, len(df)-1, final=True)
+            results = self._rebuild_output(log_file, output_file)
             logger.info(f"Completed! Generated {len(results)} course descriptions.")
             return True
             
-        except KeyboardInterrupt:
-            logger.warning("Interrupted by user (Ctrl+C). Saving progress...")
-            if 'results' in locals() and results:
-                self._save_with_progress(results, output_file, progress_file, 0)
-            sys.exit(0)
         except Exception as e:
             logger.error(f"Fatal error: {e}")
             return False
 
-    def _save_with_progress(self, data, output_file, progress_file, last_index, final=False):
+    def _import_progress(self, progress_file, log_file):
+        """Moves courses from an old-style _progress.json checkpoint into the log"""
+        if not os.path.exists(progress_file):
+            return
         try:
-            if final:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-                if os.path.exists(progress_file):
-                    os.remove(progress_file)
-            else:
-                progress_data = {
-                    'courses': data,
-                    'last_index': last_index,
-                    'timestamp': datetime.now().isoformat()
-                }
-                with open(progress_file, 'w', encoding='utf-8') as f:
-                    json.dump(progress_data, f, indent=2, ensure_ascii=False)
+            with open(progress_file, 'r', encoding='utf-8') as f:
+                courses = json.load(f).get('courses', [])
+            with open_generation_log(log_file) as log:
+                for course_data in courses:
+                    log.write(json.dumps(course_data, ensure_ascii=False) + '\n')
+            os.remove(progress_file)
+            logger.info(f"Imported {len(courses)} courses from {progress_file}")
         except Exception as e:
-            logger.error(f"Error saving data: {e}")
+            logger.warning(f"Could not load progress: {e}")
+
+    def _rebuild_output(self, log_file, output_file):
+        """Writes the final JSON, in input order, from the generation log"""
+        by_id = {c['id']: c for c in load_generation_log(log_file)}
+        results = sorted(by_id.values(), key=lambda c: int(c['id']))
+        
+        tmp_file = output_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, output_file)
+        return results
+
+def open_generation_log(path):
+    """Opens the log for appending, ending a line torn by a crash so the next record starts clean"""
+    # Checked in binary mode: text-mode seek offsets are opaque, and a torn line may end mid-character
+    with open(path, 'ab+') as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+    return open(path, 'a', encoding='utf-8')
+
+def load_generation_log(path):
+    """Course records from the JSONL log; a line torn by a crash is skipped"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    # errors='replace': a line torn inside a multi-byte character then fails json.loads and is skipped
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and 'id' in record and 'code' in record:
+                records.append(record)
+    return records
 
 def main():
     if not API_KEY or "YOUR_" in API_KEY:
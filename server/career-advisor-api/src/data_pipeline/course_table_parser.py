@@ -0,0 +1,148 @@
+import os
+import re
+import sys
+import time
+import glob
+import warnings
+from collections import Counter
+from lxml import etree
+
+# Purpose-built parser for the Table1 course listings saved by yzucurriculumscrapping.py.
+# Every page has the same layout:
+#   <tr class="title_line"> header with the 7 column names
+#   <tr> one course: NO (rowspan=2), code+class, department & year, name, type, timetable, instructor
+#   <tr> optional "Selection message" cell (colspan=6) belonging to the course above
+# Rows are streamed with lxml.iterparse and turned into records without building a DataFrame.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RAW_HTML_DIR = os.path.join(SCRIPT_DIR, '..', '..', 'data', 'Raw', 'raw_html')
+
+TABLE_COLUMNS = [
+    'NO', 'Course ID and Class', 'Department & Year Available', 'Course Name',
+    'Type', 'Timetable & Classroom', 'Instructor'
+]
+# The last three stay last: cleaner.py maps them by position
+RECORD_FIELDS = TABLE_COLUMNS + ['Selection_Message', 'Semester', 'Department_ID_Name', 'File_Source_ID']
+# Bump when the records of a page change; html_to_csv.py reparses shards from other versions
+PARSER_VERSION = 2
+
+SELECTION_PREFIX = 'Selection message'
+# Same whitespace handling as pd.read_html, so cell text is unchanged for the cleaner
+WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+
+def cell_text(td):
+    """Text of a cell with <br> as a line break and whitespace runs collapsed"""
+    for br in td.iter('br'):
+        br.tail = "\n" + (br.tail or "")
+    return WHITESPACE.sub(" ", "".join(td.itertext()).strip())
+
+def department_code(filename):
+    """
+    The DDL_Dept value from a filename like '113F_304304DepartmentofComputer...html'
+    or '113F_A11A11SchoolofNursing...html': the scraper writes the value followed by
+    the option text, which starts with the same code.
+    """
+    name = filename.split('_', 1)[1] if '_' in filename else filename
+    for length in range(1, len(name) // 2 + 1):
+        if name[:length] == name[length:2 * length] and not name[2 * length:2 * length + 1].isdigit():
+            return name[:length]
+    match = re.match(r"[A-Za-z]?\d+", name)
+    return match.group(0) if match else ''
+
+def department_name(program_texts):
+    """Most common 'Department & Year Available' value on the page, without the year"""
+    names = [text.rsplit(',', 1)[0].strip() for text in program_texts if text]
+    return Counter(names).most_common(1)[0][0] if names else ''
+
+def iter_table_rows(source):
+    """Yields the list of cell texts of every <tr> of the page, in order"""
+    for _, tr in etree.iterparse(source, events=('end',), tag='tr', html=True, encoding='utf-8'):
+        if tr.get('class') == 'title_line':
+            cells = None
+        else:
+            cells = [(td.get('colspan'), cell_text(td)) for td in tr.findall('td')]
+        tr.clear()
+        if cells is not None:
+            yield cells
+
+def parse_course_records(source, filename):
+    """
+    Returns one record (dict with RECORD_FIELDS) per course on the page, with its
+    selection message attached and the semester and department filled in.
+    source is a path or a binary file object; filename is the name the scraper saved it as.
+    """
+    records = []
+
+    for cells in iter_table_rows(source):
+        if len(cells) == 1 and cells[0][1].startswith(SELECTION_PREFIX):
+            if records:
+                records[-1]['Selection_Message'] = cells[0][1]
+            continue
+        if len(cells) != len(TABLE_COLUMNS):
+            continue
+
+        # Empty cells become None, as read_html's NaN
+        record = dict(zip(TABLE_COLUMNS, (text or None for _, text in cells)))
+        if not record['NO']:
+            continue
+        record['NO'] = int(record['NO']) if record['NO'].isdigit() else record['NO']
+        record['Selection_Message'] = None
+        records.append(record)
+
+    semester = filename.split('_')[0]
+    dept = f"{department_code(filename)} {department_name(r['Department & Year Available'] for r in records)}".strip()
+    for record in records:
+        record['Semester'] = semester
+        record['Department_ID_Name'] = dept
+        record['File_Source_ID'] = os.path.splitext(filename)[0]
+    return records
+
+def parse_course_file(filepath):
+    return parse_course_records(filepath, os.path.basename(filepath))
+
+def benchmark(html_dir=RAW_HTML_DIR, repeats=3):
+    """Times this parser against the pd.read_html path of html_to_csv.py on every raw file"""
+    from html_to_csv import parse_html_table_read_html
+    warnings.filterwarnings("ignore")
+
+    html_files = sorted(glob.glob(os.path.join(html_dir, '*.html')))
+    contents = []
+    for path in html_files:
+        with open(path, 'r', encoding='utf-8') as f:
+            contents.append((os.path.basename(path), f.read()))
+
+    def read_html_path():
+        rows = 0
+        for filename, content in contents:
+            try:
+                df = parse_html_table_read_html(filename, content)
+            except Exception:
+                continue
+            # Selection messages come out of read_html as rows of their own
+            rows += int((~df.iloc[:, 1].astype(str).str.startswith(SELECTION_PREFIX)).sum())
+        return rows
+
+    def streaming_path():
+        return sum(len(parse_course_file(path)) for path in html_files)
+
+    print(f"Benchmarking on {len(html_files)} files ({sum(len(c) for _, c in contents) / 1e6:.1f} MB)...")
+    results = {}
+    for label, fn in [("pd.read_html", read_html_path), ("lxml streaming", streaming_path)]:
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            rows = fn()
+            best = min(best, time.perf_counter() - start)
+        results[label] = (rows, best)
+        print(f"   {label:15s} {rows} course rows in {best:.3f}s ({len(html_files) / best:.0f} files/s)")
+
+    (rows_a, time_a), (rows_b, time_b) = results.values()
+    print(f"Course rows match: {rows_a == rows_b}. Speedup: {time_a / time_b:.1f}x")
+    return results
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] != '--benchmark':
+        for record in parse_course_file(sys.argv[1])[:5]:
+            print(record)
+    else:
+        benchmark()
@@ -1,6 +1,29 @@
 import pandas as pd
 import os
-import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+from table_io import read_table, write_table
+
+ENGLISH_MARKER = 'Teaching in English'
+
+def text_column(series):
+    """Stripped string values with NaN as empty"""
+    return series.astype(object).where(series.notna(), '').astype(str).str.strip()
+
+def english_taught_mask(df):
+    """True for rows where any text column mentions 'Teaching in English', in one vectorized pass"""
+    text_columns = df.select_dtypes(include=['object', 'string', 'category']).columns
+    mask = pd.Series(False, index=df.index)
+    for col in text_columns:
+        mask |= df[col].str.contains(ENGLISH_MARKER, regex=False, na=False)
+    return mask
+
+def clean_course_titles(titles):
+    """Course names without the '*Teaching in English*' and other '*' program tags"""
+    titles = titles.str.replace(r'\*Teaching in English\*', '', regex=True)
+    titles = titles.str.replace(r'\s*\*\s*', ' ', regex=True).str.strip()
+    return titles.str.replace(r'\s+', ' ', regex=True)
 
 def clean_course_data():
     """
@@ -20,52 +43,32 @@ def clean_course_data():
     
     try:
         # Read the CSV file
-        df = pd.read_csv(input_file)
+        df = read_table(input_file)
         print(f"📊 Original data shape: {df.shape}")
         
-        # Create cleaned data with ALL necessary information for mapping
-        cleaned_data = []
-        
-        for index, row in df.iterrows():
-            course_title_en = str(row['Course_Title_EN']).strip() if pd.notna(row['Course_Title_EN']) else ""
-            course_code = str(row['Course_Code']).strip() if pd.notna(row['Course_Code']) else ""
-            section = str(row['Section']).strip() if pd.notna(row['Section']) else ""
-            
-            # If English title is empty, create meaningful placeholder
-            if not course_title_en or course_title_en == 'nan':
-                chinese_title = str(row['Course_Title_CN']).strip() if pd.notna(row['Course_Title_CN']) else ""
-                if chinese_title and chinese_title != 'nan':
-                    course_title_en = f"[Chinese] {chinese_title}"
-                else:
-                    course_title_en = f"Course_{course_code}_{section}"
-            
-            # Check if course is taught in English
-            teaching_in_english = False
-            for col in df.columns:
-                if pd.notna(row[col]) and 'Teaching in English' in str(row[col]):
-                    teaching_in_english = True
-                    break
-            
-            # Clean the course name (but keep original for reference)
-            course_title_clean = re.sub(r'\*Teaching in English\*', '', course_title_en)
-            course_title_clean = re.sub(r'\s*\*\s*', ' ', course_title_clean).strip()
-            course_title_clean = re.sub(r'\s+', ' ', course_title_clean)
-            
-            # Add to cleaned data - KEEP ALL MAPPING INFORMATION
-            cleaned_data.append({
-                'Course_Code': course_code,
-                'Section': section,
-                'Course_Name_EN': course_title_clean,
-                'Original_Course_Name': course_title_en,  # Keep original for reference
-                'Teaching_in_English': teaching_in_english,
-                'Program_Year': row['Program_and_Year'] if pd.notna(row['Program_and_Year']) else '',
-                'Course_Type': row['Course_Type'] if pd.notna(row['Course_Type']) else '',
-                'Instructor_EN': row['Instructor_EN'] if pd.notna(row['Instructor_EN']) else '',
-                'Original_Index': index  # Keep for debugging
-            })
-        
-        # Create final dataframe
-        final_df = pd.DataFrame(cleaned_data)
+        course_code = text_column(df['Course_Code'])
+        section = text_column(df['Section'])
+        course_title_en = text_column(df['Course_Title_EN'])
+        chinese_title = text_column(df['Course_Title_CN'])
+        
+        # If English title is empty, create meaningful placeholder
+        missing_title = (course_title_en == '') | (course_title_en == 'nan')
+        has_chinese = (chinese_title != '') & (chinese_title != 'nan')
+        placeholder = ("[Chinese] " + chinese_title).where(has_chinese, "Course_" + course_code + "_" + section)
+        course_title_en = course_title_en.mask(missing_title, placeholder)
+        
+        # Create final dataframe - KEEP ALL MAPPING INFORMATION
+        final_df = pd.DataFrame({
+            'Course_Code': course_code,
+            'Section': section,
+            'Course_Name_EN': clean_course_titles(course_title_en),
+            'Original_Course_Name': course_title_en,  # Keep original for reference
+            'Teaching_in_English': english_taught_mask(df),
+            'Program_Year': df['Program_and_Year'].astype(object).fillna('').astype('category'),
+            'Course_Type': df['Course_Type'].astype(object).fillna('').astype('category'),
+            'Instructor_EN': df['Instructor_EN'].astype(object).fillna(''),
+            'Original_Index': df.index  # Keep for debugging
+        })
         
         print(f"📊 After processing: {len(final_df)} rows")
         print(f"🌍 Courses taught in English: {final_df['Teaching_in_English'].sum()}")
@@ -73,12 +76,12 @@ def clean_course_data():
         
         # Save the data
         try:
-            final_df.to_csv(output_file, index=False, encoding='utf-8-sig')
+            write_table(final_df, output_file, encoding='utf-8-sig')
             print(f"💾 Output saved to: {output_file}")
         except PermissionError:
             alt_output_file = os.path.join(project_root, "data", "Processed", "course_data", "courses_with_codes.csv")
             print(f"⚠️  Permission denied, using alternative: {alt_output_file}")
-            final_df.to_csv(alt_output_file, index=False, encoding='utf-8-sig')
+            write_table(final_df, alt_output_file, encoding='utf-8-sig')
             output_file = alt_output_file
         
         # Display statistics
@@ -110,39 +113,30 @@ def create_mapping_summary():
     output_file = os.path.join(project_root, "data", "Processed", "course_data", "course_mapping_summary.csv")
     
     try:
-        df = pd.read_csv(input_file)
-        
-        # Create mapping summary (one row per unique course code)
-        mapping_data = []
-        
-        for course_code in df['Course_Code'].unique():
-            if pd.notna(course_code):
-                course_rows = df[df['Course_Code'] == course_code]
-                first_row = course_rows.iloc[0]
-                
-                course_title_en = str(first_row['Course_Title_EN']).strip() if pd.notna(first_row['Course_Title_EN']) else ""
-                
-                # Clean course name
-                if course_title_en and course_title_en != 'nan':
-                    course_clean = re.sub(r'\*Teaching in English\*', '', course_title_en)
-                    course_clean = re.sub(r'\s*\*\s*', ' ', course_clean).strip()
-                    course_clean = re.sub(r'\s+', ' ', course_clean)
-                else:
-                    course_clean = f"Course_{course_code}"
-                
-                # Check if any section is taught in English
-                teaching_english = any(
-                    any('Teaching in English' in str(row[col]) for col in df.columns if pd.notna(row[col]))
-                    for _, row in course_rows.iterrows()
-                )
-                
-                mapping_data.append({
-                    'Course_Code': course_code,
-                    'Course_Name': course_clean,
-                    'Taught_in_English': teaching_english,
-                    'Total_Sections': len(course_rows),
-                    'Sections': ', '.join([str(s) for s in course_rows['Section'].unique() if pd.notna(s)])
-                })
+        df = read_table(input_file)
+        
+        # Create mapping summary (one row per unique course code) in one groupby pass
+        df = df[df['Course_Code'].notna()].assign(Taught_in_English=english_taught_mask(df))
+        courses = df.groupby('Course_Code', sort=False)
+        
+        first_rows = df.drop_duplicates('Course_Code').set_index('Course_Code')
+        course_title_en = text_column(first_rows['Course_Title_EN'])
+        has_title = (course_title_en != '') & (course_title_en != 'nan')
+        course_names = clean_course_titles(course_title_en).where(has_title, "Course_" + first_rows.index.astype(str))
+        
+        sections = (df.dropna(subset=['Section'])
+                    .drop_duplicates(['Course_Code', 'Section'])
+                    .assign(Section=lambda d: d['Section'].astype(str))
+                    .groupby('Course_Code', sort=False)['Section'].agg(', '.join))
+        
+        mapping_data = pd.DataFrame({
+            'Course_Code': first_rows.index,
+            'Course_Name': course_names.values,
+            # Any section taught in English
+            'Taught_in_English': courses['Taught_in_English'].any().reindex(first_rows.index).values,
+            'Total_Sections': courses.size().reindex(first_rows.index).values,
+            'Sections': sections.reindex(first_rows.index, fill_value='').values
+        })
         
         mapping_df = pd.DataFrame(mapping_data).sort_values('Course_Code')
         
@@ -150,7 +144,7 @@ def create_mapping_summary():
         print(f"   Unique course codes: {len(mapping_df)}")
         print(f"   English-taught courses: {mapping_df['Taught_in_English'].sum()}")
         
-        mapping_df.to_csv(output_file, index=False, encoding='utf-8-sig')
+        write_table(mapping_df, output_file, encoding='utf-8-sig')
         print(f"💾 Mapping summary saved to: {output_file}")
         
         return mapping_df
@@ -1,10 +1,16 @@
 import pandas as pd
-from io import StringIO
+from io import StringIO, BytesIO
 from bs4 import BeautifulSoup # Keep for debugging suggestion
 import os
 import re
+import sys
+import csv
+import json
+import hashlib
 import warnings
 import glob
+from course_table_parser import parse_course_records, RECORD_FIELDS, PARSER_VERSION
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Ignore specific pandas/bs4 warnings
 warnings.filterwarnings("ignore", "You provided Unicode markup but also provided a value for from_encoding")
@@ -14,6 +20,16 @@ warnings.filterwarnings("ignore", "Passing literal html to 'read_html' is deprec
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 RAW_HTML_DIR = os.path.join(SCRIPT_DIR, '..', '..', 'data', 'Raw', 'raw_html')
 PROCESSED_CSV_DIR = os.path.join(SCRIPT_DIR, '..', '..', 'data', 'Processed', 'course_data')
+OUTPUT_FILENAME = 'all_course_listings.csv'
+
+# --- Parallel mode (python html_to_csv.py --parallel [--workers N]) ---
+# Every HTML file is parsed in a worker process into its own CSV shard; the manifest records
+# each file's mtime, size and hash so re-runs only parse new or changed files. Entries also
+# record the parser version and columns: shards written by another parser are reparsed, since
+# cleaner.py reads the merged CSV by column position.
+SHARD_DIR = os.path.join(PROCESSED_CSV_DIR, 'html_shards')
+MANIFEST_FILE = os.path.join(SHARD_DIR, 'manifest.json')
+MERGE_CHUNK_ROWS = 5000
 
 def read_html_content(filepath):
     """Reads HTML content with UTF-8 encoding."""
@@ -35,6 +51,67 @@ def print_processing_summary(total_files_found, files_with_data, merged_rows):
     print(f"Total course rows merged:         {merged_rows}")
     print("==============================================")
 
+def parse_html_table(filename, html_content):
+    """
+    Extracts the course records of one saved page (see course_table_parser.py), one row
+    per course with its selection message, semester and department. Raises ValueError
+    when the page has no courses.
+    """
+    records = parse_course_records(BytesIO(html_content.encode('utf-8')), filename)
+    if not records:
+        raise ValueError("Table contains 0 course rows.")
+    return pd.DataFrame.from_records(records, columns=RECORD_FIELDS)
+
+def parse_html_table_read_html(filename, html_content):
+    """
+    Previous extraction through pd.read_html, kept for course_table_parser.benchmark().
+    Raises ValueError when the page has no usable rows.
+    """
+    # 1. Extract semester and department codes from filename
+    parts = filename.split('_')
+    # EX: 113S
+    ym_code = parts[0]
+    # EX: 305305Department... - Heuristic to get the code part before 'Department'
+    dept_part = parts[1].split('Department')[0] 
+    dept_code = dept_part.split('(')[0].replace('.html', '').replace('.txt', '')
+    
+    # 2. Robust table extraction using StringIO and multiple parsers (lxml first, then default)
+    tables = pd.read_html(StringIO(html_content), flavor='lxml')
+    
+    if not tables:
+        # Retry with default parser if 'lxml' fails
+        tables = pd.read_html(StringIO(html_content))
+        
+    if not tables:
+        # Raise error if no tables found
+        raise ValueError("No tables found matching pattern '.+'")
+        
+    # Get the main table (first one found)
+    df = tables[0]
+    
+    # 3. Clean and process the extracted DataFrame
+    
+    # Add metadata columns
+    df['Semester_Code'] = ym_code
+    df['Department_Code'] = dept_code
+    
+    # Set the first row as column headers and remove it
+    # Ensure the table is large enough to contain headers and data
+    if len(df) > 1:
+        df.columns = df.iloc[0]
+        df = df[1:].copy()
+    else:
+        # Skip if the table is too short to contain a header row and data rows
+        raise ValueError("Table is too short (<= 1 row) to extract meaningful data.")
+    
+    # Verify data is valid by dropping rows where the first column (Course ID/No.) is missing
+    df = df.dropna(subset=[df.columns[0]]).reset_index(drop=True)
+
+    # Check if any meaningful rows remain after cleaning
+    if len(df) == 0:
+        raise ValueError("Table is valid but contains 0 meaningful data rows after cleaning.")
+    return df
+
 def convert_html_to_csv():
     
     # Create if it doesn't exists
@@ -43,7 +120,7 @@ def convert_html_to_csv():
         print(f"Created: {PROCESSED_CSV_DIR}")
 
     # Find all raw html
-    html_files = glob.glob(os.path.join(RAW_HTML_DIR, '*.html'))
+    html_files = sorted(glob.glob(os.path.join(RAW_HTML_DIR, '*.html')))
     total_files_found = len(html_files) # Total files to iterate over
     
     if not html_files:
@@ -64,53 +141,10 @@ def convert_html_to_csv():
             continue
 
         try:
-            # 1. Extract semester and department codes from filename
-            parts = filename.split('_')
-            # EX: 113S
-            ym_code = parts[0]
-            # EX: 305305Department... - Heuristic to get the code part before 'Department'
-            dept_part = parts[1].split('Department')[0] 
-            dept_code = dept_part.split('(')[0].replace('.html', '').replace('.txt', '')
-            
-            # 2. Robust table extraction using StringIO and multiple parsers (lxml first, then default)
-            tables = pd.read_html(StringIO(html_content), flavor='lxml')
-            
-            if not tables:
-                # Retry with default parser if 'lxml' fails
-                tables = pd.read_html(StringIO(html_content))
-                
-            if not tables:
-                # Raise error if no tables found
-                raise ValueError("No tables found matching pattern '.+'")
-                
-            # Get the main table (first one found)
-            df = tables[0]
-            
-            # 3. Clean and process the extracted DataFrame
-            
-            # Add metadata columns
-            df['Semester_Code'] = ym_code
-            df['Department_Code'] = dept_code
-            
-            # Set the first row as column headers and remove it
-            # Ensure the table is large enough to contain headers and data
-            if len(df) > 1:
-                df.columns = df.iloc[0]
-                df = df[1:].copy()
-            else:
-                # Skip if the table is too short to contain a header row and data rows
-                raise ValueError("Table is too short (<= 1 row) to extract meaningful data.")
-            
-            # Verify data is valid by dropping rows where the first column (Course ID/No.) is missing
-            df = df.dropna(subset=[df.columns[0]]).reset_index(drop=True)
-
-            # Check if any meaningful rows remain after cleaning
-            if len(df) > 0:
-                print(f"   Extracted {len(df)} rows.")
-                all_data.append(df)
-                files_with_data += 1 # Increment only on successful data extraction
-            else:
-                raise ValueError("Table is valid but contains 0 meaningful data rows after cleaning.")
+            df = parse_html_table(filename, html_content)
+            print(f"   Extracted {len(df)} rows.")
+            all_data.append(df)
+            files_with_data += 1 # Increment only on successful data extraction
 
         except ValueError as e:
             # Handle table extraction/cleaning errors
@@ -132,7 +166,7 @@ def convert_html_to_csv():
         total_merged_rows = len(final_df)
         
         # Save merged CSV
-        output_filepath = os.path.join(PROCESSED_CSV_DIR, 'all_course_listings.csv')
+        output_filepath = os.path.join(PROCESSED_CSV_DIR, OUTPUT_FILENAME)
         final_df.to_csv(output_filepath, index=False, encoding='utf-8')
         print(f"\nSuccessfully saved {total_merged_rows} rows into: {output_filepath}")
     else:
@@ -141,6 +175,143 @@ def convert_html_to_csv():
     # Print the summary of all files processed
     print_processing_summary(total_files_found, files_with_data, total_merged_rows)
 
+def file_sha1(filepath):
+    with open(filepath, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def load_manifest():
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def save_manifest(manifest):
+    tmp_file = MANIFEST_FILE + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_file, MANIFEST_FILE)
+
+def parse_file_to_shard(filepath):
+    """
+    Worker: parses one HTML file and writes its rows to a CSV shard.
+    Returns the manifest entry for the file.
+    """
+    filename = os.path.basename(filepath)
+    stat = os.stat(filepath)
+    entry = {"mtime": stat.st_mtime, "size": stat.st_size, "sha1": file_sha1(filepath),
+             "parser": PARSER_VERSION, "columns": RECORD_FIELDS,
+             "rows": 0, "shard": None, "error": None}
+
+    html_content = read_html_content(filepath)
+    if html_content is None:
+        entry["error"] = "unreadable file"
+        return filename, entry
+
+    try:
+        df = parse_html_table(filename, html_content)
+    except ValueError as e:
+        entry["error"] = f"Cannot read {filename}. Reason: {e}"
+        return filename, entry
+    except Exception as e:
+        entry["error"] = f"[CRITICAL ERROR] Failed to process {filename}: {e}"
+        return filename, entry
+
+    shard_name = os.path.splitext(filename)[0] + '.csv'
+    shard_path = os.path.join(SHARD_DIR, shard_name)
+    df.to_csv(shard_path + '.tmp', index=False, encoding='utf-8')
+    os.replace(shard_path + '.tmp', shard_path)
+    entry["rows"] = len(df)
+    entry["shard"] = shard_name
+    return filename, entry
+
+def is_unchanged(filepath, entry):
+    """Parsed by the current parser, with the same mtime and size or the same content after a touch"""
+    if entry is None or entry.get("parser") != PARSER_VERSION or entry.get("columns") != RECORD_FIELDS:
+        return False
+    stat = os.stat(filepath)
+    if entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+        return True
+    if entry["sha1"] == file_sha1(filepath):
+        entry["mtime"], entry["size"] = stat.st_mtime, stat.st_size
+        return True
+    return False
+
+def merge_shards(shard_paths, output_filepath):
+    """
+    Concatenates CSV shards into one file without loading them all at once.
+    Columns are the union of the shard headers in order of first appearance,
+    as pd.concat would produce.
+    """
+    columns = []
+    for shard_path in shard_paths:
+        with open(shard_path, 'r', encoding='utf-8', newline='') as f:
+            header = next(csv.reader(f), [])
+        columns.extend(col for col in header if col not in columns)
+
+    total_rows = 0
+    tmp_file = output_filepath + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8', newline='') as out:
+        pd.DataFrame(columns=columns).to_csv(out, index=False)
+        for shard_path in shard_paths:
+            for chunk in pd.read_csv(shard_path, dtype=str, keep_default_na=False,
+                                     chunksize=MERGE_CHUNK_ROWS, encoding='utf-8'):
+                chunk.reindex(columns=columns, fill_value='').to_csv(out, index=False, header=False)
+                total_rows += len(chunk)
+    os.replace(tmp_file, output_filepath)
+    return total_rows
+
+def convert_html_to_csv_parallel(workers=None):
+    """Parallel, incremental version of convert_html_to_csv() with the same output"""
+    os.makedirs(SHARD_DIR, exist_ok=True)
+
+    html_files = sorted(glob.glob(os.path.join(RAW_HTML_DIR, '*.html')))
+    if not html_files:
+        print("not found any HTML files in the raw directory.")
+        print_processing_summary(0, 0, 0)
+        return
+
+    manifest = load_manifest()
+    current = {os.path.basename(p) for p in html_files}
+    for filename in [f for f in manifest if f not in current]:
+        # The HTML file was removed, so its rows leave the merged CSV too
+        shard = manifest.pop(filename).get("shard")
+        if shard and os.path.exists(os.path.join(SHARD_DIR, shard)):
+            os.remove(os.path.join(SHARD_DIR, shard))
+
+    to_parse = [p for p in html_files if not is_unchanged(p, manifest.get(os.path.basename(p)))]
+    print(f"{len(html_files)} HTML files, {len(html_files) - len(to_parse)} unchanged, "
+          f"{len(to_parse)} to parse with {workers or os.cpu_count()} workers.")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(parse_file_to_shard, p) for p in to_parse]
+        for done, future in enumerate(as_completed(futures), start=1):
+            filename, entry = future.result()
+            old_shard = (manifest.get(filename) or {}).get("shard")
+            if old_shard and old_shard != entry["shard"] and os.path.exists(os.path.join(SHARD_DIR, old_shard)):
+                os.remove(os.path.join(SHARD_DIR, old_shard))
+            manifest[filename] = entry
+            status = entry["error"] or f"Extracted {entry['rows']} rows."
+            print(f"   [{done}/{len(to_parse)}] {filename}: {status}")
+            # Saved as results arrive, so an interrupted run keeps the files it finished
+            save_manifest(manifest)
+    save_manifest(manifest)
+
+    shard_paths = [os.path.join(SHARD_DIR, manifest[os.path.basename(p)]["shard"])
+                   for p in html_files if manifest[os.path.basename(p)]["shard"]]
+    total_merged_rows = 0
+    if shard_paths:
+        output_filepath = os.path.join(PROCESSED_CSV_DIR, OUTPUT_FILENAME)
+        total_merged_rows = merge_shards(shard_paths, output_filepath)
+        print(f"\nSuccessfully saved {total_merged_rows} rows into: {output_filepath}")
+    else:
+        print("\nError: No valid data frames were extracted and merged.")
+
+    print_processing_summary(len(html_files), len(shard_paths), total_merged_rows)
+
 
 if __name__ == "__main__":
-    convert_html_to_csv()
+    if '--parallel' in sys.argv:
+        workers = int(sys.argv[sys.argv.index('--workers') + 1]) if '--workers' in sys.argv else None
+        convert_html_to_csv_parallel(workers)
+    else:
+        convert_html_to_csv()
@@ -0,0 +1,149 @@
+import os
+import re
+import sys
+import time
+import html
+import threading
+from collections import deque
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from course_table_parser import department_code
+
+# --- CONFIGURATION ---
+# A local stand-in for the YZU course portal that replays the pages saved in raw_html, for
+# offline runs of the scraper (Selenium or plain HTTP form posts):
+#   python src/data_pipeline/mock_portal_server.py 8766
+#   YZU_PORTAL_URL=http://127.0.0.1:8766/cosSelect/index.aspx?D=G python src/data_pipeline/yzucurriculumscrapping.py --http --workers 4
+# It serves the same form as the real portal: DDL_YM, DDL_Dept and DDL_Degree post back on
+# change and Button1 returns the page with Table1.
+PORT = 8766
+LATENCY_SECONDS = 0.1
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RAW_HTML_DIR = os.path.join(SCRIPT_DIR, '..', '..', 'data', 'Raw', 'raw_html')
+
+# Filename semester prefix -> DDL_YM value
+SEMESTERS = {"113S": "113,2", "113F": "113,1"}
+# Degree option texts, as the scraper saves them without spaces
+DEGREES = ["Freshmen", "Sophomore", "Junior", "Senior", "First Year", "Second Year"]
+EMPTY_TABLE = '<table id="Table1" class="form1"><tbody><tr class="title_line"><td>NO</td></tr></tbody></table>'
+
+def load_catalog(html_dir=RAW_HTML_DIR):
+    """
+    Returns {"depts": {value: text}, "degrees": {(ym, dept): [degree text]},
+    "pages": {(ym, dept, degree): path}} from the saved filenames.
+    """
+    depts, degrees, pages = {}, {}, {}
+    for filename in sorted(os.listdir(html_dir)):
+        if not filename.endswith('.html') or '_' not in filename:
+            continue
+        prefix, rest = filename[:-len('.html')].split('_', 1)
+        ym = SEMESTERS.get(prefix)
+        degree = next((d for d in DEGREES if rest.endswith(d.replace(" ", ""))), None)
+        if ym is None or degree is None:
+            continue
+        dept = department_code(filename)
+        depts.setdefault(dept, rest[len(dept):-len(degree.replace(" ", ""))])
+        degrees.setdefault((ym, dept), []).append(degree)
+        pages[(ym, dept, degree)] = os.path.join(html_dir, filename)
+    return {"depts": depts, "degrees": degrees, "pages": pages}
+
+def degree_value(degree):
+    return str(DEGREES.index(degree) + 1)
+
+def render_select(name, options, selected):
+    items = "".join(
+        f'<option{" selected" if value == selected else ""} value="{html.escape(value)}">{html.escape(text)}</option>'
+        for value, text in options)
+    return f'<select name="{name}" id="{name}" onchange="this.form.submit()">{items}</select>'
+
+class MockPortalHandler(BaseHTTPRequestHandler):
+    catalog = None
+    window = deque()
+    lock = threading.Lock()
+    stats = {'pages': 0, 'tables': 0, 'max_per_minute': 0}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _record_request(self):
+        # Requests in the last minute, to check the scraper's rate limit from the server side
+        now = time.monotonic()
+        with self.lock:
+            self.window.append(now)
+            while now - self.window[0] > 60:
+                self.window.popleft()
+            self.stats['max_per_minute'] = max(self.stats['max_per_minute'], len(self.window))
+
+    def _send_html(self, status, body):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _render_form(self, ym, dept, degree, table=""):
+        depts = self.catalog["depts"]
+        degree_options = [("", "All")] + [(degree_value(d), d) for d in self.catalog["degrees"].get((ym, dept), [])]
+        return f"""<html><body>
+<form method="post" action="Index.aspx?Lang=EN" id="form1">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="mock-{html.escape(ym)}-{html.escape(dept)}" />
+{render_select("DDL_YM", [(v, v) for v in SEMESTERS.values()], ym)}
+{render_select("DDL_Dept", list(depts.items()), dept)}
+{render_select("DDL_Degree", degree_options, degree)}
+<input type="submit" name="Button1" value="Inquiry" id="Button1" />
+</form>
+{table}
+</body></html>"""
+
+    def do_GET(self):
+        self._record_request()
+        url = urlparse(self.path)
+        if url.path.lower() != '/cosselect/index.aspx':
+            self._send_html(404, "not found")
+            return
+        if parse_qs(url.query).get('Lang') != ['EN']:
+            self._send_html(200, '<html><body><a href="Index.aspx?Lang=EN">English</a></body></html>')
+            return
+        self.stats['pages'] += 1
+        self._send_html(200, self._render_form(next(iter(SEMESTERS.values())), next(iter(self.catalog["depts"])), ""))
+
+    def do_POST(self):
+        self._record_request()
+        length = int(self.headers.get('Content-Length', 0))
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode('utf-8'), keep_blank_values=True).items()}
+        ym, dept, degree = form.get('DDL_YM', ''), form.get('DDL_Dept', ''), form.get('DDL_Degree', '')
+        time.sleep(LATENCY_SECONDS)
+
+        table = ""
+        if 'Button1' in form:
+            self.stats['tables'] += 1
+            degree_text = DEGREES[int(degree) - 1] if degree.isdigit() and 0 < int(degree) <= len(DEGREES) else None
+            path = self.catalog["pages"].get((ym, dept, degree_text))
+            if path:
+                with open(path, 'r', encoding='utf-8') as f:
+                    table = f.read()
+            else:
+                table = EMPTY_TABLE
+        else:
+            self.stats['pages'] += 1
+        self._send_html(200, self._render_form(ym, dept, degree, table))
+
+def serve(port=PORT, html_dir=RAW_HTML_DIR):
+    MockPortalHandler.catalog = load_catalog(html_dir)
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockPortalHandler)
+    print(f"Mock portal with {len(MockPortalHandler.catalog['pages'])} pages listening on "
+          f"http://127.0.0.1:{port}/cosSelect/index.aspx?D=G")
+    return server
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    server = serve(port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        stats = MockPortalHandler.stats
+        print(f"\nServed {stats['pages']} form pages and {stats['tables']} tables, "
+              f"at most {stats['max_per_minute']} requests in a minute.")
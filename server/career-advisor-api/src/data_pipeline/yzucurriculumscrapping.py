@@ -1,14 +1,25 @@
 import os
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
+import re
+import sys
+import html
+import json
+import queue
+import hashlib
+import threading
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
 import time
 
-#Entry URL:
-ENTRY_URL= "https://portalfun.yzu.edu.tw/cosSelect/index.aspx?D=G"
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+from rate_limiter import RateLimiter
+
+#Entry URL (point it at mock_portal_server.py to scrape offline):
+ENTRY_URL= os.getenv("YZU_PORTAL_URL", "https://portalfun.yzu.edu.tw/cosSelect/index.aspx?D=G")
 #It's enough to scrape last year spring and fall semester:
 TARGET_YMS = ["113,2","113,1"]
+#Be polite: every session together stays under this many portal requests per minute
+REQUESTS_PER_MINUTE = int(os.getenv("YZU_PORTAL_RPM", "60"))
 #Save to raw_html folder, I assume that the script is run from the 'data_pipeline':
 
 ##Full directory of this script which works universally:
@@ -17,6 +28,8 @@ FULLPATH_DIR=os.path.abspath(__file__)
 SCRIPT_DIR=os.path.dirname(FULLPATH_DIR)
 ##moving back [..]("career-advisor-ai")<-[..]("sourcecode")<-[SCRIPT_DIR]("data_pipeline") then ->data->Raw->raw_html
 RAW_HTML_DIR=os.path.join(SCRIPT_DIR,'..','..','data','Raw','raw_html')
+#sha1 of every saved page, so a page whose content did not change is not rewritten
+MANIFEST_FILE=os.path.join(SCRIPT_DIR,'..','..','data','Raw','raw_html_manifest.json')
 
 #I wanna convert 1132 to S,1131 to F:
 def get_semester_code(ym_value):
@@ -26,132 +39,293 @@ def get_semester_code(ym_value):
         return "F"
     return "X"
 
-def scrape_and_save_to_html():
-    #Create the raw HTML directory if it doesn't exist
-    if not os.path.exists(RAW_HTML_DIR):
-        os.makedirs(RAW_HTML_DIR)
-    #Set up the Chrome WebDriver
-    driver = webdriver.Chrome()
-    wait = WebDriverWait(driver, 30)
-    try:
+def build_filename(ym_val, dept_val, dept_name, degree_name):
+    ym_prefix = ym_val.split(',')[0]
+    semester_code = get_semester_code(ym_val)
+    sanitized_dept_name = dept_name.replace(" ", "").replace("/", "")
+    sanitized_degree_name = degree_name.replace(" ", "").replace("/", "")
+    return f"{ym_prefix}{semester_code}_{dept_val}{sanitized_dept_name}{sanitized_degree_name}.html"
+
+class SeleniumFetcher:
+    """One Chrome session clicking through the portal form"""
+
+    def __init__(self, entry_url=ENTRY_URL, limiter=None):
+        # Only this fetcher needs selenium; --http runs without it
+        from selenium import webdriver
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait, Select
+        from selenium.webdriver.support import expected_conditions as EC
+        self.By, self.Select, self.EC = By, Select, EC
+        self.entry_url = entry_url
+        self.limiter = limiter
+        self.driver = webdriver.Chrome()
+        self.wait = WebDriverWait(self.driver, 30)
+
+    def _throttle(self):
+        if self.limiter is not None:
+            self.limiter.acquire_sync()
+
+    def _select(self, element_id, value):
+        dropdown = self.Select(self.wait.until(self.EC.element_to_be_clickable((self.By.ID, element_id))))
+        # Find the option with the correct stripped value, then use the original one
+        for option in dropdown.options:
+            if option.get_attribute("value").strip() == value:
+                self._throttle()
+                dropdown.select_by_value(option.get_attribute("value"))
+                return True
+        return False
+
+    def _options(self, element_id):
+        dropdown = self.Select(self.wait.until(self.EC.visibility_of_element_located((self.By.ID, element_id))))
+        return {option.get_attribute("value").strip(): option.text.strip() for option in dropdown.options}
+
+    def open(self):
         #Go to the entry page and click the English link once started
-        driver.get(ENTRY_URL)
-        print("clicking english ver")
-        english_link = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'a[href="Index.aspx?Lang=EN"]')))
+        self._throttle()
+        self.driver.get(self.entry_url)
+        english_link = self.wait.until(self.EC.element_to_be_clickable((self.By.CSS_SELECTOR, 'a[href="Index.aspx?Lang=EN"]')))
+        self._throttle()
         english_link.click()
-        # delay
-        time.sleep(2)
         #Wait for the dropdowns(DDL_YM,DDL_Dept)
-        ddl_ym_element = wait.until(EC.presence_of_element_located((By.ID, "DDL_YM")))
-        ddl_dept_element = wait.until(EC.presence_of_element_located((By.ID, "DDL_Dept")))
-        
-        #Convert to the selenium object
-        ddl_dept = Select(ddl_dept_element)
+        self.wait.until(self.EC.presence_of_element_located((self.By.ID, "DDL_YM")))
+        self.wait.until(self.EC.presence_of_element_located((self.By.ID, "DDL_Dept")))
+
+    def departments(self):
         #mapping codes to names
-        dept_map = {option.get_attribute("value").strip(): option.text.strip() for option in ddl_dept.options}
-        dept_values = list(dept_map.keys())
+        return self._options("DDL_Dept")
 
-        #Loop through 113,2 and 113,1:
-        for ym_val in TARGET_YMS:
-            for dept_val in dept_values:
-                print(f"Scraping for YM: {ym_val}, Dept: {dept_val}")
+    def degrees(self, ym_val, dept_val):
+        """Degree options for a semester and department, or None when one of them is not offered"""
+        # The DDL_Dept will postback and reload after the semester selection
+        if not self._select("DDL_YM", ym_val):
+            return None
+        if not self._select("DDL_Dept", dept_val):
+            return None
+        #The DDL_Degree will update after the department selection.
+        return self._options("DDL_Degree")
+
+    def fetch_table(self, ym_val, dept_val, degree_val):
+        if not self._select("DDL_Degree", degree_val):
+            return None
+        #click the Inquery button and only take the table
+        self._throttle()
+        self.wait.until(self.EC.element_to_be_clickable((self.By.ID, "Button1"))).click()
+        table_content = self.wait.until(self.EC.presence_of_element_located((self.By.ID, "Table1"))).get_attribute("outerHTML")
+        # Go back to the previous page to continue the loop
+        self.driver.back()
+        self.wait.until(self.EC.presence_of_element_located((self.By.ID, "DDL_YM")))
+        return table_content
+
+    def reset(self):
+        # Go back to the main page to reset the state after an error
+        self.driver.back()
+
+    def close(self):
+        self.driver.quit()
+
+class HttpFetcher:
+    """
+    Posts the portal form directly, without a browser: the page's hidden fields
+    (__VIEWSTATE and friends) are sent back with every selection, the way the
+    browser's postback does.
+    """
+
+    HIDDEN_INPUT = re.compile(r'<input[^>]*type="hidden"[^>]*>', re.I)
+    SELECT = re.compile(r'<select[^>]*name="(?P<name>[^"]+)"[^>]*>(?P<body>.*?)</select>', re.S | re.I)
+    OPTION = re.compile(r'<option(?P<attrs>[^>]*)value="(?P<value>[^"]*)"[^>]*>(?P<text>.*?)</option>', re.S | re.I)
+    TABLE = re.compile(r'<table id="Table1".*?</table>', re.S)
+
+    def __init__(self, entry_url=ENTRY_URL, limiter=None, timeout=30):
+        self.entry_url = entry_url
+        self.limiter = limiter
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+        self.form_url = None
+        self.page = ""
+
+    def _request(self, url, fields=None):
+        if self.limiter is not None:
+            self.limiter.acquire_sync()
+        data = urllib.parse.urlencode(fields).encode('utf-8') if fields is not None else None
+        with self.opener.open(url, data=data, timeout=self.timeout) as response:
+            self.page = response.read().decode('utf-8')
+        return self.page
+
+    def _hidden_fields(self):
+        fields = {}
+        for tag in self.HIDDEN_INPUT.findall(self.page):
+            name = re.search(r'name="([^"]*)"', tag)
+            value = re.search(r'value="([^"]*)"', tag)
+            if name:
+                fields[name.group(1)] = html.unescape(value.group(1)) if value else ""
+        return fields
+
+    def _selects(self):
+        selects = {}
+        for match in self.SELECT.finditer(self.page):
+            options = {}
+            selected = None
+            for option in self.OPTION.finditer(match.group('body')):
+                value = html.unescape(option.group('value'))
+                options[value.strip()] = html.unescape(re.sub(r'<[^>]+>', '', option.group('text'))).strip()
+                if 'selected' in option.group('attrs') or selected is None:
+                    selected = value
+            selects[match.group('name')] = (options, selected)
+        return selects
+
+    def _postback(self, event_target, **values):
+        fields = self._hidden_fields()
+        fields["__EVENTTARGET"] = event_target
+        # Keep the current value of every dropdown, then apply the new selections
+        fields.update({name: selected for name, (_, selected) in self._selects().items() if selected is not None})
+        fields.update(values)
+        return self._request(self.form_url, fields)
+
+    def open(self):
+        page = self._request(self.entry_url)
+        link = re.search(r'href="([^"]*Index\.aspx\?Lang=EN)"', page, re.I)
+        self.form_url = urllib.parse.urljoin(self.entry_url, link.group(1)) if link else self.entry_url
+        self._request(self.form_url)
+
+    def departments(self):
+        return self._selects().get("DDL_Dept", ({}, None))[0]
 
+    def degrees(self, ym_val, dept_val):
+        if ym_val not in self._selects().get("DDL_YM", ({}, None))[0]:
+            return None
+        self._postback("DDL_YM", DDL_YM=ym_val)
+        if dept_val not in self.departments():
+            return None
+        self._postback("DDL_Dept", DDL_YM=ym_val, DDL_Dept=dept_val)
+        return self._selects().get("DDL_Degree", ({}, None))[0]
 
+    def fetch_table(self, ym_val, dept_val, degree_val):
+        page = self._postback("", DDL_YM=ym_val, DDL_Dept=dept_val, DDL_Degree=degree_val, Button1="Inquiry")
+        table = self.TABLE.search(page)
+        return table.group(0) if table else None
+
+    def reset(self):
+        self._request(self.form_url)
+
+    def close(self):
+        pass
+
+def load_manifest():
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def save_manifest(manifest):
+    tmp_file = MANIFEST_FILE + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_file, MANIFEST_FILE)
+
+def save_page(filename, table_content, manifest, lock):
+    """Writes the page unless its content hash is unchanged; returns True when it was written"""
+    digest = hashlib.sha1(table_content.encode('utf-8')).hexdigest()
+    filepath = os.path.join(RAW_HTML_DIR, filename)
+    with lock:
+        if manifest.get(filename) == digest and os.path.exists(filepath):
+            return False
+    # Save the HTML to the specified file path (html_to_csv.py only re-parses files that changed)
+    tmp_file = filepath + '.tmp'
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        file.write(table_content)
+    os.replace(tmp_file, filepath)
+    with lock:
+        manifest[filename] = digest
+    return True
+
+def scrape_department(fetcher, ym_val, dept_val, dept_name, manifest, lock, counts):
+    print(f"Scraping for YM: {ym_val}, Dept: {dept_val}")
+    degree_map = fetcher.degrees(ym_val, dept_val)
+    if degree_map is None:
+        print(f"Option '{ym_val}' / department '{dept_val}' not available for this combination. Skipping.")
+        return
+
+    for degree_val, degree_name in degree_map.items():
+        # Skip the "All"
+        if degree_name == "All":
+            continue
+
+        table_content = fetcher.fetch_table(ym_val, dept_val, degree_val)
+        if table_content is None:
+            print(f"  > Degree '{degree_val}' not available. Skipping.")
+            continue
+
+        filename = build_filename(ym_val, dept_val, dept_name, degree_name)
+        written = save_page(filename, table_content, manifest, lock)
+        with lock:
+            counts['saved' if written else 'unchanged'] += 1
+        print(f"  > {'Saved' if written else 'Unchanged'} {filename}")
+
+def scrape_and_save_to_html(fetcher_class=SeleniumFetcher, workers=1):
+    """
+    Scrapes every (semester, department, degree) page. Each worker owns one fetcher
+    (browser session or HTTP session) and takes (semester, department) pairs from a
+    shared queue; all of them draw from one REQUESTS_PER_MINUTE limit.
+    """
+    #Create the raw HTML directory if it doesn't exist
+    if not os.path.exists(RAW_HTML_DIR):
+        os.makedirs(RAW_HTML_DIR)
+
+    limiter = RateLimiter(REQUESTS_PER_MINUTE, burst=1)
+    manifest = load_manifest()
+    lock = threading.Lock()
+    counts = {'saved': 0, 'unchanged': 0, 'failed': 0}
+    start = time.time()
+
+    # The first session lists the departments, then scrapes like the others
+    fetchers = [fetcher_class(ENTRY_URL, limiter)]
+    try:
+        fetchers[0].open()
+        dept_map = fetchers[0].departments()
+        work = queue.Queue()
+        for ym_val in TARGET_YMS:
+            for dept_val, dept_name in dept_map.items():
+                work.put((ym_val, dept_val, dept_name))
+        print(f"{work.qsize()} semester/department pairs for {workers} sessions at {REQUESTS_PER_MINUTE} requests/min")
+
+        def worker(fetcher):
+            while True:
                 try:
-                    # Re-locate the DDL_YM dropdown
-                    ddl_ym = Select(wait.until(EC.presence_of_element_located((By.ID, "DDL_YM"))))
-                    
-                    # Find the option with the correct stripped value
-                    found_ym_option = None
-                    for option in ddl_ym.options:
-                        if option.get_attribute("value").strip() == ym_val:
-                            found_ym_option = option
-                            break
-                    
-                    if found_ym_option:
-                        #use the original, non-stripped value to select the option
-                        ddl_ym.select_by_value(found_ym_option.get_attribute("value"))
-                    else:
-                        print(f"Option '{ym_val}' not available. Skipping.")
-                        continue
-
-                    # The DDL_Dept will postback and reload. Wait...
-                    wait.until(EC.visibility_of_element_located((By.ID, "DDL_Dept")))
-                    ddl_dept = Select(driver.find_element(By.ID, "DDL_Dept"))
-                    if dept_val in [option.get_attribute("value").strip() for option in ddl_dept.options]:
-                        ddl_dept.select_by_value(dept_val)
-                    else:
-                        print(f"Department '{dept_val}' not available for this combination. Skipping.")
-                        continue
-
-                    #The DDL_Degree will update after the department selection.
-                    #wait for the DDL_Degree options to load
-                    ddl_degree_element = wait.until(EC.element_to_be_clickable((By.ID, "DDL_Degree")))
-                    ddl_degree = Select(ddl_degree_element)
-                    degree_map = {option.get_attribute("value").strip(): option.text.strip() for option in ddl_degree.options}
-                    degree_values = list(degree_map.keys())
-
-                    for degree_val in degree_values:
-                        # Skip the "All"
-                        if degree_map.get(degree_val) == "All":
-                            print(f"  > Skipping 'All' degree option.")
-                            continue
-
-                        print(f"  > Degree: {degree_val}")
-                        
-                        # Re-locate the degree dropdown before selecting
-                        ddl_degree = Select(wait.until(EC.element_to_be_clickable((By.ID, "DDL_Degree"))))
-                        
-                        if degree_val in [option.get_attribute("value").strip() for option in ddl_degree.options]:
-                            ddl_degree.select_by_value(degree_val)
-                        else:
-                            print(f"  > Degree '{degree_val}' not available. Skipping.")
-                            continue
-
-                        #click the Inquery button
-                        inquery_button = wait.until(EC.element_to_be_clickable((By.ID, "Button1")))
-                        inquery_button.click()
-                        
-                        #wait for the table
-                        table_element = wait.until(EC.presence_of_element_located((By.ID, "Table1")))
-
-                        #only take table
-                        table_content = table_element.get_attribute("outerHTML")
-                        
-                        #construct file name
-                        ym_prefix = ym_val.split(',')[0]
-                        semester_code = get_semester_code(ym_val)
-                        
-                        dept_name = dept_map.get(dept_val, "Unknown_Dept")
-                        degree_name = degree_map.get(degree_val, "Unknown_Degree")
-
-                        sanitized_dept_name = dept_name.replace(" ", "").replace("/", "")
-                        sanitized_degree_name = degree_name.replace(" ", "").replace("/", "")
-                        
-                        filename = f"{ym_prefix}{semester_code}_{dept_val}{sanitized_dept_name}{sanitized_degree_name}.html"
-                        filepath = os.path.join(RAW_HTML_DIR, filename)
-
-                        # Save the HTML to the specified file path
-                        with open(filepath, "w", encoding="utf-8") as file:
-                            file.write(table_content)
-                        
-                        print(f"Saved HTML to {filepath}")
-
-                        # Go back to the previous page to continue the loop
-                        driver.back()
-                        # Wait for the main page to load again before the next selection
-                        wait.until(EC.presence_of_element_located((By.ID, "DDL_YM")))
+                    ym_val, dept_val, dept_name = work.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    scrape_department(fetcher, ym_val, dept_val, dept_name, manifest, lock, counts)
                 except Exception as e:
-                    print(f"An error occurred while scraping: {e}")
-                    # Go back to the main page to reset the state if error
-                    driver.back()
-                    wait.until(EC.presence_of_element_located((By.ID, "DDL_YM")))
-                    continue
-    
-    finally:
-        driver.quit()
+                    print(f"An error occurred while scraping {ym_val} {dept_val}: {e}")
+                    with lock:
+                        counts['failed'] += 1
+                    try:
+                        fetcher.reset()
+                    except Exception:
+                        pass
 
-if __name__ == "__main__":
-    scrape_and_save_to_html()
+        for _ in range(workers - 1):
+            fetcher = fetcher_class(ENTRY_URL, limiter)
+            fetchers.append(fetcher)
+            fetcher.open()
 
+        threads = [threading.Thread(target=worker, args=(fetcher,)) for fetcher in fetchers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        save_manifest(manifest)
+        for fetcher in fetchers:
+            fetcher.close()
+
+    print(f"Done in {time.time() - start:.1f}s: {counts['saved']} pages saved, "
+          f"{counts['unchanged']} unchanged, {counts['failed']} departments failed.")
+    return counts
 
+if __name__ == "__main__":
+    # --http posts the form directly instead of driving Chrome; --workers N runs N sessions
+    fetcher_class = HttpFetcher if '--http' in sys.argv else SeleniumFetcher
+    workers = int(sys.argv[sys.argv.index('--workers') + 1]) if '--workers' in sys.argv else 1
+    scrape_and_save_to_html(fetcher_class, workers)
@@ -0,0 +1,153 @@
+import json
+import asyncio
+from groq import RateLimitError
+from rate_limiter import estimate_tokens
+
+# Several job descriptions are packed into one chat completion. The model answers with
+# {"results": {"<id>": [skills...]}}; batches whose answer is malformed are split and retried.
+
+BATCH_SYSTEM_PROMPT = """
+    You are an expert technical recruiter. You receive a JSON object {"items": [{"id": ..., "text": ...}]}
+    where every text is a job description. For EACH item extract the top 7-10 most important, marketable skills.
+    Include technical skills, soft skills, and specific tools/software.
+    Provide the output as a single, clean JSON object with one key "results" that maps every item id to an array of strings.
+    Example: {"results": {"a1": ["Java", "Spring Boot", "Docker"], "b2": ["SQL", "Problem Solving"]}}
+    """
+
+# Output budget reserved per item (7-10 short skills plus JSON overhead)
+PER_ITEM_OUTPUT_TOKENS = 120
+MAX_ITEM_CHARS = 4000
+
+def item_tokens(text):
+    return estimate_tokens(str(text)[:MAX_ITEM_CHARS]) + PER_ITEM_OUTPUT_TOKENS + 10
+
+def plan_batches(items, token_budget, max_batch_size=10):
+    """
+    Greedily packs (id, text) items into batches whose estimated prompt plus output
+    tokens stay under token_budget. An item larger than the budget goes alone.
+    """
+    base = estimate_tokens(BATCH_SYSTEM_PROMPT)
+    batches, current, current_tokens = [], [], base
+
+    for item_id, text in items:
+        cost = item_tokens(text)
+        if current and (current_tokens + cost > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current, current_tokens = [], base
+        current.append((item_id, text))
+        current_tokens += cost
+
+    if current:
+        batches.append(current)
+    return batches
+
+def build_batch_prompt(batch):
+    return json.dumps({"items": [{"id": item_id, "text": str(text)[:MAX_ITEM_CHARS]} for item_id, text in batch]},
+                      ensure_ascii=False)
+
+def parse_batch_response(response_str, expected_ids):
+    """
+    Returns (results, missing_ids). Raises ValueError when the response as a whole is
+    unusable; items with a missing or non-list answer are reported in missing_ids.
+    """
+    try:
+        data = json.loads(response_str or '')
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e}")
+
+    results = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(results, dict):
+        raise ValueError("response has no 'results' object")
+
+    parsed, missing = {}, []
+    for item_id in expected_ids:
+        skills = results.get(item_id)
+        if isinstance(skills, list) and all(isinstance(s, str) for s in skills):
+            parsed[item_id] = skills
+        else:
+            missing.append(item_id)
+    return parsed, missing
+
+async def extract_batch(client, model_name, limiter, batch, max_retries=3, cache=None):
+    """
+    Extracts skills for every (id, text) item of the batch.
+
+    Returns (results, failed_ids). Malformed responses split the batch in half,
+    items missing from an otherwise valid response are retried together, and a
+    single item is given up on after max_retries malformed answers. A batch that
+    fails or is rate limited (429) max_retries times is given up on as a whole. With a cache
+    (see llm_cache.py), recorded answers are reused without touching the API.
+    """
+    results, failed = {}, []
+    pending = [(batch, 0)]
+
+    while pending:
+        sub_batch, attempts = pending.pop()
+        ids = [item_id for item_id, _ in sub_batch]
+        user_prompt = build_batch_prompt(sub_batch)
+        max_tokens = PER_ITEM_OUTPUT_TOKENS * len(sub_batch) + 50
+        messages = [
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+        params = {"temperature": 0.1, "max_tokens": max_tokens, "response_format": "json_object"}
+
+        response_str = cache.get(model_name, messages, params) if cache else None
+        if response_str is None:
+            estimated = estimate_tokens(BATCH_SYSTEM_PROMPT, user_prompt) + max_tokens
+            await limiter.acquire(estimated)
+            try:
+                chat_completion = await client.chat.completions.create(
+                    messages=messages,
+                    model=model_name, temperature=0.1, max_tokens=max_tokens,
+                    response_format={"type": "json_object"},
+                )
+            except RateLimitError as e:
+                retry_after = e.response.headers.get("retry-after") if e.response is not None else None
+                delay = limiter.record_rate_limited(retry_after)
+                print(f"   429 from provider, pausing all workers for {delay:.1f}s")
+                # Counts as an attempt (like the single-item path), so a provider that keeps refusing ends the loop
+                if attempts + 1 >= max_retries:
+                    failed.extend(ids)
+                else:
+                    pending.append((sub_batch, attempts + 1))
+                continue
+            except Exception as e:
+                print(f"!!! ERROR during API call: {e}")
+                if attempts + 1 >= max_retries:
+                    failed.extend(ids)
+                else:
+                    await asyncio.sleep(2 ** attempts)
+                    pending.append((sub_batch, attempts + 1))
+                continue
+
+            limiter.record_success()
+            usage = getattr(chat_completion, 'usage', None)
+            limiter.settle(estimated, getattr(usage, 'total_tokens', None))
+            response_str = chat_completion.choices[0].message.content
+
+        try:
+            parsed, missing = parse_batch_response(response_str, ids)
+        except ValueError as e:
+            if len(sub_batch) > 1:
+                print(f"   Malformed batch response ({e}), splitting {len(sub_batch)} items.")
+                middle = len(sub_batch) // 2
+                pending.append((sub_batch[:middle], attempts))
+                pending.append((sub_batch[middle:], attempts))
+            elif attempts + 1 >= max_retries:
+                failed.extend(ids)
+            else:
+                pending.append((sub_batch, attempts + 1))
+            continue
+
+        if cache and not missing:
+            cache.put(model_name, messages, params, response_str)
+        results.update(parsed)
+        if missing:
+            retry = [item for item in sub_batch if item[0] in set(missing)]
+            if len(retry) == len(sub_batch) and attempts + 1 >= max_retries:
+                failed.extend(missing)
+            else:
+                pending.append((retry, attempts + 1 if len(retry) == len(sub_batch) else attempts))
+
+    return results, failed
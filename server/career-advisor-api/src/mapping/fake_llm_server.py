@@ -0,0 +1,141 @@
+import re
+import sys
+import json
+import time
+import random
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIGURATION ---
+# A local stand-in for the Groq chat completions API, for offline runs of the skill extraction scripts:
+#   python src/mapping/fake_llm_server.py 8765
+#   GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=fake python src/mapping/generate_skills_from_titles.py
+PORT = 8765
+REQUESTS_PER_MINUTE = 60     # Requests above this limit get a 429 like the real provider
+RANDOM_429_RATE = 0.05       # Extra 429s to exercise the backoff path
+LATENCY_SECONDS = 0.2
+MALFORMED_RATE = 0.05        # Share of batch responses that come back truncated or missing items
+
+WORD_PATTERN = re.compile(r"\b[A-Z][A-Za-z0-9+#.]{1,30}\b")
+
+def fake_skills(text, limit=8):
+    """Deterministic 'skills': the capitalised terms of the text, in order of appearance"""
+    seen = []
+    for word in WORD_PATTERN.findall(text):
+        word = word.rstrip('.')
+        if word not in seen and word not in ('Job', 'Description', 'Analyze', 'The', 'We'):
+            seen.append(word)
+        if len(seen) == limit:
+            break
+    return seen
+
+def build_content(messages):
+    user_text = "\n".join(m.get('content', '') for m in messages if m.get('role') == 'user')
+
+    # Batched prompts (see batch_extraction.py) carry {"items": [{"id", "text"}]}
+    try:
+        items = json.loads(user_text).get('items')
+    except (json.JSONDecodeError, AttributeError):
+        items = None
+
+    # map_API.py prompts carry a candidate list to choose from
+    candidates = re.search(r"--- CANDIDATE SKILLS ---\s*(.*?)\s*--- END OF LIST ---", user_text, re.S)
+    if candidates:
+        return json.dumps({"matched_skills": [s.strip() for s in candidates.group(1).split(',')][:5]})
+
+    if not items:
+        return json.dumps({"skills": fake_skills(user_text)})
+
+    results = {item['id']: fake_skills(item['text']) for item in items}
+    roll = random.random()
+    if roll < MALFORMED_RATE / 2:
+        return json.dumps({"results": results})[:-7]
+    if roll < MALFORMED_RATE and len(results) > 1:
+        results.pop(next(iter(results)))
+    return json.dumps({"results": results})
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    window = deque()
+    lock = threading.Lock()
+    stats = {'ok': 0, 'rate_limited': 0}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _over_limit(self):
+        now = time.monotonic()
+        with self.lock:
+            while self.window and now - self.window[0] > 60:
+                self.window.popleft()
+            if len(self.window) >= REQUESTS_PER_MINUTE:
+                return max(1, int(60 - (now - self.window[0])))
+            if random.random() < RANDOM_429_RATE:
+                return 1
+            self.window.append(now)
+            return 0
+
+    def do_POST(self):
+        if not self.path.endswith('/chat/completions'):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+
+        retry_after = self._over_limit()
+        if retry_after:
+            self.stats['rate_limited'] += 1
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "tokens",
+                                            "code": "rate_limit_exceeded"}},
+                            headers={'retry-after': str(retry_after)})
+            return
+
+        time.sleep(LATENCY_SECONDS)
+        messages = request.get('messages', [])
+        content = build_content(messages)
+        prompt_tokens = sum(len(m.get('content', '')) for m in messages) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        self.stats['ok'] += 1
+
+        self._send_json(200, {
+            "id": f"chatcmpl-fake-{self.stats['ok']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get('model', 'fake'),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+                "logprobs": None
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+def serve(port=PORT):
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeLLMHandler)
+    print(f"Fake LLM server listening on http://127.0.0.1:{port}")
+    return server
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    server = serve(port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nServed {FakeLLMHandler.stats['ok']} requests, "
+              f"{FakeLLMHandler.stats['rate_limited']} rate limited.")
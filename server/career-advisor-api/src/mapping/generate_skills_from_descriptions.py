@@ -1,17 +1,45 @@
 import os
+import sys
 import json
 import time
+import asyncio
 import pandas as pd
-from groq import Groq
+from groq import Groq, AsyncGroq
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+from rate_limiter import RateLimiter
+from llm_cache import get_cache
+from batch_extraction import plan_batches, extract_batch
+from skill_journal import SkillJournal
 
 # --- CONFIGURATION ---
 
 INPUT_FILE = "data/Raw/JobsDatasetProcessed.csv"
 OUTPUT_FILE = "data/processed/generated_master_skills.txt"
+# New skills are appended here and folded into OUTPUT_FILE every JOURNAL_COMPACT_EVERY skills and at exit
+JOURNAL_FILE = "data/processed/generated_master_skills.journal"
+JOURNAL_FSYNC_EVERY = 50
+JOURNAL_COMPACT_EVERY = 2000
 
 # --- FIX #1: Use the more token-efficient model ---
 MODEL_NAME = "llama-3.1-8b-instant"
 
+# Pack several descriptions into one request under this token budget (0 = one description per request)
+BATCH_TOKEN_BUDGET = int(os.getenv("GROQ_BATCH_TOKENS", "2500"))
+MAX_BATCH_SIZE = 10
+REQUESTS_PER_MINUTE = int(os.getenv("GROQ_RPM", "30"))
+TOKENS_PER_MINUTE = int(os.getenv("GROQ_TPM", "6000"))
+
+# Created on the first request that is not answered from the LLM cache, so
+# LLM_CACHE_MODE=replay runs (and imports) without GROQ_API_KEY
+client = None
+
+def get_client():
+    global client
+    if client is None:
+        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    return client
+
 IT_CS_KEYWORDS = [
     'Computer', 'Software', 'Data', 'Network', 'Developer', 'Programmer', 
     'Information', 'Web', 'Database', 'Cybersecurity', 'Systems', 'Architect',
@@ -26,19 +54,30 @@ def extract_skills_from_description(job_description):
     Provide the output as a single, clean JSON object with one key: "skills", an array of strings.
     Example: {"skills": ["Java", "Spring Boot", "Agile Methodologies", "Problem Solving", "Docker"]}
     """
+    truncated_description = str(job_description)[:4000] # Use a smaller chunk to save tokens
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Job Description: {truncated_description}"}
+    ]
+    params = {"temperature": 0.1, "response_format": "json_object"}
+
+    # Prompts are deterministic, so a recorded answer is reused (and nothing is sent in replay mode)
+    cached = get_cache().get(MODEL_NAME, messages, params)
+    if cached is not None:
+        print(f"-> Using cached skills for description.")
+        return json.loads(cached).get("skills", [])
+
     try:
-        truncated_description = str(job_description)[:4000] # Use a smaller chunk to save tokens
         print(f"-> Analyzing description for skills...")
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Job Description: {truncated_description}"}
-            ],
+        chat_completion = get_client().chat.completions.create(
+            messages=messages,
             model=MODEL_NAME, temperature=0.1, response_format={"type": "json_object"},
         )
         response_str = chat_completion.choices[0].message.content
         if response_str:
-            return json.loads(response_str).get("skills", [])
+            skills = json.loads(response_str).get("skills", [])
+            get_cache().put(MODEL_NAME, messages, params, response_str)
+            return skills
         return []
     except Exception as e:
         print(f"!!! ERROR during API call: {e}")
@@ -59,22 +98,55 @@ def main():
         return
 
     # --- FIX #2: Add Persistence Logic ---
-    master_skills_set = set()
-    processed_descriptions = set()
-
-    # Load already processed skills if the output file exists
-    if os.path.exists(OUTPUT_FILE):
-        with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                master_skills_set.add(line.strip())
+    # Skills go to an append-only journal instead of rewriting the whole master file per call
+    journal = SkillJournal(OUTPUT_FILE, JOURNAL_FILE, JOURNAL_FSYNC_EVERY, JOURNAL_COMPACT_EVERY)
+    master_skills_set = journal.load()
+    if master_skills_set:
         print(f"Loaded {len(master_skills_set)} existing skills from '{OUTPUT_FILE}'. Resuming...")
         # Note: This simple resume doesn't track which descriptions were processed,
         # but it prevents losing the skills already found.
 
+    try:
+        if BATCH_TOKEN_BUDGET:
+            asyncio.run(process_in_batches(unique_descriptions, journal))
+        else:
+            process_one_by_one(unique_descriptions, journal)
+    finally:
+        journal.close()
+
+    print(f"LLM cache: {get_cache().stats()}")
+    print(f"\nTotal unique skills generated: {len(master_skills_set)}")
+    print(f"✅ --- Finished! Final master skills list is saved at: '{OUTPUT_FILE}' ---")
+
+async def process_in_batches(unique_descriptions, journal):
+    """Sends several descriptions per request, packed under BATCH_TOKEN_BUDGET"""
+    # Replay mode answers every batch from the cache (or raises CacheMiss), so no client or key is needed
+    async_client = None if get_cache().replay else AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+    limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+    items = [(str(i), description) for i, description in enumerate(unique_descriptions)]
+    batches = plan_batches(items, BATCH_TOKEN_BUDGET, MAX_BATCH_SIZE)
+    print(f"Packed {len(items)} descriptions into {len(batches)} requests.")
+
+    for batch in batches:
+        first, last = int(batch[0][0]), int(batch[-1][0])
+        print(f"\nProcessing descriptions {first + 1}-{last + 1}/{len(unique_descriptions)}...")
+
+        results, failed = await extract_batch(async_client, MODEL_NAME, limiter, batch, cache=get_cache())
+        for skills in results.values():
+            cleaned_skills = {s.strip() for s in skills}
+            new_skills_found = journal.add(cleaned_skills)
+            print(f"   Found {len(cleaned_skills)} skills ({new_skills_found} new).")
+
+        if failed:
+            print("!!! API error detected. Stopping script to avoid losing progress.")
+            break
+
+def process_one_by_one(unique_descriptions, journal):
     total_to_process = len(unique_descriptions)
     for i, description in enumerate(unique_descriptions):
         print(f"\nProcessing description {i+1}/{total_to_process}...")
         
+        hits_before = get_cache().hits
         skills = extract_skills_from_description(description)
         
         if skills is None: # API error occurred
@@ -83,19 +155,11 @@ def main():
 
         if skills:
             cleaned_skills = {s.strip() for s in skills}
-            new_skills_found = len(cleaned_skills - master_skills_set)
-            master_skills_set.update(cleaned_skills)
+            new_skills_found = journal.add(cleaned_skills)
             print(f"   Found {len(cleaned_skills)} skills ({new_skills_found} new).")
-        
-        # Save progress after every successful API call
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            for skill in sorted(list(master_skills_set)):
-                f.write(skill + '\n')
-
-        time.sleep(2)
 
-    print(f"\nTotal unique skills generated: {len(master_skills_set)}")
-    print(f"✅ --- Finished! Final master skills list is saved at: '{OUTPUT_FILE}' ---")
+        if get_cache().hits == hits_before: # Cached answers cost no API quota
+            time.sleep(2)
 
 if __name__ == "__main__":
     main()
@@ -1,52 +1,175 @@
 import os
+import sys
 import json
-import time
+import asyncio
+import hashlib
 import pandas as pd
-from groq import Groq
+from groq import AsyncGroq, RateLimitError
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+from rate_limiter import RateLimiter, estimate_tokens
+from llm_cache import get_cache
+from batch_extraction import plan_batches, extract_batch
 
 # --- CONFIGURATION ---
 
-# Corrected paths based on your file structure
 INPUT_FILE = "data/Raw/JobsDatasetProcessed.csv"
 OUTPUT_FILE = "data/processed/generated_master_skills.txt"
-PROGRESS_FILE = "data/processed/progress_tracker.txt" 
+# One JSON line per finished description: {"id": ..., "skills": [...]}
+COMPLETION_LOG = "data/processed/skills_completion_log.jsonl"
 
-# Using the efficient model to avoid daily limits
+# --- FIX #1: Use the more token-efficient model ---
 MODEL_NAME = "llama-3.1-8b-instant"
 
+# Provider limits for MODEL_NAME. Point GROQ_BASE_URL at fake_llm_server.py to run offline.
+REQUESTS_PER_MINUTE = int(os.getenv("GROQ_RPM", "30"))
+TOKENS_PER_MINUTE = int(os.getenv("GROQ_TPM", "6000"))
+NUM_WORKERS = int(os.getenv("GROQ_WORKERS", "8"))
+MAX_RETRIES = 5
+MAX_OUTPUT_TOKENS = 200
+# Pack several descriptions into one request under this token budget (0 = one description per request)
+BATCH_TOKEN_BUDGET = int(os.getenv("GROQ_BATCH_TOKENS", "2500"))
+MAX_BATCH_SIZE = 10
+
 IT_CS_KEYWORDS = [
-    'Computer', 'Software', 'Data', 'Network', 'Developer', 'Programmer', 
+    'Computer', 'Software', 'Data', 'Network', 'Developer', 'Programmer',
     'Information', 'Web', 'Database', 'Cybersecurity', 'Systems', 'Architect',
     'IT', 'Integration', 'Technologist', 'Engineer'
 ]
 
-def extract_skills_from_description(job_description):
-    """Sends a job description to the Groq API and extracts skills."""
-    system_prompt = """
+SYSTEM_PROMPT = """
     You are an expert technical recruiter. Analyze the job description and extract the top 7-10 most important, marketable skills.
     Include technical skills, soft skills, and specific tools/software.
     Provide the output as a single, clean JSON object with one key: "skills", an array of strings.
     Example: {"skills": ["Java", "Spring Boot", "Agile Methodologies", "Problem Solving", "Docker"]}
     """
-    
-    
-    try:
-        truncated_description = str(job_description)[:4000] 
-        # print(f"-> Analyzing description for skills...") # Commented out for a cleaner log
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Job Description: {truncated_description}"}
-            ],
-            model=MODEL_NAME, temperature=0.1, response_format={"type": "json_object"},
-        )
+
+def description_id(job_description):
+    return hashlib.sha1(str(job_description).encode('utf-8')).hexdigest()[:16]
+
+def load_completion_log(path):
+    """Returns {description id: skills} for every description finished in earlier runs"""
+    completed = {}
+    if not os.path.exists(path):
+        return completed
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                completed[record['id']] = record['skills']
+            except (json.JSONDecodeError, KeyError):
+                # A torn last line from a crash; that description is simply redone
+                continue
+    return completed
+
+async def extract_skills_from_description(client, limiter, job_description):
+    """Sends a job description to the Groq API and extracts skills."""
+    truncated_description = str(job_description)[:4000] # Use a smaller chunk to save tokens
+    user_prompt = f"Job Description: {truncated_description}"
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+    params = {"temperature": 0.1, "max_tokens": MAX_OUTPUT_TOKENS, "response_format": "json_object"}
+    estimated = estimate_tokens(SYSTEM_PROMPT, user_prompt) + MAX_OUTPUT_TOKENS
+
+    cache = get_cache()
+    cached = cache.get(MODEL_NAME, messages, params)
+    if cached is not None:
+        return json.loads(cached).get("skills", [])
+
+    for attempt in range(MAX_RETRIES):
+        await limiter.acquire(estimated)
+        try:
+            chat_completion = await client.chat.completions.create(
+                messages=messages,
+                model=MODEL_NAME, temperature=0.1, max_tokens=MAX_OUTPUT_TOKENS,
+                response_format={"type": "json_object"},
+            )
+        except RateLimitError as e:
+            retry_after = e.response.headers.get("retry-after") if e.response is not None else None
+            delay = limiter.record_rate_limited(retry_after)
+            print(f"   429 from provider, pausing all workers for {delay:.1f}s (attempt {attempt + 1})")
+            continue
+        except Exception as e:
+            print(f"!!! ERROR during API call: {e}")
+            await asyncio.sleep(2 ** attempt)
+            continue
+
+        limiter.record_success()
+        usage = getattr(chat_completion, 'usage', None)
+        limiter.settle(estimated, getattr(usage, 'total_tokens', None))
+
         response_str = chat_completion.choices[0].message.content
-        if response_str:
-            return json.loads(response_str).get("skills", [])
-        return []
-    except Exception as e:
-        print(f"!!! ERROR during API call: {e}")
-        return None
+        if not response_str:
+            return []
+        try:
+            skills = json.loads(response_str).get("skills", [])
+        except json.JSONDecodeError:
+            print("!!! Malformed JSON in response, retrying.")
+            continue
+        cache.put(MODEL_NAME, messages, params, response_str)
+        return skills
+
+    return None # Still failing after MAX_RETRIES; it stays out of the log and is retried next run
+
+async def extract_work_item(client, limiter, batch):
+    """Returns ({id: skills}, failed ids) for one queued batch of (id, description) items"""
+    if BATCH_TOKEN_BUDGET:
+        return await extract_batch(client, MODEL_NAME, limiter, batch, max_retries=MAX_RETRIES, cache=get_cache())
+
+    desc_id, description = batch[0]
+    skills = await extract_skills_from_description(client, limiter, description)
+    if skills is None:
+        return {}, [desc_id]
+    return {desc_id: skills}, []
+
+async def run_workers(pending, completed, master_skills_set):
+    # The SDK's own retries would bypass the shared limiter, so 429s are handled here instead
+    client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+    limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+    queue = asyncio.Queue()
+    if BATCH_TOKEN_BUDGET:
+        batches = plan_batches(pending, BATCH_TOKEN_BUDGET, MAX_BATCH_SIZE)
+        print(f"Packed {len(pending)} descriptions into {len(batches)} requests.")
+    else:
+        batches = [[item] for item in pending]
+    for batch in batches:
+        queue.put_nowait(batch)
+
+    total = len(batches)
+    failed = []
+    os.makedirs(os.path.dirname(COMPLETION_LOG) or '.', exist_ok=True)
+
+    with open(COMPLETION_LOG, 'a', encoding='utf-8') as log:
+        async def worker():
+            while True:
+                try:
+                    batch = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                results, batch_failed = await extract_work_item(client, limiter, batch)
+                failed.extend(batch_failed)
+
+                found, new_skills_found = 0, 0
+                for desc_id, skills in results.items():
+                    cleaned_skills = sorted({str(s).strip() for s in skills if str(s).strip()})
+                    new_skills_found += len(set(cleaned_skills) - master_skills_set)
+                    found += len(cleaned_skills)
+                    master_skills_set.update(cleaned_skills)
+                    completed[desc_id] = cleaned_skills
+
+                    # Durable per-description record: a restart skips exactly these
+                    log.write(json.dumps({"id": desc_id, "skills": cleaned_skills}, ensure_ascii=False) + '\n')
+                log.flush()
+                os.fsync(log.fileno())
+                print(f"   [{len(completed)}] Found {found} skills ({new_skills_found} new) for {len(results)} descriptions. "
+                      f"{total - queue.qsize()}/{total} requests dispatched.")
+
+        await asyncio.gather(*(worker() for _ in range(NUM_WORKERS)))
+
+    return failed
 
 def main():
     print("--- Starting Stage 1: Generating master skills list... ---")
@@ -63,50 +186,40 @@ def main():
         return
 
     master_skills_set = set()
-    start_index = 0
 
+    # Load already processed skills if the output file exists
     if os.path.exists(OUTPUT_FILE):
         with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
-            master_skills_set.update(line.strip() for line in f)
+            for line in f:
+                if line.strip():
+                    master_skills_set.add(line.strip())
         print(f"Loaded {len(master_skills_set)} existing skills from '{OUTPUT_FILE}'.")
 
-    if os.path.exists(PROGRESS_FILE):
-        with open(PROGRESS_FILE, 'r', encoding='utf-8') as f:
-            try:
-                start_index = int(f.read().strip())
-                print(f"Resuming from record number {start_index + 1}...")
-            except (ValueError, IndexError):
-                start_index = 0
-
-    total_to_process = len(unique_descriptions)
-    
-    for i in range(start_index, total_to_process):
-        description = unique_descriptions[i]
-        print(f"\nProcessing description {i + 1}/{total_to_process}...")
-        
-        skills = extract_skills_from_description(description)
-        
-        if skills is None:
-            print("!!! API error detected. Stopping script to save progress.")
-            break 
-
-        if skills:
-            cleaned_skills = {s.strip() for s in skills}
-            new_skills_found = len(cleaned_skills - master_skills_set)
-            master_skills_set.update(cleaned_skills)
-            print(f"   Found {len(cleaned_skills)} skills ({new_skills_found} new).")
-        
-        with open(PROGRESS_FILE, 'w', encoding='utf-8') as f_progress:
-            f_progress.write(str(i + 1))
-            
-        time.sleep(2)
-
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        for skill in sorted(list(master_skills_set)):
-            f.write(skill + '\n')
-    
+    # --- FIX #2: Resume from the per-description completion log ---
+    completed = load_completion_log(COMPLETION_LOG)
+    for skills in completed.values():
+        master_skills_set.update(skills)
+
+    pending = [(description_id(d), d) for d in unique_descriptions]
+    pending = [(i, d) for i, d in pending if i not in completed]
+    print(f"{len(completed)} descriptions already done, {len(pending)} to process "
+          f"with {NUM_WORKERS} workers ({REQUESTS_PER_MINUTE} req/min, {TOKENS_PER_MINUTE} tokens/min).")
+
+    failed = []
+    try:
+        failed = asyncio.run(run_workers(pending, completed, master_skills_set))
+    except KeyboardInterrupt:
+        print("\nInterrupted. Finished descriptions are in the completion log.")
+    finally:
+        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+            for skill in sorted(master_skills_set):
+                f.write(skill + '\n')
+
+    print(f"LLM cache: {get_cache().stats()}")
+    if failed:
+        print(f"!!! {len(failed)} descriptions failed after {MAX_RETRIES} attempts; rerun to retry them.")
     print(f"\nTotal unique skills generated: {len(master_skills_set)}")
-    print(f"✅ --- Finished or paused! Progress saved. Final list is at: '{OUTPUT_FILE}' ---")
+    print(f"✅ --- Finished! Final master skills list is saved at: '{OUTPUT_FILE}' ---")
 
 if __name__ == "__main__":
     main()
@@ -1,14 +1,24 @@
 import os
+import sys
 import json
 import time
 import pandas as pd
 from groq import Groq
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+from llm_cache import get_cache
+from rate_limiter import estimate_tokens
+from table_io import read_table
+from skill_vocabulary import load_canonical_skills
+from skill_index import load_or_build_skill_index
 
 # --- CONFIGURATION ---
 
 # Input files
 COURSES_FILE = "data/Processed/course_data/cleaned_course_data.csv"
 MASTER_SKILLS_FILE = "data/Processed/generated_master_skills.txt"
+VOCABULARY_FILE = "data/Processed/skill_vocabulary.json"
 
 # Output file for this prototype seed data
 OUTPUT_FILE = "data/Processed/enriched_courses_SAMPLE.jsonl" 
@@ -18,7 +28,21 @@ MODEL_NAME = "llama-3.1-8b-instant"
 
 # --- PROTOTYPE LIMITS ---
 NUM_SAMPLE_COURSES = 10 # We will process 100 courses
-TOP_K_SKILLS = 100     # We will only use the top 500 skills from your list
+# Each prompt offers only the skills closest to the course title (char n-gram TF-IDF over the
+# whole canonical vocabulary), so every skill is reachable and prompts stay small
+CANDIDATES_PER_COURSE = 50
+# Top-k search over the skill vectors (SKILL_INDEX_MODE=approximate: pruned postings, see src/utils/skill_index.py)
+SKILL_INDEX_FILE = "data/Processed/skill_index_candidates.npz"
+
+# Created on the first request that is not answered from the LLM cache, so
+# LLM_CACHE_MODE=replay runs (and imports) without GROQ_API_KEY
+client = None
+
+def get_client():
+    global client
+    if client is None:
+        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    return client
 
 # Filter for relevant departments
 RELEVANT_DEPARTMENTS = [
@@ -27,18 +51,23 @@ RELEVANT_DEPARTMENTS = [
 ]
 
 def load_skills():
-    """Loads the top K skills from the master list."""
+    """Loads the canonical skill vocabulary built from the master list."""
     try:
-        with open(MASTER_SKILLS_FILE, 'r', encoding='utf-8') as f:
-            all_skills = [line.strip() for line in f if line.strip()]
-        # Get the top K skills for our prompt
-        prototype_skills = all_skills[:TOP_K_SKILLS]
-        print(f"Loaded {len(prototype_skills)} top skills for mapping.")
-        return prototype_skills
+        all_skills = load_canonical_skills(MASTER_SKILLS_FILE, VOCABULARY_FILE)
+        print(f"Loaded {len(all_skills)} skills for mapping.")
+        return all_skills
     except FileNotFoundError:
         print(f"!!! FATAL ERROR: Master skills file not found at '{MASTER_SKILLS_FILE}'.")
         return None
 
+def select_candidates(course_titles, master_skills, k=CANDIDATES_PER_COURSE):
+    """Returns the k most similar skills for every course title, best first."""
+    # char_wb n-grams cope with glued titles such as 'Fundamental Computer ProgrammingI'
+    vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 5), sublinear_tf=True)
+    skill_index = load_or_build_skill_index(SKILL_INDEX_FILE, vectorizer.fit_transform(master_skills))
+    hits = skill_index.search(vectorizer.transform(course_titles), k)
+    return [[master_skills[match['corpus_id']] for match in hit] for hit in hits]
+
 def safe_json_parse(response_str, course_title):
     """Safely parse JSON response with error handling."""
     if not response_str:
@@ -67,23 +96,17 @@ def main():
     if not master_skills:
         return
         
-    skills_list_str = ", ".join(master_skills)
-
-    # Define the system prompt, including the small skill list
-    system_prompt = f"""
+    # The system prompt is the same for every course; the candidate list goes in the user message
+    system_prompt = """
     You are an expert academic advisor. For the given course title, identify the 5 to 7 most relevant skills.
-    You MUST choose these skills exclusively from the following master list:
-
-    --- MASTER SKILLS LIST ---
-    {skills_list_str}
-    --- END OF LIST ---
+    You MUST choose these skills exclusively from the candidate skills listed with the course.
 
     Provide the output as a single, clean JSON object with one key "matched_skills".
-    Example: {{"matched_skills": ["Skill from list", "Another skill from list"]}}
+    Example: {"matched_skills": ["Skill from list", "Another skill from list"]}
     """
 
     try:
-        df = pd.read_csv(COURSES_FILE)
+        df = read_table(COURSES_FILE)
         pattern = '|'.join(RELEVANT_DEPARTMENTS)
         df_filtered = df[df['Program_and_Year'].str.contains(pattern, case=False, na=False)].head(NUM_SAMPLE_COURSES)
         print(f"Loaded {len(df_filtered)} sample courses for processing.")
@@ -91,9 +114,16 @@ def main():
         print(f"!!! FATAL ERROR loading or filtering data: {e}")
         return
 
+    courses_to_process = df_filtered.to_dict('records')
+    # Retrieval uses the title without its '*program' tags
+    titles = [str(c.get('Course_Title_EN') or '').split('*')[0].strip() for c in courses_to_process]
+    candidates_by_course = select_candidates(titles, master_skills)
+    full_list_tokens = estimate_tokens(", ".join(master_skills))
+    print(f"Offering {CANDIDATES_PER_COURSE} candidate skills per course instead of all {len(master_skills)} "
+          f"(~{full_list_tokens} prompt tokens).")
+
+    cache = get_cache()
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f_out:
-        courses_to_process = df_filtered.to_dict('records')
-        
         for i, course_record in enumerate(courses_to_process):
             course_title = course_record.get('Course_Title_EN')
             
@@ -101,24 +131,40 @@ def main():
                 print(f"   -> Skipped record {i+1} (invalid title).")
                 continue
 
-            print(f"-> Processing ({i+1}/{len(courses_to_process)}): {course_title}...")
+            candidates = candidates_by_course[i]
+            user_prompt = f"""Analyze this course: '{course_title}'
+
+    --- CANDIDATE SKILLS ---
+    {", ".join(candidates)}
+    --- END OF LIST ---"""
+            print(f"-> Processing ({i+1}/{len(courses_to_process)}): {course_title} "
+                  f"(~{estimate_tokens(system_prompt, user_prompt)} prompt tokens)...")
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+            params = {"temperature": 0.1, "response_format": "json_object"}
+
+            # Reuse the answer from an earlier run of the same prompt (replay mode never calls the API)
+            response_str = cache.get(MODEL_NAME, messages, params)
+            from_cache = response_str is not None
             
             try:
-                chat_completion = client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": f"Analyze this course: '{course_title}'"}
-                    ],
-                    model=MODEL_NAME,
-                    temperature=0.1,
-                    response_format={"type": "json_object"},
-                )
-                
-                # Safely extract response content
-                response_str = chat_completion.choices[0].message.content
+                if not from_cache:
+                    chat_completion = get_client().chat.completions.create(
+                        messages=messages,
+                        model=MODEL_NAME,
+                        temperature=0.1,
+                        response_format={"type": "json_object"},
+                    )
+                    
+                    # Safely extract response content
+                    response_str = chat_completion.choices[0].message.content
                 
-                # Safely parse the JSON response
-                skills = safe_json_parse(response_str, course_title)
+                # Safely parse the JSON response, keeping only skills that were offered
+                skills = [s for s in safe_json_parse(response_str, course_title) if s in candidates]
+                if skills and not from_cache:
+                    cache.put(MODEL_NAME, messages, params, response_str)
                 
                 course_record['matched_skills'] = skills
                 f_out.write(json.dumps(course_record) + '\n')
@@ -130,8 +176,10 @@ def main():
                 course_record['matched_skills'] = []
                 f_out.write(json.dumps(course_record) + '\n')
             
-            time.sleep(2) # Respect API rate limits
+            if not from_cache:
+                time.sleep(2) # Respect API rate limits
 
+    print(f"LLM cache: {cache.stats()}")
     print(f"\n✅ --- Finished! Seed data saved to '{OUTPUT_FILE}' ---")
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# Version of the on-disk layout, bump when the structure below changes
+STORE_FORMAT = 2
+
+
+def text_hash(text):
+    """Stable hash of the text a course was mapped from"""
+    return hashlib.sha256(str(text).encode('utf-8')).hexdigest()[:16]
+
+
+def vocabulary_version(skills, model_version=None):
+    """Order-independent version id of a skill vocabulary (and of the model that scored it)"""
+    digest = hashlib.sha256()
+    if model_version is not None:
+        digest.update(f"model:{model_version}\n".encode('utf-8'))
+    for skill in sorted(set(skills)):
+        digest.update(skill.encode('utf-8') + b'\n')
+    return digest.hexdigest()[:16]
+
+
+class MappingStore:
+    """
+    Per-course mapping cache for incremental remaps.
+
+    For every course key it records the hash of the text it was mapped from,
+    the version of the skill vocabulary and scoring model it was scored
+    against and its candidate skills as [skill, score] pairs (kept before thresholding so newly added
+    skills can be merged in later). Course embeddings can be stored next to
+    it so new skills are scored without re-encoding unchanged courses.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.embeddings_path = os.path.splitext(path)[0] + '_embeddings.npz'
+        self.skills = []
+        self.vocab_version = None
+        self.model_version = None
+        self.courses = {}
+        self.embeddings = {}
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == STORE_FORMAT:
+                self.skills = data.get('skills', [])
+                self.vocab_version = data.get('vocab_version')
+                self.model_version = data.get('model_version')
+                self.courses = data.get('courses', {})
+            else:
+                print(f"Mapping store format changed, ignoring '{self.path}'.")
+
+        if self.courses and os.path.exists(self.embeddings_path):
+            stored = np.load(self.embeddings_path, allow_pickle=False)
+            self.embeddings = dict(zip(stored['keys'].tolist(), stored['vectors']))
+        return self
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_file = self.path + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'format': STORE_FORMAT,
+                'vocab_version': self.vocab_version,
+                'model_version': self.model_version,
+                'skills': self.skills,
+                'courses': self.courses
+            }, f, ensure_ascii=False)
+        os.replace(tmp_file, self.path)
+
+        if self.embeddings:
+            keys = [k for k in self.courses if k in self.embeddings]
+            tmp_file = self.embeddings_path + '.tmp.npz'
+            np.savez(tmp_file, keys=np.array(keys), vectors=np.stack([self.embeddings[k] for k in keys]))
+            os.replace(tmp_file, self.embeddings_path)
+
+    def plan(self, course_texts, skills, needs_embedding=False, model_version=None):
+        """
+        Works out the minimum work for a rerun.
+
+        course_texts maps course key -> text. model_version identifies the
+        state the scores depend on (e.g. a fitted TF-IDF); when it differs
+        from the stored one every course is remapped. Returns (changed,
+        unchanged, added_skills): courses that must be fully remapped, courses
+        that only need the added skills scored against them, and the skills
+        that are new since the store was last written.
+        """
+        previous = set(self.skills)
+        current = set(skills)
+        added_skills = [s for s in skills if s not in previous]
+        removed_skills = previous - current
+        model_changed = model_version != self.model_version
+        if model_changed and self.courses:
+            print("Scoring model changed since the mapping store was written, remapping every course.")
+        self.model_version = model_version
+        self.vocab_version = vocabulary_version(skills, model_version)
+
+        changed, unchanged = [], []
+        for key, text in course_texts.items():
+            entry = self.courses.get(key)
+            if (entry is None or model_changed or entry['text_hash'] != text_hash(text)
+                    or (needs_embedding and key not in self.embeddings)
+                    or any(skill in removed_skills for skill, _ in entry['candidates'])):
+                changed.append(key)
+            else:
+                unchanged.append(key)
+
+        return changed, unchanged, added_skills
+
+    def put(self, key, text, candidates, embedding=None):
+        self.courses[key] = {
+            'text_hash': text_hash(text),
+            'vocab_version': self.vocab_version,
+            'candidates': [[skill, float(score)] for skill, score in candidates]
+        }
+        if embedding is not None:
+            self.embeddings[key] = np.asarray(embedding, dtype=np.float32)
+
+    def merge(self, key, new_candidates, top_k):
+        """Adds scores for newly added skills, keeping the best top_k candidates"""
+        merged = self.courses[key]['candidates'] + [[s, float(v)] for s, v in new_candidates]
+        merged.sort(key=lambda x: x[1], reverse=True)
+        self.courses[key]['candidates'] = merged[:top_k]
+        self.courses[key]['vocab_version'] = self.vocab_version
+
+    def candidates(self, key):
+        return self.courses[key]['candidates']
+
+    def finish(self, course_keys, skills):
+        """Stamps every course with the current vocabulary and drops courses that disappeared"""
+        keep = set(course_keys)
+        self.courses = {k: v for k, v in self.courses.items() if k in keep}
+        self.embeddings = {k: v for k, v in self.embeddings.items() if k in keep}
+        self.skills = list(skills)
+        self.vocab_version = vocabulary_version(skills, self.model_version)
+        for entry in self.courses.values():
+            entry['vocab_version'] = self.vocab_version
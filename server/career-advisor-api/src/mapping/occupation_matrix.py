@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from onet_store import load_onet_store, source_fingerprint, KINDS
+from skill_vocabulary import load_vocabulary, file_fingerprint
+
+# --- CONFIGURATION ---
+# Precomputed occupation x course affinity, so a career goal is answered with one row lookup:
+#   affinity = cosine(O . L, C)
+#   O  occupation x O*NET element   importance rescaled to 0..1 and squared, so core elements dominate
+#                                   (elements below MIN_IMPORTANCE dropped)
+#   L  O*NET element x course skill TF-IDF similarity of the names (top LINK_TOP_K above LINK_MIN_SIMILARITY)
+#   C  course x course skill        relevance from final_mapped_data.json, on canonical skill names
+# Each row keeps its TOP_COURSES best courses, scaled so the best one scores 1 and stored best first.
+#   python src/mapping/occupation_matrix.py [occupation title]
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+MAPPED_DATA_FILE = os.path.join(project_root, 'data', 'Processed', 'course_data', 'final_mapped_data.json')
+MATRIX_FILE = os.path.join(project_root, 'data', 'Processed', 'occupation_course_matrix.npz')
+
+ELEMENT_KINDS = ["skill", "knowledge", "ability", "work_activity", "task"]
+MIN_IMPORTANCE = 3.0       # O*NET importance is 1 (not important) to 5 (extremely important)
+LINK_MIN_SIMILARITY = 0.5
+LINK_TOP_K = 5
+TOP_COURSES = 200
+
+def load_course_skills(mapped_file=MAPPED_DATA_FILE, vocabulary=None):
+    """(courses [{code, name}], skill names, course x skill relevance matrix) from the mapped courses"""
+    with open(mapped_file, 'r', encoding='utf-8') as f:
+        mapped = json.load(f)
+
+    courses, skill_index = [], {}
+    rows, cols, values = [], [], []
+    for course in mapped:
+        row = len(courses)
+        courses.append({"code": course.get("code", ""), "name": course.get("name", "")})
+        for item in course.get("mapped_skills", []):
+            skill = vocabulary.canonical(item["skill"]) if vocabulary else item["skill"]
+            rows.append(row)
+            cols.append(skill_index.setdefault(skill, len(skill_index)))
+            values.append(float(item.get("relevance", 1.0)))
+
+    # Surface forms merged into one canonical skill keep their best relevance, not the sum
+    rows, cols = np.asarray(rows, dtype=np.int32), np.asarray(cols, dtype=np.int32)
+    values = np.asarray(values, dtype=np.float32)
+    order = np.lexsort((-values, cols, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+    matrix = sp.csr_matrix((values[first], (rows[first], cols[first])), shape=(len(courses), len(skill_index)))
+    return courses, list(skill_index), matrix
+
+def occupation_element_matrix(store, kinds=ELEMENT_KINDS, min_importance=MIN_IMPORTANCE):
+    """Occupation x element weights, (importance rescaled from 1..5 to 0..1)^2, straight from the store's CSR arrays"""
+    rows = np.repeat(np.arange(len(store.occupation_codes), dtype=np.int32), np.diff(store.indptr))
+    keep = (np.isin(store.element_kinds[store.rating_elements], [KINDS.index(k) for k in kinds]) &
+            (np.nan_to_num(store.importance, nan=0.0) >= min_importance))
+    weights = ((store.importance[keep] - 1.0) / 4.0) ** 2
+    return sp.csr_matrix((weights, (rows[keep], store.rating_elements[keep])),
+                         shape=(len(store.occupation_codes), len(store.element_ids)), dtype=np.float32)
+
+def element_skill_links(element_names, skill_names, min_similarity=LINK_MIN_SIMILARITY, top_k=LINK_TOP_K):
+    """Element x skill matrix keeping each element's top_k most similar skill names (TF-IDF cosine)"""
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), stop_words='english', sublinear_tf=True)
+    vectorizer.fit(list(element_names) + list(skill_names))
+    similarity = (vectorizer.transform(element_names) @ vectorizer.transform(skill_names).T).tocsr()
+    similarity.data[similarity.data < min_similarity] = 0
+    similarity.eliminate_zeros()
+    return top_k_per_row(similarity, top_k)
+
+def top_k_per_row(matrix, k, scale_to_best=False):
+    """CSR copy keeping the k largest entries of each row, sorted in descending order"""
+    matrix = matrix.tocsr()
+    indptr, indices, data = [0], [], []
+    for i in range(matrix.shape[0]):
+        start, end = matrix.indptr[i], matrix.indptr[i + 1]
+        row = matrix.data[start:end]
+        order = np.argsort(-row, kind='stable')[:k]
+        values = row[order]
+        if scale_to_best and len(values) and values[0] > 0:
+            values = values / values[0]
+        indices.append(matrix.indices[start:end][order])
+        data.append(values)
+        indptr.append(indptr[-1] + len(order))
+    return sp.csr_matrix((np.concatenate(data) if data else np.empty(0, dtype=matrix.dtype),
+                          np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+                          np.asarray(indptr)), shape=matrix.shape)
+
+def build_occupation_matrix(store, courses, skill_names, course_skills, top_courses=TOP_COURSES):
+    """Occupation x course affinity, each row cut to its top_courses and scaled to a best score of 1"""
+    element_mask = np.isin(store.element_kinds, [KINDS.index(k) for k in ELEMENT_KINDS])
+    linked = np.flatnonzero(element_mask)
+    links = element_skill_links(store.element_names[linked].tolist(), skill_names)
+    # Spread the link rows back onto all element ids (other kinds get empty rows)
+    placement = sp.csr_matrix((np.ones(len(linked), dtype=np.float32), (linked, np.arange(len(linked)))),
+                              shape=(len(store.element_ids), len(linked)))
+    element_links = placement @ links
+
+    occupation_skills = normalize(occupation_element_matrix(store) @ element_links)
+    affinity = (occupation_skills @ normalize(course_skills).T).tocsr().astype(np.float32)
+    affinity.eliminate_zeros()
+    # Kept best first: scipy operations such as astype would sort the column indices again
+    return top_k_per_row(affinity, top_courses, scale_to_best=True)
+
+def save_matrix(matrix, store, courses, fingerprint, path=MATRIX_FILE):
+    tmp_file = path + '.tmp.npz'
+    np.savez(tmp_file, data=matrix.data, indices=matrix.indices.astype(np.int32),
+             indptr=matrix.indptr.astype(np.int64), shape=np.asarray(matrix.shape),
+             occupation_codes=store.occupation_codes, occupation_titles=store.occupation_titles,
+             course_codes=np.asarray([c["code"] for c in courses], dtype=str),
+             course_names=np.asarray([c["name"] for c in courses], dtype=str),
+             fingerprint=np.asarray(fingerprint))
+    os.replace(tmp_file, path)
+
+class OccupationCourseMatrix:
+    """Loaded occupation x course matrix; recommend() is a dict lookup plus a slice of one row"""
+
+    def __init__(self, path=MATRIX_FILE):
+        with np.load(path, allow_pickle=False) as data:
+            self.data, self.indices, self.indptr = data["data"], data["indices"], data["indptr"]
+            self.occupation_codes = data["occupation_codes"].tolist()
+            self.occupation_titles = data["occupation_titles"].tolist()
+            self.course_codes = data["course_codes"].tolist()
+            self.course_names = data["course_names"].tolist()
+        self.occupation_index = {code: i for i, code in enumerate(self.occupation_codes)}
+        for i, title in enumerate(self.occupation_titles):
+            if title:
+                self.occupation_index.setdefault(title.lower(), i)
+
+    def occupation(self, code_or_title):
+        i = self.occupation_index.get(code_or_title)
+        if i is None:
+            i = self.occupation_index.get(str(code_or_title).strip().lower())
+        return i
+
+    def recommend(self, code_or_title, top_k=10):
+        """Top courses of an occupation (rows are stored best first), or None for an unknown occupation"""
+        i = self.occupation(code_or_title)
+        if i is None:
+            return None
+        start = self.indptr[i]
+        end = min(self.indptr[i + 1], start + top_k)
+        return [{"code": self.course_codes[j], "name": self.course_names[j], "score": round(float(s), 4)}
+                for j, s in zip(self.indices[start:end].tolist(), self.data[start:end].tolist())]
+
+def main():
+    if not os.path.exists(MAPPED_DATA_FILE):
+        print(f"!!! FATAL ERROR: Mapped course data not found at '{MAPPED_DATA_FILE}'.")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    store = load_onet_store()
+    if len(store.rating_elements) == 0:
+        print("!!! FATAL ERROR: No O*NET occupation ratings found (Skills.txt, Knowledge.txt, ... "
+              "in 'data/Raw/Data regarding occupation and position etc').")
+        sys.exit(1)
+    vocabulary = load_vocabulary()
+    courses, skill_names, course_skills = load_course_skills(vocabulary=vocabulary)
+    print(f"{len(store.occupation_codes)} occupations, {len(courses)} courses, {len(skill_names)} course skills")
+
+    matrix = build_occupation_matrix(store, courses, skill_names, course_skills)
+    fingerprint = f"{source_fingerprint()}:{file_fingerprint(MAPPED_DATA_FILE)}"
+    save_matrix(matrix, store, courses, fingerprint, MATRIX_FILE)
+    covered = int((np.diff(matrix.indptr) > 0).sum())
+    print(f"Built {matrix.shape[0]} x {matrix.shape[1]} matrix with {matrix.nnz} entries "
+          f"({covered} occupations with courses) in {time.perf_counter() - start:.2f}s -> '{MATRIX_FILE}'")
+
+    query = " ".join(sys.argv[1:])
+    if query:
+        recommender = OccupationCourseMatrix(MATRIX_FILE)
+        lookup_start = time.perf_counter()
+        recommendations = recommender.recommend(query, top_k=10)
+        print(f"\nCourses for '{query}' ({(time.perf_counter() - lookup_start) * 1e6:.0f} us):")
+        for course in recommendations or []:
+            print(f"   {course['code']} {course['name']} ({course['score']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import numpy as np
+
+# --- CONFIGURATION ---
+# Compact in-memory index of the O*NET database:
+#   elements     element id -> name and kind (skill, knowledge, ability, work activity, task, ...)
+#   occupations  O*NET-SOC code -> title
+#   ratings      occupation -> elements with importance (IM) and level (LV), in CSR layout
+# Files are streamed line by line and only the needed columns are split out; ids and names
+# are interned once. The arrays are cached in data/Processed/onet_store.npz and rebuilt
+# when a source file changes.
+#   python src/mapping/onet_store.py [occupation title]
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "../../"))
+RAW_DATA_PATH = os.path.join(PROJECT_ROOT, "data", "Raw", "Data regarding occupation and position etc")
+STORE_FILE = os.path.join(PROJECT_ROOT, "data", "Processed", "onet_store.npz")
+
+KINDS = ["skill", "knowledge", "ability", "work_activity", "work_context", "task", "interest"]
+
+OCCUPATION_FILE = ("Occupation Data.txt", "O*NET-SOC Code", "Title")
+
+# Occupation x element rating tables: (file, kind, element id column, element name column)
+RATING_FILES = [
+    ("Skills.txt", "skill", "Element ID", "Element Name"),
+    ("Knowledge.txt", "knowledge", "Element ID", "Element Name"),
+    ("Abilities.txt", "ability", "Element ID", "Element Name"),
+    ("Work Activities.txt", "work_activity", "Element ID", "Element Name"),
+    ("Task Ratings.txt", "task", "Task ID", "Task"),
+]
+RATING_SCALES = {"IM": "importance", "LV": "level"}
+
+# Element-to-element tables that only add names: (file, [(kind, id column, name column)])
+ELEMENT_FILES = [
+    ("Abilities to Work Activities.txt", [("ability", "Abilities Element ID", "Abilities Element Name"),
+                                          ("work_activity", "Work Activities Element ID", "Work Activities Element Name")]),
+    ("Skills to Work Context.txt", [("skill", "Skills Element ID", "Skills Element Name"),
+                                    ("work_context", "Work Context Element ID", "Work Context Element Name")]),
+    ("Basic Interests to RIASEC.txt", [("interest", "Basic Interests Element ID", "Basic Interests Element Name"),
+                                       ("interest", "RIASEC Element ID", "RIASEC Element Name")]),
+]
+
+def find_onet_file(filename, raw_dir=RAW_DATA_PATH):
+    """Path of an O*NET file in raw_dir or one of its subfolders, or None"""
+    for root, _, files in os.walk(raw_dir):
+        if filename in files:
+            return os.path.join(root, filename)
+    return None
+
+def iter_columns(filepath, columns):
+    """
+    Streams a tab-separated O*NET file, yielding a tuple with only the requested
+    columns of each row (no dict per row). Missing columns raise KeyError.
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        header = f.readline().rstrip('\r\n').split('\t')
+        indices = [header.index(c) if c in header else None for c in columns]
+        missing = [c for c, i in zip(columns, indices) if i is None]
+        if missing:
+            raise KeyError(f"{os.path.basename(filepath)} has no column(s) {missing}")
+        last = max(indices)
+        for line in f:
+            fields = line.rstrip('\r\n').split('\t', last + 1)
+            if len(fields) > last:
+                yield tuple(fields[i] for i in indices)
+
+class _Interner:
+    """Assigns consecutive indices to ids, keeping the first name seen for each"""
+
+    def __init__(self):
+        self.index = {}
+        self.ids = []
+        self.names = []
+        self.kinds = []
+
+    def add(self, key, name="", kind=0):
+        i = self.index.get(key)
+        if i is None:
+            i = self.index[key] = len(self.ids)
+            self.ids.append(sys.intern(key))
+            self.names.append(sys.intern(name))
+            self.kinds.append(kind)
+        elif name and not self.names[i]:
+            self.names[i] = sys.intern(name)
+        return i
+
+def source_fingerprint(raw_dir=RAW_DATA_PATH):
+    """Name, size and mtime of every O*NET file the store reads"""
+    names = [OCCUPATION_FILE[0]] + [f[0] for f in RATING_FILES] + [f[0] for f in ELEMENT_FILES]
+    parts = []
+    for name in names:
+        path = find_onet_file(name, raw_dir)
+        if path:
+            stat = os.stat(path)
+            parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1("\n".join(parts).encode('utf-8')).hexdigest()
+
+def build_onet_store(raw_dir=RAW_DATA_PATH):
+    """Reads the O*NET files under raw_dir into an OnetStore"""
+    occupations, elements = _Interner(), _Interner()
+    kind_codes = {kind: i for i, kind in enumerate(KINDS)}
+    rows, cols, importance, level = [], [], [], []
+    rating_slot = {}
+
+    path = find_onet_file(OCCUPATION_FILE[0], raw_dir)
+    if path:
+        for code, title in iter_columns(path, OCCUPATION_FILE[1:]):
+            occupations.add(code, title.strip())
+
+    for filename, kind, id_col, name_col in RATING_FILES:
+        path = find_onet_file(filename, raw_dir)
+        if not path:
+            continue
+        scale_values = {"importance": importance, "level": level}
+        for code, element_id, name, scale, value in iter_columns(
+                path, ["O*NET-SOC Code", id_col, name_col, "Scale ID", "Data Value"]):
+            field = RATING_SCALES.get(scale)
+            if field is None:
+                continue
+            occ = occupations.add(code)
+            # Task ids are numbers shared by no other table; the prefix keeps them apart from element ids
+            key = f"T{element_id}" if kind == "task" else element_id
+            el = elements.add(key, name.strip(), kind_codes[kind])
+            slot = rating_slot.get((occ, el))
+            if slot is None:
+                slot = rating_slot[(occ, el)] = len(rows)
+                rows.append(occ)
+                cols.append(el)
+                importance.append(np.nan)
+                level.append(np.nan)
+            try:
+                scale_values[field][slot] = float(value)
+            except ValueError:
+                pass
+
+    for filename, columns in ELEMENT_FILES:
+        path = find_onet_file(filename, raw_dir)
+        if not path:
+            continue
+        wanted = [c for _, id_col, name_col in columns for c in (id_col, name_col)]
+        for values in iter_columns(path, wanted):
+            for j, (kind, _, _) in enumerate(columns):
+                elements.add(values[2 * j], values[2 * j + 1].strip(), kind_codes[kind])
+
+    # CSR layout: the ratings of occupation i are rows indptr[i]:indptr[i + 1], by importance
+    rows = np.asarray(rows, dtype=np.int32)
+    cols = np.asarray(cols, dtype=np.int32)
+    importance = np.asarray(importance, dtype=np.float32)
+    level = np.asarray(level, dtype=np.float32)
+    order = np.lexsort((-np.nan_to_num(importance, nan=-1.0), rows))
+    indptr = np.zeros(len(occupations.ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(occupations.ids)), out=indptr[1:])
+
+    return OnetStore({
+        "occupation_codes": np.asarray(occupations.ids, dtype=str),
+        "occupation_titles": np.asarray(occupations.names, dtype=str),
+        "element_ids": np.asarray(elements.ids, dtype=str),
+        "element_names": np.asarray(elements.names, dtype=str),
+        "element_kinds": np.asarray(elements.kinds, dtype=np.uint8),
+        "indptr": indptr,
+        "rating_elements": cols[order],
+        "importance": importance[order],
+        "level": level[order],
+    })
+
+class OnetStore:
+    """Array-backed O*NET index with O(1) occupation and element lookups"""
+
+    ARRAYS = ["occupation_codes", "occupation_titles", "element_ids", "element_names", "element_kinds",
+              "indptr", "rating_elements", "importance", "level"]
+
+    def __init__(self, arrays):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.occupation_index = {code: i for i, code in enumerate(self.occupation_codes.tolist())}
+        self.title_index = {}
+        for i, title in enumerate(self.occupation_titles.tolist()):
+            if title:
+                self.title_index.setdefault(title.lower(), i)
+        self.element_index = {eid: i for i, eid in enumerate(self.element_ids.tolist())}
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def element_name(self, element_id):
+        i = self.element_index.get(element_id)
+        return str(self.element_names[i]) if i is not None else None
+
+    def element_names_of_kind(self, *kinds):
+        """Names of every element of the given kinds (all kinds when none are given)"""
+        mask = np.ones(len(self.element_ids), dtype=bool)
+        if kinds:
+            mask = np.isin(self.element_kinds, [KINDS.index(k) for k in kinds])
+        return [name for name in self.element_names[mask].tolist() if name]
+
+    def occupation(self, code_or_title):
+        """Row of an occupation by O*NET-SOC code or (case-insensitive) title, else None"""
+        i = self.occupation_index.get(code_or_title)
+        if i is None:
+            i = self.title_index.get(str(code_or_title).strip().lower())
+        return i
+
+    def occupation_ratings(self, code_or_title, kinds=None, min_importance=None):
+        """
+        (element indices, importance, level) arrays of one occupation, most
+        important first, optionally restricted to some kinds and an importance floor.
+        """
+        i = self.occupation(code_or_title)
+        if i is None:
+            empty = np.empty(0, dtype=np.float32)
+            return np.empty(0, dtype=np.int32), empty, empty
+        start, end = self.indptr[i], self.indptr[i + 1]
+        elements = self.rating_elements[start:end]
+        importance, level = self.importance[start:end], self.level[start:end]
+        mask = np.ones(len(elements), dtype=bool)
+        if kinds:
+            mask &= np.isin(self.element_kinds[elements], [KINDS.index(k) for k in kinds])
+        if min_importance is not None:
+            mask &= importance >= min_importance
+        return elements[mask], importance[mask], level[mask]
+
+    def occupation_elements(self, code_or_title, kinds=None, min_importance=None, top_k=None):
+        """[{"id", "name", "kind", "importance", "level"}] of one occupation, most important first"""
+        elements, importance, level = self.occupation_ratings(code_or_title, kinds, min_importance)
+        if top_k is not None:
+            elements, importance, level = elements[:top_k], importance[:top_k], level[:top_k]
+        return [{
+            "id": str(self.element_ids[e]),
+            "name": str(self.element_names[e]),
+            "kind": KINDS[self.element_kinds[e]],
+            "importance": None if np.isnan(imp) else round(float(imp), 2),
+            "level": None if np.isnan(lv) else round(float(lv), 2),
+        } for e, imp, lv in zip(elements.tolist(), importance.tolist(), level.tolist())]
+
+    def save(self, path=STORE_FILE, fingerprint=""):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_file = path + '.tmp.npz'
+        np.savez(tmp_file, fingerprint=np.asarray(fingerprint), **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp_file, path)
+
+def load_onet_store(raw_dir=RAW_DATA_PATH, store_file=STORE_FILE):
+    """Loads the cached store, rebuilding it first when the O*NET files changed"""
+    fingerprint = source_fingerprint(raw_dir)
+    if os.path.exists(store_file):
+        with np.load(store_file, allow_pickle=False) as data:
+            if str(data["fingerprint"]) == fingerprint:
+                return OnetStore({name: data[name] for name in OnetStore.ARRAYS})
+
+    store = build_onet_store(raw_dir)
+    store.save(store_file, fingerprint)
+    return store
+
+def main():
+    start = time.perf_counter()
+    if os.path.exists(STORE_FILE):
+        os.remove(STORE_FILE)
+    store = load_onet_store()
+    print(f"Built O*NET store in {time.perf_counter() - start:.2f}s: {len(store.occupation_codes)} occupations, "
+          f"{len(store.element_ids)} elements, {len(store.rating_elements)} ratings, "
+          f"{store.nbytes / 1e6:.1f} MB of arrays.")
+    for kind in KINDS:
+        count = int((store.element_kinds == KINDS.index(kind)).sum())
+        if count:
+            print(f"   {kind}: {count}")
+
+    start = time.perf_counter()
+    load_onet_store()
+    print(f"Loaded from '{STORE_FILE}' in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    query = " ".join(sys.argv[1:]) or (str(store.occupation_titles[0]) if len(store.occupation_titles) else "")
+    if query:
+        print(f"\nTop skills for '{query}':")
+        for element in store.occupation_elements(query, kinds=["skill", "knowledge"], top_k=10):
+            print(f"   {element['name']} ({element['kind']}, importance {element['importance']})")
+
+if __name__ == "__main__":
+    main()
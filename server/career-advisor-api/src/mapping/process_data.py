@@ -1,5 +1,5 @@
-import csv
 import os
+from onet_store import find_onet_file, iter_columns
 
 # --- CORRECTED PATHS (relative to project root) ---
 RAW_DATA_PATH = "data/Raw/Data regarding occupation and position etc"
@@ -19,18 +19,17 @@ def main():
     master_set = set()
 
     for filename, column_name in FILES_TO_PROCESS.items():
-        filepath = os.path.join(RAW_DATA_PATH, filename)
+        # Files may sit in a subfolder of the O*NET export (e.g. 'Important/')
+        filepath = find_onet_file(filename, RAW_DATA_PATH) or os.path.join(RAW_DATA_PATH, filename)
         
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f, delimiter='\t')
-                count = 0
-                for row in reader:
-                    item = row.get(column_name)
-                    if item and item.strip():
-                        master_set.add(item.strip())
-                        count += 1
-                print(f"-> Extracted {count} items from '{filename}'")
+            count = 0
+            # Only the needed column is split out of each line
+            for (item,) in iter_columns(filepath, [column_name]):
+                if item.strip():
+                    master_set.add(item.strip())
+                    count += 1
+            print(f"-> Extracted {count} items from '{filename}'")
         except FileNotFoundError:
             print(f"WARNING: File not found at '{filepath}'. Skipping.")
         except Exception as e:
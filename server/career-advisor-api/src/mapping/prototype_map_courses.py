@@ -1,23 +1,29 @@
 import os
-import pandas as pd
+import sys
 import json
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import re
 
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+from table_io import read_table
+from incremental_tfidf import load_incremental_tfidf
+from skill_index import load_or_build_skill_index
+
 # --- CONFIGURATION ---
 # Paths are relative to the project root (where you run the script)
 COURSES_FILE = "data/Processed/course_data/cleaned_course_data.csv"
 MASTER_SKILLS_FILE = "data/Processed/generated_master_skills.txt"
 OUTPUT_FILE = "data/Processed/prototype_course_skills.jsonl"
+TFIDF_STATE_FILE = "data/Processed/tfidf_state_prototype.joblib"
+# Top-k search over the skill vectors (SKILL_INDEX_MODE=approximate: pruned postings, see src/utils/skill_index.py)
+SKILL_INDEX_FILE = "data/Processed/skill_index_prototype.npz"
 
 # Number of top skills to take from the master list for matching
 # We use a smaller set for a prototype to keep it fast
 TOP_K_SKILLS = 5000 
-# Number of sample courses to process
-NUM_SAMPLE_COURSES = 100
 # The similarity threshold for a skill to be "matched"
 SIMILARITY_THRESHOLD = 0.1 # Lower threshold for TF-IDF
+# Keep at most this many (highest scoring) skills per course
+MAX_SKILLS_PER_COURSE = 20
 
 # Filter for relevant departments
 RELEVANT_DEPARTMENTS = [
@@ -50,17 +56,17 @@ def main():
 
     # 2. Load and Filter Courses
     try:
-        df_courses = pd.read_csv(COURSES_FILE)
+        df_courses = read_table(COURSES_FILE)
         pattern = '|'.join(RELEVANT_DEPARTMENTS)
-        # Filter for relevant departments and take the first N samples
-        df_filtered = df_courses[df_courses['Program_and_Year'].str.contains(pattern, case=False, na=False)].head(NUM_SAMPLE_COURSES)
+        # Filter for relevant departments (the whole catalogue is mapped in one batch)
+        df_filtered = df_courses[df_courses['Program_and_Year'].str.contains(pattern, case=False, na=False)].copy()
         
         # Combine English and Chinese titles for more keywords
         df_filtered['course_text'] = df_filtered['Course_Title_EN'].apply(clean_text) + " " + \
                                      df_filtered['Course_Title_CN'].apply(clean_text)
         
         courses_to_process = df_filtered.to_dict('records')
-        print(f"Loaded and filtered {len(courses_to_process)} sample courses.")
+        print(f"Loaded and filtered {len(courses_to_process)} courses.")
     except FileNotFoundError:
         print(f"!!! FATAL ERROR: Courses file not found at '{COURSES_FILE}'.")
         return
@@ -69,45 +75,47 @@ def main():
         return
 
     # 3. Setup TF-IDF Vectorizer
-    print("Fitting TF-IDF vectorizer...")
-    # We fit the vectorizer ONCE on our entire "vocabulary" (all skills + all course text)
+    print("Updating TF-IDF vectorizer...")
+    # The corpus is all skills + all course text. The stored term counts of the previous run are synced
+    # with it (only added or changed texts are tokenized), which gives the same vectors as a full refit
     all_text = [clean_text(s) for s in master_skills] + [c['course_text'] for c in courses_to_process]
-    vectorizer = TfidfVectorizer()
-    vectorizer.fit(all_text)
+    vectorizer = load_incremental_tfidf(TFIDF_STATE_FILE)
+    added, removed = vectorizer.sync(all_text)
+    if added or removed:
+        vectorizer.save(TFIDF_STATE_FILE)
+    print(f"TF-IDF corpus: {added} texts added, {removed} removed.")
 
     # Vectorize the master skills list
     skill_vectors = vectorizer.transform([clean_text(s) for s in master_skills])
+    skill_index = load_or_build_skill_index(SKILL_INDEX_FILE, skill_vectors)
     print("Skills list vectorized.")
 
-    # 4. Process Courses and Map Skills
+    # 4. Map all courses in one batch
+    # TfidfVectorizer rows are L2-normalised, so the sparse dot product is the cosine similarity
+    course_vectors = vectorizer.transform([c['course_text'] for c in courses_to_process])
+    hits = skill_index.search(course_vectors, MAX_SKILLS_PER_COURSE)
+    print(f"Searched {len(master_skills)} skills for {len(hits)} courses.")
+
+    total_matches = 0
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f_out:
         for i, course in enumerate(courses_to_process):
-            print(f"Processing course {i+1}/{len(courses_to_process)}: {course.get('Course_Title_EN', 'N/A')}...")
-            
             if not course['course_text']:
                 continue
-            
-            # Vectorize the single course's text
-            course_vector = vectorizer.transform([course['course_text']])
-            
-            # Calculate cosine similarity between this one course and ALL skills
-            similarity_scores = cosine_similarity(course_vector, skill_vectors)[0] # Get the first (and only) row
-            
-            # Find skills that meet the threshold
-            matched_skills = []
-            for j, score in enumerate(similarity_scores):
-                if score > SIMILARITY_THRESHOLD:
-                    matched_skills.append(master_skills[j])
-            
+
+            # Each course keeps its best skills above the threshold
+            matched_skills = [master_skills[m['corpus_id']] for m in hits[i] if m['score'] > SIMILARITY_THRESHOLD]
+            total_matches += len(matched_skills)
+
             # Save the result
             course_output = course.copy()
             course_output['matched_skills'] = matched_skills
             # Delete the temporary text field
             if 'course_text' in course_output:
                 del course_output['course_text']
-            
+
             f_out.write(json.dumps(course_output) + '\n')
-            print(f"   -> Found {len(matched_skills)} skills.")
+
+    print(f"Mapped {len(courses_to_process)} courses, {total_matches} skills in total.")
 
     print(f"\n✅ --- Success! Prototype mapping data saved to '{OUTPUT_FILE}' ---")
 
@@ -1,24 +1,288 @@
 import json
-from sentence_transformers import SentenceTransformer, util
+import sys
+import hashlib
+import numpy as np
 import os
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(os.path.join(project_root, 'src', 'models'))
+sys.path.append(os.path.join(project_root, 'src', 'utils'))
+
+from encoder import load_encoder
+from mapping_store import MappingStore
+from skill_vocabulary import load_canonical_skills
+from skill_index import load_or_build_skill_index, build_skill_index, SKILL_INDEX_MODE
 
 INPUT_COURSES_FILE = os.path.join(project_root, 'data', 'Processed', 'course_data', 'courses_with_descriptions.json')
 SKILLS_FILE = os.path.join(project_root, 'data', 'Processed', 'generated_master_skills.txt')
+# Surface-form variants of a skill (".NET" / ".Net") are collapsed into one canonical skill
+VOCABULARY_FILE = os.path.join(project_root, 'data', 'Processed', 'skill_vocabulary.json')
 OUTPUT_FILE = os.path.join(project_root, 'data', 'Processed', 'course_data', 'final_mapped_data.json')
 
-def load_skills_from_txt(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        skills = [line.strip() for line in f if line.strip()]
-    return skills
+# 'sentence-transformers', 'onnx' or 'torchscript' (see src/models/encoder.py)
+ENCODER_BACKEND = os.getenv('ENCODER_BACKEND', 'sentence-transformers')
+ENCODER_THREADS = int(os.getenv('ENCODER_THREADS', '0')) or None
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# --- Streaming mode (python run_mapping.py --stream) ---
+# Courses are encoded CHUNK_SIZE at a time and appended to the JSONL file as they finish
+CHUNK_SIZE = 256
+STREAM_OUTPUT_FILE = os.path.join(project_root, 'data', 'Processed', 'course_data', 'final_mapped_data.jsonl')
+STREAM_PROGRESS_FILE = os.path.join(project_root, 'data', 'Processed', 'course_data', 'final_mapped_data_progress.json')
+# Embeddings, skill list and fingerprint in one file, so they are always replaced together
+SKILL_EMBEDDINGS_CACHE = os.path.join(project_root, 'data', 'Processed', 'skill_embeddings.npz')
+# Top-k search over the skill embeddings; SKILL_INDEX_MODE=approximate uses a saved IVF index (see src/utils/skill_index.py)
+SKILL_INDEX_FILE = os.path.join(project_root, 'data', 'Processed', 'skill_index_sbert.npz')
+
+# --- Incremental mode (python run_mapping.py --incremental) ---
+# Only courses whose text changed are re-encoded; added skills are scored against stored course embeddings
+MAPPING_STORE_FILE = os.path.join(project_root, 'data', 'Processed', 'course_data', 'mapping_store.json')
+
+TOP_K_CANDIDATES = 10
+MIN_RELEVANCE = 0.3
+MAX_SKILLS_PER_COURSE = 5
+
+def load_skills(file_path):
+    """Canonical skill names for the master skills file (see skill_vocabulary.py)"""
+    return load_canonical_skills(file_path, VOCABULARY_FILE)
+
+def select_skills(hit, skills_list):
+    """Turns one skill index hit list into the final mapped_skills entry"""
+    return select_candidates([(skills_list[match['corpus_id']], match['score']) for match in hit])
+
+def select_candidates(candidates):
+    """Applies the relevance threshold and per-course cap to (skill, score) candidates"""
+    mapped_skills = []
+
+    for skill_name, score in candidates:
+        if score > MIN_RELEVANCE:
+            mapped_skills.append({
+                "skill": skill_name,
+                "relevance": round(float(score), 4)
+            })
+
+    mapped_skills.sort(key=lambda x: x['relevance'], reverse=True)
+    return mapped_skills[:MAX_SKILLS_PER_COURSE]
+
+def course_key(course, index):
+    return course.get('code') or f"#{index}"
+
+def course_text(course):
+    return f"{course['name']}. {course['description']}"
+
+def encoder_version():
+    """Identifies the encoder the embeddings come from; embeddings of different encoders are not comparable"""
+    return f"{MODEL_NAME}|{ENCODER_BACKEND}"
+
+def skills_fingerprint(skills_list):
+    digest = hashlib.sha256()
+    digest.update(f"{encoder_version()}\n".encode('utf-8'))
+    for skill in skills_list:
+        digest.update(skill.encode('utf-8') + b'\n')
+    return digest.hexdigest()
+
+def courses_fingerprint(courses):
+    """Hash of the course records (their texts and the fields copied to the output), in order"""
+    digest = hashlib.sha256()
+    for course in courses:
+        digest.update(course_text(course).encode('utf-8') + b'\n')
+        digest.update(json.dumps(course, sort_keys=True, ensure_ascii=False).encode('utf-8') + b'\n')
+    return digest.hexdigest()
+
+def load_or_encode_skill_embeddings(model, skills_list):
+    """Returns the skill embedding matrix, encoding only skills that are not cached yet"""
+    fingerprint = skills_fingerprint(skills_list)
+    cached = {}
+
+    if os.path.exists(SKILL_EMBEDDINGS_CACHE):
+        stored = np.load(SKILL_EMBEDDINGS_CACHE, allow_pickle=False)
+        if str(stored['fingerprint']) == fingerprint:
+            print(f"Using cached skill embeddings: {SKILL_EMBEDDINGS_CACHE}")
+            return stored['embeddings'], fingerprint
+        if str(stored['encoder']) == encoder_version() and len(stored['skills']) == len(stored['embeddings']):
+            cached = dict(zip(stored['skills'].tolist(), stored['embeddings']))
+
+    missing = [s for s in skills_list if s not in cached]
+    print(f"Encoding {len(missing)} skills into vectors ({len(skills_list) - len(missing)} cached)...")
+    if missing:
+        new_embeddings = model.encode(missing, convert_to_tensor=False, show_progress_bar=True)
+        cached.update(zip(missing, np.asarray(new_embeddings, dtype=np.float32)))
+    embeddings = np.stack([cached[s] for s in skills_list]).astype(np.float32)
+
+    tmp_file = SKILL_EMBEDDINGS_CACHE + '.tmp.npz'
+    np.savez(tmp_file, embeddings=embeddings, skills=np.array(skills_list),
+             fingerprint=np.array(fingerprint), encoder=np.array(encoder_version()))
+    os.replace(tmp_file, SKILL_EMBEDDINGS_CACHE)
+
+    return embeddings, fingerprint
+
+def load_stream_progress(fingerprint, total_courses):
+    """Returns (completed_chunks, byte_offset) of a previous run with the same inputs"""
+    if not (os.path.exists(STREAM_PROGRESS_FILE) and os.path.exists(STREAM_OUTPUT_FILE)):
+        return 0, 0
+
+    with open(STREAM_PROGRESS_FILE, 'r', encoding='utf-8') as f:
+        progress = json.load(f)
+
+    if (progress.get('fingerprint') != fingerprint or progress.get('chunk_size') != CHUNK_SIZE
+            or progress.get('total_courses') != total_courses):
+        print("Skills, chunk size or courses changed. Starting over.")
+        return 0, 0
+
+    return progress['completed_chunks'], progress['offset']
+
+def save_stream_progress(fingerprint, total_courses, completed_chunks, offset):
+    tmp_file = STREAM_PROGRESS_FILE + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'fingerprint': fingerprint,
+            'chunk_size': CHUNK_SIZE,
+            'total_courses': total_courses,
+            'completed_chunks': completed_chunks,
+            'offset': offset
+        }, f)
+    os.replace(tmp_file, STREAM_PROGRESS_FILE)
+
+def export_jsonl_to_json(jsonl_file, json_file):
+    """Writes the JSON array consumers expect, one record at a time"""
+    with open(jsonl_file, 'r', encoding='utf-8') as f_in, open(json_file, 'w', encoding='utf-8') as f_out:
+        f_out.write('[\n')
+        first = True
+        for line in f_in:
+            if not line.strip():
+                continue
+            if not first:
+                f_out.write(',\n')
+            f_out.write(line.rstrip('\n'))
+            first = False
+        f_out.write('\n]\n')
+
+def main_streaming():
+    print("Starting course-skill mapping process (streaming)...")
+
+    for path, label in [(INPUT_COURSES_FILE, "Courses"), (SKILLS_FILE, "Skills")]:
+        if not os.path.exists(path):
+            print(f"Error: {label} file not found!")
+            return
+
+    with open(INPUT_COURSES_FILE, 'r', encoding='utf-8') as f:
+        courses_data = json.load(f)
+    skills_list = load_skills(SKILLS_FILE)
+    total_courses = len(courses_data)
+    total_chunks = (total_courses + CHUNK_SIZE - 1) // CHUNK_SIZE
+    print(f"Loaded {total_courses} courses and {len(skills_list)} skills.")
+
+    print(f"Loading SBERT model ({ENCODER_BACKEND})...")
+    model = load_encoder(ENCODER_BACKEND, MODEL_NAME, num_threads=ENCODER_THREADS)
+
+    skill_embeddings, fingerprint = load_or_encode_skill_embeddings(model, skills_list)
+    skill_index = load_or_build_skill_index(SKILL_INDEX_FILE, skill_embeddings)
+    # Exact and approximate search give different candidates, so a run is not resumed across modes;
+    # edited course texts (same count) must not be resumed either
+    fingerprint = f"{fingerprint}|{SKILL_INDEX_MODE}|{courses_fingerprint(courses_data)}"
+
+    start_chunk, offset = load_stream_progress(fingerprint, total_courses)
+    if start_chunk:
+        print(f"Resuming after chunk {start_chunk}/{total_chunks}...")
+
+    mode = 'r+' if start_chunk else 'w'
+    total_mappings = 0
+    with open(STREAM_OUTPUT_FILE, mode, encoding='utf-8') as f_out:
+        # Drop anything written after the last completed chunk
+        f_out.seek(offset)
+        f_out.truncate()
+
+        for chunk_idx in range(start_chunk, total_chunks):
+            chunk = courses_data[chunk_idx * CHUNK_SIZE:(chunk_idx + 1) * CHUNK_SIZE]
+            course_texts = [course_text(c) for c in chunk]
+            course_embeddings = model.encode(course_texts, convert_to_tensor=True)
+
+            hits = skill_index.search(course_embeddings, TOP_K_CANDIDATES)
+
+            for course, hit in zip(chunk, hits):
+                course['mapped_skills'] = select_skills(hit, skills_list)
+                total_mappings += len(course['mapped_skills'])
+                f_out.write(json.dumps(course, ensure_ascii=False) + '\n')
+
+            f_out.flush()
+            os.fsync(f_out.fileno())
+            save_stream_progress(fingerprint, total_courses, chunk_idx + 1, f_out.tell())
+            print(f"   Chunk {chunk_idx + 1}/{total_chunks} done ({len(chunk)} courses).")
+
+    print(f"Saving results to: {OUTPUT_FILE}")
+    export_jsonl_to_json(STREAM_OUTPUT_FILE, OUTPUT_FILE)
+    os.remove(STREAM_PROGRESS_FILE)
+
+    print("Mapping completed!")
+    print(f"Total courses: {total_courses}")
+    print(f"Total skills: {len(skills_list)}")
+    print(f"Skills mapped in this run: {total_mappings}")
+
+def main_incremental():
+    print("Starting course-skill mapping process (incremental)...")
+
+    for path, label in [(INPUT_COURSES_FILE, "Courses"), (SKILLS_FILE, "Skills")]:
+        if not os.path.exists(path):
+            print(f"Error: {label} file not found!")
+            return
+
+    with open(INPUT_COURSES_FILE, 'r', encoding='utf-8') as f:
+        courses_data = json.load(f)
+    skills_list = load_skills(SKILLS_FILE)
+
+    texts = {course_key(c, i): course_text(c) for i, c in enumerate(courses_data)}
+    store = MappingStore(MAPPING_STORE_FILE).load()
+    # Stored candidates and course embeddings are only reused with the encoder and search mode that made them
+    changed, unchanged, added_skills = store.plan(texts, skills_list, needs_embedding=True,
+                                                  model_version=f"{encoder_version()}|{SKILL_INDEX_MODE}")
+    print(f"{len(changed)} courses to remap, {len(unchanged)} unchanged, {len(added_skills)} new skills.")
+
+    if changed or added_skills:
+        print(f"Loading SBERT model ({ENCODER_BACKEND})...")
+        model = load_encoder(ENCODER_BACKEND, MODEL_NAME, num_threads=ENCODER_THREADS)
+        skill_embeddings, _ = load_or_encode_skill_embeddings(model, skills_list)
+        skill_positions = {skill: i for i, skill in enumerate(skills_list)}
+
+        if changed:
+            print("Remapping changed courses...")
+            course_embeddings = model.encode([texts[k] for k in changed], convert_to_tensor=True)
+            skill_index = load_or_build_skill_index(SKILL_INDEX_FILE, skill_embeddings)
+            hits = skill_index.search(course_embeddings, TOP_K_CANDIDATES)
+            for key, embedding, hit in zip(changed, course_embeddings, hits):
+                candidates = [(skills_list[m['corpus_id']], m['score']) for m in hit]
+                store.put(key, texts[key], candidates, embedding=embedding.numpy())
+
+        if unchanged and added_skills:
+            print("Scoring new skills against unchanged courses...")
+            # The added skills are few, so they are searched exactly
+            added_index = build_skill_index(skill_embeddings[[skill_positions[s] for s in added_skills]], "exact")
+            stored_embeddings = np.stack([store.embeddings[k] for k in unchanged])
+            hits = added_index.search(stored_embeddings, TOP_K_CANDIDATES)
+            for key, hit in zip(unchanged, hits):
+                store.merge(key, [(added_skills[m['corpus_id']], m['score']) for m in hit], TOP_K_CANDIDATES)
+
+    store.finish(texts.keys(), skills_list)
+    store.save()
+
+    final_output = []
+    for i, course in enumerate(courses_data):
+        course['mapped_skills'] = select_candidates(store.candidates(course_key(course, i)))
+        final_output.append(course)
+
+    print(f"Saving results to: {OUTPUT_FILE}")
+    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(final_output, f, indent=2, ensure_ascii=False)
+
+    print("Mapping completed!")
+    print(f"Total courses: {len(final_output)}")
+    print(f"Total skills: {len(skills_list)}")
 
 def main():
     print("Starting course-skill mapping process...")
-    
-    print("Loading SBERT model...")
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+
+    print(f"Loading SBERT model ({ENCODER_BACKEND})...")
+    model = load_encoder(ENCODER_BACKEND, MODEL_NAME, num_threads=ENCODER_THREADS)
 
     print("Reading courses file...")
     if not os.path.exists(INPUT_COURSES_FILE):
@@ -27,45 +291,32 @@ def main():
 
     with open(INPUT_COURSES_FILE, 'r', encoding='utf-8') as f:
         courses_data = json.load(f)
-    
+
     print(f"Loaded {len(courses_data)} courses.")
 
     if not os.path.exists(SKILLS_FILE):
         print("Error: Skills file not found!")
         return
-    
-    skills_list = load_skills_from_txt(SKILLS_FILE)
+
+    skills_list = load_skills(SKILLS_FILE)
     print(f"Loaded {len(skills_list)} skills.")
 
     print("Encoding skills into vectors...")
-    skill_embeddings = model.encode(skills_list, convert_to_tensor=True, show_progress_bar=True)
+    skill_embeddings = model.encode(skills_list, convert_to_tensor=False, show_progress_bar=True)
+    skill_index = load_or_build_skill_index(SKILL_INDEX_FILE, np.asarray(skill_embeddings, dtype=np.float32))
 
     print("Encoding courses into vectors...")
-    course_texts = [f"{c['name']}. {c['description']}" for c in courses_data]
+    course_texts = [course_text(c) for c in courses_data]
     course_embeddings = model.encode(course_texts, convert_to_tensor=True, show_progress_bar=True)
 
     print("Mapping courses to skills...")
-    hits = util.semantic_search(course_embeddings, skill_embeddings, top_k=10)
+    hits = skill_index.search(course_embeddings, TOP_K_CANDIDATES)
 
     final_output = []
-    
+
     for i, hit in enumerate(hits):
         course = courses_data[i]
-        mapped_skills = []
-        
-        for match in hit:
-            score = match['score']
-            if score > 0.3:
-                skill_name = skills_list[match['corpus_id']]
-                mapped_skills.append({
-                    "skill": skill_name,
-                    "relevance": round(float(score), 4)
-                })
-        
-        mapped_skills.sort(key=lambda x: x['relevance'], reverse=True)
-        mapped_skills = mapped_skills[:5]
-        
-        course['mapped_skills'] = mapped_skills
+        course['mapped_skills'] = select_skills(hit, skills_list)
         final_output.append(course)
 
     print(f"Saving results to: {OUTPUT_FILE}")
@@ -74,11 +325,16 @@ def main():
 
     total_mappings = sum(len(course['mapped_skills']) for course in final_output)
     avg_mappings = total_mappings / len(final_output)
-    
+
     print("Mapping completed!")
     print(f"Total courses: {len(final_output)}")
     print(f"Total skills: {len(skills_list)}")
     print(f"Average skills per course: {avg_mappings:.2f}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if '--stream' in sys.argv:
+        main_streaming()
+    elif '--incremental' in sys.argv:
+        main_incremental()
+    else:
+        main()
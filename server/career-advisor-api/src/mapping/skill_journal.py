@@ -0,0 +1,92 @@
+import os
+import atexit
+
+class SkillJournal:
+    """
+    Append-only log of newly discovered skills next to the sorted master file.
+
+    add() only appends the skills that are new; the journal is fsynced every
+    `fsync_every` new skills and folded into the sorted master file every
+    `compact_every` new skills and at exit. A crash loses at most the skills
+    that were not fsynced yet, and a torn last line is ignored on replay.
+    """
+
+    def __init__(self, master_file, journal_file=None, fsync_every=50, compact_every=2000):
+        self.master_file = master_file
+        self.journal_file = journal_file or master_file + '.journal'
+        self.fsync_every = fsync_every
+        self.compact_every = compact_every
+        self.skills = set()
+        self.unsynced = 0
+        self.journal_entries = 0
+        self.journal = None
+        self.closed = False
+
+    def load(self):
+        """Reads the master file, replays the journal and opens it for appending"""
+        if os.path.exists(self.master_file):
+            with open(self.master_file, 'r', encoding='utf-8') as f:
+                self.skills.update(line.strip() for line in f if line.strip())
+
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'rb+') as f:
+                data = f.read()
+                # A last line without its newline was cut off by a crash; drop it so appends start clean
+                complete = data[:data.rfind(b'\n') + 1]
+                if len(complete) < len(data):
+                    f.truncate(len(complete))
+            for line in complete.decode('utf-8').splitlines():
+                if line.strip():
+                    self.skills.add(line.strip())
+                    self.journal_entries += 1
+
+        os.makedirs(os.path.dirname(self.journal_file) or '.', exist_ok=True)
+        self.journal = open(self.journal_file, 'a', encoding='utf-8')
+        atexit.register(self.close)
+        return self.skills
+
+    def add(self, skills):
+        """Records the skills, returning how many of them were new"""
+        new_skills = {s.strip() for s in skills if s and s.strip()} - self.skills
+        for skill in sorted(new_skills):
+            self.journal.write(skill + '\n')
+        self.skills.update(new_skills)
+        self.unsynced += len(new_skills)
+        self.journal_entries += len(new_skills)
+
+        if self.unsynced >= self.fsync_every:
+            self.sync()
+        if self.journal_entries >= self.compact_every:
+            self.compact()
+        return len(new_skills)
+
+    def sync(self):
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.unsynced = 0
+
+    def compact(self):
+        """Rewrites the sorted master file atomically, then empties the journal"""
+        self.sync()
+        tmp_file = self.master_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for skill in sorted(self.skills):
+                f.write(skill + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.master_file)
+
+        # If we crash before this truncate, the journal is replayed into a set that already has it
+        self.journal.seek(0)
+        self.journal.truncate()
+        self.sync()
+        self.journal_entries = 0
+
+    def close(self):
+        if self.closed or self.journal is None:
+            return
+        self.compact()
+        self.journal.close()
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self.closed = True
@@ -0,0 +1,259 @@
+import os
+import re
+import sys
+import json
+import hashlib
+from collections import Counter
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# --- CONFIGURATION ---
+# Canonical skill vocabulary built from generated_master_skills.txt:
+#   1. surface forms are normalized (case, quotes, separators, spacing around brackets)
+#   2. character 3-gram neighbours of each normalized form are checked for plural,
+#      spacing and one-letter spelling variants, and merged with union-find
+#   3. each group is named after its most used surface form (see _preferred_name)
+# The result maps every surface form to one canonical skill id and name.
+#   python src/mapping/skill_vocabulary.py
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+MASTER_SKILLS_FILE = os.path.join(project_root, 'data', 'Processed', 'generated_master_skills.txt')
+VOCABULARY_FILE = os.path.join(project_root, 'data', 'Processed', 'skill_vocabulary.json')
+
+NGRAM_THRESHOLD = 0.75   # Char 3-gram cosine above which two forms are checked for being variants
+CHUNK_SIZE = 2000        # Rows of the similarity matrix computed at a time
+MIN_TYPO_LENGTH = 8      # Shorter tokens must match exactly (Visio vs Vision, Contact vs Contract)
+MAX_NAME_TOKENS = 6      # Longest word sequence counted when measuring how often a form is used
+# Bump when the grouping or naming rules change, so saved vocabularies are rebuilt
+VOCABULARY_VERSION = 2
+
+SEPARATORS = re.compile(r"[\s\-_/,;:|]+")
+QUOTES = re.compile(r"[\"'`’‘“”]")
+NAME_TOKENS = re.compile(r"[\s,;:|()\[\]/]+")
+
+def normalize_skill(skill):
+    """Lowercases and strips quoting and separator differences; '.NET', 'C++', 'C#' keep their symbols"""
+    key = QUOTES.sub('', str(skill).lower().replace('&', ' and '))
+    key = SEPARATORS.sub(' ', key)
+    key = re.sub(r"\s*\(\s*", ' (', key)
+    key = re.sub(r"\s*\)", ')', key)
+    return key.strip(' .')
+
+def skill_id(key):
+    """Stable id of a canonical skill, derived from its normalized form"""
+    return "sk_" + hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]
+
+def _stem(token):
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+def _within_one_edit(a, b):
+    """One-letter typo inside a long word ('modelling'); edits at either end change meaning (Informatica)"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1 or min(len(a), len(b)) < MIN_TYPO_LENGTH:
+        return False
+    if not (a.isalpha() and b.isalpha()):
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if i == 0 or i >= len(a) - 1:
+        return False
+    # One substitution, or one insertion into the shorter token
+    return a[i + 1:] == b[i + 1:] if len(a) == len(b) else a[i:] == b[i + 1:]
+
+def are_variants(key_a, key_b):
+    """True when two normalized forms name the same skill (plural, spacing or a one-letter typo)"""
+    if key_a.replace(' ', '') == key_b.replace(' ', ''):
+        return True
+    tokens_a, tokens_b = key_a.split(), key_b.split()
+    if len(tokens_a) != len(tokens_b):
+        return False
+    edits = 0
+    for a, b in zip(tokens_a, tokens_b):
+        a, b = _stem(a), _stem(b)
+        if a == b:
+            continue
+        if not _within_one_edit(a, b):
+            return False
+        edits += 1
+    return edits <= 1
+
+def _candidate_pairs(keys):
+    """Pairs (i, j), i < j, of normalized forms whose char 3-gram cosine is above NGRAM_THRESHOLD"""
+    vectors = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 3)).fit_transform(keys)
+    for start in range(0, len(keys), CHUNK_SIZE):
+        similarity = (vectors[start:start + CHUNK_SIZE] @ vectors.T).tocoo()
+        rows = similarity.row + start
+        keep = (similarity.data > NGRAM_THRESHOLD) & (rows < similarity.col)
+        yield from zip(rows[keep], similarity.col[keep])
+
+def _name_tokens(text):
+    return [t for t in NAME_TOKENS.split(text) if t]
+
+def usage_counts(skills):
+    """How often each word sequence (case kept) occurs in the master list, inside longer entries too"""
+    counts = Counter()
+    for skill in skills:
+        tokens = _name_tokens(skill)
+        for n in range(1, MAX_NAME_TOKENS + 1):
+            for i in range(len(tokens) - n + 1):
+                counts[' '.join(tokens[i:i + n])] += 1
+    return counts
+
+def _spelling(key):
+    """Letters of a normalized form with plurals and spacing removed; forms differing here are typo variants"""
+    return ''.join(_stem(token) for token in key.split())
+
+def _preferred_name(forms, usage):
+    """
+    Canonical name of a group of surface forms. The spelling used most often wins, so a
+    one-letter variant only names the group when it is used more than the other spellings.
+    Within it: the most used form ('MySQL' over 'MYSQL'), then the fewest capitals inside
+    words ('Coffeescript' over 'CoffeScript', 'Microservices' over 'MicroServices'), then
+    capitalized words ('Security Reviews' over 'Security review').
+    """
+    def used(form):
+        return usage.get(' '.join(_name_tokens(form)), 0)
+
+    spellings = {}
+    for form in forms:
+        spellings.setdefault(_spelling(normalize_skill(form)), []).append(form)
+    best = min(spellings.values(), key=lambda group: (-sum(used(f) for f in group), -len(group)))
+
+    def rank(form):
+        words = form.split()
+        inner_capitals = sum(c.isupper() for word in words for c in word[1:])
+        lowercase_words = sum(word[:1].islower() for word in words)
+        return (-used(form), inner_capitals, lowercase_words, len(form), form)
+    return min(best, key=rank)
+
+def build_vocabulary(skills):
+    """
+    Groups surface forms into canonical skills.
+
+    Returns {"skills": [{"id", "name", "aliases"}], "aliases": {surface form: id}},
+    with skills sorted by canonical name.
+    """
+    forms_by_key = {}
+    for skill in skills:
+        skill = skill.strip()
+        if skill:
+            forms_by_key.setdefault(normalize_skill(skill), []).append(skill)
+    keys = sorted(forms_by_key)
+    usage = usage_counts(skills)
+
+    parent = list(range(len(keys)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in _candidate_pairs(keys):
+        if are_variants(keys[i], keys[j]):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    clusters = {}
+    for i, key in enumerate(keys):
+        clusters.setdefault(find(i), []).append(key)
+
+    canonical_skills, aliases = [], {}
+    for cluster_keys in clusters.values():
+        forms = sorted(form for key in cluster_keys for form in forms_by_key[key])
+        name = _preferred_name(forms, usage)
+        sid = skill_id(normalize_skill(name))
+        canonical_skills.append({"id": sid, "name": name, "aliases": forms})
+        for form in forms:
+            aliases[form] = sid
+
+    canonical_skills.sort(key=lambda s: s["name"])
+    return {"skills": canonical_skills, "aliases": aliases}
+
+def file_fingerprint(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+class SkillVocabulary:
+    """Canonical skill names plus the alias table that maps any surface form onto them"""
+
+    def __init__(self, data):
+        self.skills = data["skills"]
+        self.aliases = data["aliases"]
+        self.names_by_id = {s["id"]: s["name"] for s in self.skills}
+        self.ids_by_key = {normalize_skill(form): sid for form, sid in self.aliases.items()}
+
+    @property
+    def names(self):
+        return [s["name"] for s in self.skills]
+
+    def canonical_id(self, skill):
+        """Id of a known surface form (exact or after normalization), else None"""
+        sid = self.aliases.get(skill)
+        if sid is None:
+            sid = self.ids_by_key.get(normalize_skill(skill))
+        return sid
+
+    def canonical(self, skill):
+        """Canonical name of a skill; unknown skills are returned unchanged"""
+        sid = self.canonical_id(skill)
+        return self.names_by_id[sid] if sid else skill
+
+    def canonicalize(self, skills):
+        """Canonical names of a list of skills, deduplicated, first occurrence order kept"""
+        return list(dict.fromkeys(self.canonical(s) for s in skills))
+
+def load_vocabulary(master_file=MASTER_SKILLS_FILE, vocabulary_file=VOCABULARY_FILE):
+    """
+    Loads the canonical vocabulary, rebuilding it first when the master skills
+    file changed since it was built.
+    """
+    fingerprint = file_fingerprint(master_file)
+    if os.path.exists(vocabulary_file):
+        with open(vocabulary_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("master_fingerprint") == fingerprint and data.get("version") == VOCABULARY_VERSION:
+            return SkillVocabulary(data)
+
+    with open(master_file, 'r', encoding='utf-8') as f:
+        skills = [line.strip() for line in f if line.strip()]
+    data = build_vocabulary(skills)
+    data["master_fingerprint"] = fingerprint
+    data["version"] = VOCABULARY_VERSION
+
+    tmp_file = vocabulary_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_file, vocabulary_file)
+    return SkillVocabulary(data)
+
+def load_canonical_skills(master_file=MASTER_SKILLS_FILE, vocabulary_file=VOCABULARY_FILE):
+    """The compact skill list (one canonical name per skill) used by the mappers and recommenders"""
+    return load_vocabulary(master_file, vocabulary_file).names
+
+def main():
+    if not os.path.exists(MASTER_SKILLS_FILE):
+        print(f"!!! FATAL ERROR: Master skills file not found at '{MASTER_SKILLS_FILE}'.")
+        sys.exit(1)
+
+    if os.path.exists(VOCABULARY_FILE):
+        os.remove(VOCABULARY_FILE)
+    vocabulary = load_vocabulary()
+
+    merged = [s for s in vocabulary.skills if len(s["aliases"]) > 1]
+    print(f"{len(vocabulary.aliases)} surface forms -> {len(vocabulary.skills)} canonical skills "
+          f"({len(merged)} with aliases).")
+    for skill in merged[:15]:
+        print(f"   {skill['name']}: {skill['aliases']}")
+    print(f"Saved vocabulary to '{VOCABULARY_FILE}'")
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,86 @@
 # create_training_data.py
-import pandas as pd
+import os
+import sys
 import json
-from simple_tfidf_api import initialize_tfidf, find_skills_for_course
+from sklearn.metrics.pairwise import cosine_similarity
+import simple_tfidf_api
+from simple_tfidf_api import initialize_tfidf, find_skills_for_courses
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mapping'))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+from mapping_store import MappingStore
+from table_io import read_table
+
+# Course -> skill candidates from previous runs. Only titles that changed are remapped and
+# only skills added to the master list are scored against the titles that did not change.
+# A change in the TF-IDF state (terms or idf) remaps every title, since all scores move with it.
+# Pass --full to ignore the store and remap everything.
+MAPPING_STORE_FILE = "data/Processed/training_mapping_store.json"
+TOP_K = 10
+MIN_SIMILARITY = 0.05
 
 print(" Creating training data for recommendation model...")
 
 initialize_tfidf()
 training_data = []
 
-courses_df = pd.read_csv("data/Processed/course_data/cleaned_course_data.csv")
+courses_df = read_table("data/Processed/course_data/cleaned_course_data.csv")
 target_departments = [
     "Department of Computer Science and Engineering",
     "International Bachelor Program in Engineering",
-    "International Bachelor Program in Electrical and Communication Engineering", 
+    "International Bachelor Program in Electrical and Communication Engineering",
     "Department of Electrical Engineering",
     "Department of Information Management",
     "Department of Information Communication",
     "International Bachelor Program in Informatics"
 ]
 
+selected = []
 for _, row in courses_df.iterrows():
     program = str(row.get('Program_and_Year', ''))
     title = str(row.get('Course_Title_EN', ''))
-    
+
     if any(dept in program for dept in target_departments) and title.strip():
         clean_title = title.split('*')[0].strip()
-        
-        # Map course to skills
-        skills = find_skills_for_course(clean_title, top_k=10, min_similarity=0.05)
-        
-        if skills:
-            training_data.append({
-                'course_title': clean_title,
-                'program': program,
-                'matched_skills': [s['skill'] for s in skills],
-                'skill_scores': [s['similarity'] for s in skills]
-            })
+        selected.append((clean_title, program))
+
+store = MappingStore(MAPPING_STORE_FILE)
+if '--full' not in sys.argv:
+    store.load()
+
+titles = {title: title for title, _ in selected}
+changed, unchanged, added_skills = store.plan(titles, simple_tfidf_api.skills,
+                                             model_version=simple_tfidf_api.tfidf_fingerprint())
+print(f" {len(changed)} titles to map, {len(unchanged)} unchanged, {len(added_skills)} new skills")
+
+for title, skills in zip(changed, find_skills_for_courses(changed, top_k=TOP_K, min_similarity=MIN_SIMILARITY)):
+    store.put(title, title, [(s['skill'], s['similarity']) for s in skills])
+
+if unchanged and added_skills:
+    similarities = cosine_similarity(simple_tfidf_api.tfidf.transform(unchanged),
+                                     simple_tfidf_api.tfidf.transform(added_skills))
+    for title, row in zip(unchanged, similarities):
+        new_candidates = [(added_skills[j], row[j]) for j in row.nonzero()[0] if row[j] > MIN_SIMILARITY]
+        if new_candidates:
+            store.merge(title, new_candidates, TOP_K)
+
+store.finish(titles.keys(), simple_tfidf_api.skills)
+store.save()
+
+for clean_title, program in selected:
+    skills = store.candidates(clean_title)
+
+    if skills:
+        training_data.append({
+            'course_title': clean_title,
+            'program': program,
+            'matched_skills': [skill for skill, _ in skills],
+            'skill_scores': [score for _, score in skills]
+        })
 
 output_path = "data/Processed/training_data.json"
 with open(output_path, 'w', encoding='utf-8') as f:
     json.dump(training_data, f, ensure_ascii=False, indent=2)
 
 print(f" Created training data with {len(training_data)} courses")
-print(" Saved to: training_data.json")
\ No newline at end of file
+print(" Saved to: training_data.json")
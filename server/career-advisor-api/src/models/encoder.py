@@ -0,0 +1,319 @@
+# encoder.py
+import os
+import abc
+import json
+import time
+import shutil
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+
+ENCODER_CACHE_DIR = os.path.join(project_root, 'models', 'encoders')
+ENCODER_BACKENDS = ('sentence-transformers', 'onnx', 'torchscript')
+
+
+def _mean_pool(token_embeddings, attention_mask):
+    """Mean pooling over non-padding tokens (same as the SBERT Pooling layer)"""
+    mask = attention_mask[..., None].astype(token_embeddings.dtype)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    return summed / counts
+
+
+def _to_output(embeddings, convert_to_tensor):
+    if convert_to_tensor:
+        return torch.from_numpy(np.ascontiguousarray(embeddings, dtype=np.float32))
+    return embeddings.astype(np.float32, copy=False)
+
+
+class _TokenEmbeddings(torch.nn.Module):
+    """Wraps the HF transformer so export/tracing sees plain tensors in and out"""
+
+    def __init__(self, auto_model):
+        super().__init__()
+        self.auto_model = auto_model
+
+    def forward(self, input_ids, attention_mask):
+        return self.auto_model(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+
+class SentenceTransformerEncoder:
+    """The original PyTorch SentenceTransformer path"""
+
+    def __init__(self, model_name='all-MiniLM-L6-v2', num_threads=None):
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model = SentenceTransformer(model_name, device='cpu')
+
+    def encode(self, texts, batch_size=32, convert_to_tensor=False, show_progress_bar=False):
+        return self.model.encode(texts, batch_size=batch_size,
+                                 convert_to_tensor=convert_to_tensor,
+                                 show_progress_bar=show_progress_bar)
+
+
+class _ExportedEncoder(abc.ABC):
+    """Shared tokenization, pooling and export logic for the optimized backends"""
+
+    backend = None
+    model_file = None
+
+    def __init__(self, model_name='all-MiniLM-L6-v2', num_threads=None, quantize=True,
+                 cache_dir=ENCODER_CACHE_DIR):
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.num_threads = num_threads
+        self.quantize = quantize
+        suffix = 'int8' if quantize else 'fp32'
+        safe_name = model_name.replace('/', '_')
+        self.export_dir = os.path.join(cache_dir, f"{safe_name}-{self.backend}-{suffix}")
+
+        meta_path = os.path.join(self.export_dir, 'encoder_meta.json')
+        if not (os.path.exists(meta_path) and os.path.exists(os.path.join(self.export_dir, self.model_file))):
+            print(f"Exporting {model_name} to {self.backend} ({suffix})...")
+            self._export()
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.export_dir)
+        self._load()
+
+    def _export(self):
+        # Built in a temporary directory and moved into place, so an interrupted export is never loaded
+        build_dir = f"{self.export_dir}.tmp{os.getpid()}"
+        shutil.rmtree(build_dir, ignore_errors=True)
+        os.makedirs(build_dir)
+        try:
+            self._export_to(build_dir)
+            # Left over from an export that was interrupted before this was atomic
+            shutil.rmtree(self.export_dir, ignore_errors=True)
+            os.replace(build_dir, self.export_dir)
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+    def _export_to(self, out_dir):
+        st_model = SentenceTransformer(self.model_name, device='cpu')
+        transformer = st_model[0]
+        pooling = st_model[1]
+
+        pooling_config = pooling.get_config_dict()
+        if not (pooling_config.get('pooling_mode') == 'mean' or pooling_config.get('pooling_mode_mean_tokens')):
+            raise ValueError(f"Only mean pooling is supported, got {pooling_config}")
+
+        transformer.tokenizer.save_pretrained(out_dir)
+        module = _TokenEmbeddings(transformer.auto_model).eval()
+        dummy = transformer.tokenizer(["export sample"], padding=True, return_tensors='pt')
+        self._export_module(module, dummy['input_ids'], dummy['attention_mask'], out_dir)
+
+        normalize = any(type(m).__name__ == 'Normalize' for m in st_model)
+        with open(os.path.join(out_dir, 'encoder_meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'model_name': self.model_name,
+                'max_seq_length': st_model.max_seq_length,
+                'normalize': normalize,
+                'quantized': self.quantize
+            }, f, indent=2)
+
+    @abc.abstractmethod
+    def _export_module(self, module, input_ids, attention_mask, out_dir):
+        """Writes the token-embedding module to out_dir/model_file"""
+
+    @abc.abstractmethod
+    def _load(self):
+        """Loads the exported model from export_dir"""
+
+    @abc.abstractmethod
+    def _forward(self, input_ids, attention_mask):
+        """Token embeddings (batch x sequence x dim) as a numpy array"""
+
+    def encode(self, texts, batch_size=32, convert_to_tensor=False, show_progress_bar=False):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        # Sort by length so each batch pads to a similar size
+        order = np.argsort([-len(t) for t in texts])
+        embeddings = np.empty((len(texts), 0), dtype=np.float32)
+        chunks = []
+
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start:start + batch_size]]
+            tokens = self.tokenizer(batch, padding=True, truncation=True,
+                                    max_length=self.meta['max_seq_length'], return_tensors='np')
+            input_ids = tokens['input_ids'].astype(np.int64)
+            attention_mask = tokens['attention_mask'].astype(np.int64)
+            token_embeddings = self._forward(input_ids, attention_mask)
+            chunks.append(_mean_pool(token_embeddings, attention_mask))
+
+        if chunks:
+            embeddings = np.vstack(chunks)[np.argsort(order)]
+
+        if self.meta['normalize']:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+
+        if single:
+            embeddings = embeddings[0]
+        return _to_output(embeddings, convert_to_tensor)
+
+
+class OnnxEncoder(_ExportedEncoder):
+    """ONNX Runtime backend with optional dynamic int8 weight quantization"""
+
+    backend = 'onnx'
+    model_file = 'model.onnx'
+
+    def _export_module(self, module, input_ids, attention_mask, out_dir):
+        fp32_path = os.path.join(out_dir, 'model_fp32.onnx')
+        torch.onnx.export(
+            module, (input_ids, attention_mask), fp32_path,
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['token_embeddings'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'token_embeddings': {0: 'batch', 1: 'sequence'}
+            },
+            opset_version=17,
+            dynamo=False
+        )
+
+        model_path = os.path.join(out_dir, self.model_file)
+        if self.quantize:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(fp32_path, model_path, weight_type=QuantType.QInt8)
+            os.remove(fp32_path)
+        else:
+            os.replace(fp32_path, model_path)
+
+    def _load(self):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+        self.session = ort.InferenceSession(os.path.join(self.export_dir, self.model_file),
+                                            sess_options=options,
+                                            providers=['CPUExecutionProvider'])
+
+    def _forward(self, input_ids, attention_mask):
+        return self.session.run(None, {'input_ids': input_ids, 'attention_mask': attention_mask})[0]
+
+
+class TorchScriptEncoder(_ExportedEncoder):
+    """TorchScript backend with torch dynamic int8 quantization of the Linear layers"""
+
+    backend = 'torchscript'
+    model_file = 'model.pt'
+
+    def _export_module(self, module, input_ids, attention_mask, out_dir):
+        if self.quantize:
+            module = torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+        with torch.inference_mode():
+            traced = torch.jit.trace(module, (input_ids, attention_mask), strict=False)
+        torch.jit.save(traced, os.path.join(out_dir, self.model_file))
+
+    def _load(self):
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        self.module = torch.jit.load(os.path.join(self.export_dir, self.model_file), map_location='cpu')
+        self.module.eval()
+
+    def _forward(self, input_ids, attention_mask):
+        with torch.inference_mode():
+            output = self.module(torch.from_numpy(input_ids), torch.from_numpy(attention_mask))
+        return output.numpy()
+
+
+def load_encoder(backend='sentence-transformers', model_name='all-MiniLM-L6-v2',
+                 num_threads=None, quantize=True):
+    """Create a query/corpus encoder for the requested backend"""
+    if backend == 'sentence-transformers':
+        return SentenceTransformerEncoder(model_name, num_threads=num_threads)
+    if backend == 'onnx':
+        return OnnxEncoder(model_name, num_threads=num_threads, quantize=quantize)
+    if backend == 'torchscript':
+        return TorchScriptEncoder(model_name, num_threads=num_threads, quantize=quantize)
+    raise ValueError(f"Unknown encoder backend '{backend}'. Choose one of {ENCODER_BACKENDS}")
+
+
+def check_parity(encoder, reference, texts, min_cosine=0.98):
+    """Compare an optimized encoder against the reference SentenceTransformer embeddings"""
+    expected = reference.encode(texts, convert_to_tensor=False)
+    actual = encoder.encode(texts, convert_to_tensor=False)
+
+    expected = expected / np.linalg.norm(expected, axis=1, keepdims=True)
+    actual = actual / np.linalg.norm(actual, axis=1, keepdims=True)
+    cosines = (expected * actual).sum(axis=1)
+
+    # Ranking parity: the nearest neighbour of each text should not change
+    same_neighbour = np.mean(
+        np.argmax(expected @ expected.T - 2 * np.eye(len(texts)), axis=1) ==
+        np.argmax(actual @ actual.T - 2 * np.eye(len(texts)), axis=1)
+    ) if len(texts) > 1 else 1.0
+
+    return {
+        'min_cosine': float(cosines.min()),
+        'mean_cosine': float(cosines.mean()),
+        'nearest_neighbour_agreement': float(same_neighbour),
+        'passed': bool(cosines.min() >= min_cosine)
+    }
+
+
+def benchmark(encoder, queries, corpus, batch_size=32, repeats=3):
+    """Single-query latency (the /api/analyze-career path) and batch throughput"""
+    encoder.encode(queries[0])
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        encoder.encode(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        encoder.encode(corpus, batch_size=batch_size)
+        best = min(best, time.perf_counter() - start)
+
+    return {
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p95_ms': float(np.percentile(latencies, 95)),
+        'throughput_per_sec': len(corpus) / best
+    }
+
+
+if __name__ == "__main__":
+    DATA_FILE = os.path.join(project_root, "data", "Processed", "course_data", "targeted_courses_final.json")
+    NUM_THREADS = int(os.getenv("ENCODER_THREADS", "0")) or None
+
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        courses = json.load(f)
+
+    corpus = [f"{c['code']} {c['name']} {c.get('department', '')} {c['description']}" for c in courses]
+    queries = [
+        "I want to analyze big data and use machine learning",
+        "I want to build websites and backend api",
+        "I am looking for courses that involve circuit design and embedded systems",
+        "I enjoy management, marketing and working with people"
+    ] * 10
+
+    reference = load_encoder('sentence-transformers', num_threads=NUM_THREADS)
+    print(f"Benchmarking on {len(corpus)} courses, {len(queries)} queries, threads={NUM_THREADS}")
+
+    for backend in ENCODER_BACKENDS:
+        encoder = reference if backend == 'sentence-transformers' else load_encoder(backend, num_threads=NUM_THREADS)
+        stats = benchmark(encoder, queries, corpus)
+        line = (f"[{backend}] p50 {stats['latency_p50_ms']:.2f} ms | "
+                f"p95 {stats['latency_p95_ms']:.2f} ms | {stats['throughput_per_sec']:.1f} texts/s")
+        if encoder is not reference:
+            parity = check_parity(encoder, reference, corpus)
+            line += (f" | min cos {parity['min_cosine']:.4f} | "
+                     f"NN agreement {parity['nearest_neighbour_agreement']:.2%} | "
+                     f"{'PASS' if parity['passed'] else 'FAIL'}")
+        print(line)
@@ -1,13 +1,20 @@
 import json
 import os
+import sys
 import torch
 import re
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import util
+
+# encoder.py sits next to this file; importing the engine as a package module must find it too
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from encoder import load_encoder
 
 class YZUAdvisorEngine:
-    def __init__(self, data_path, model_name='all-MiniLM-L6-v2'):
+    def __init__(self, data_path, model_name='all-MiniLM-L6-v2', backend='sentence-transformers', num_threads=None):
         self.data_path = data_path
         self.model_name = model_name
+        self.backend = backend
+        self.num_threads = num_threads
         self.database = []
         self.model = None
         self.embeddings = None
@@ -23,8 +30,8 @@ class YZUAdvisorEngine:
             self.database = json.load(f)
 
         print(f"Loaded {len(self.database)} courses")
-        print(f"Loading AI model: {self.model_name}")
-        self.model = SentenceTransformer(self.model_name, device='cpu')
+        print(f"Loading AI model: {self.model_name} ({self.backend})")
+        self.model = load_encoder(self.backend, self.model_name, num_threads=self.num_threads)
 
         print("Creating vector embeddings...")
         search_corpus = []
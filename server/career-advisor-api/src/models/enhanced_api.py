@@ -1,10 +1,15 @@
 # enhanced_api.py
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from simple_model import SkillPredictor
 import json
+import os
+
+# SKILL_MODEL_BACKEND=eager|torchscript|compile, SKILL_MODEL_THREADS=<n>
+SKILL_MODEL_BACKEND = os.getenv("SKILL_MODEL_BACKEND", "eager")
+SKILL_MODEL_THREADS = int(os.getenv("SKILL_MODEL_THREADS", "0")) or None
 
 app = FastAPI()
-predictor = SkillPredictor()
+predictor = SkillPredictor(backend=SKILL_MODEL_BACKEND, num_threads=SKILL_MODEL_THREADS)
 
 # Load model khi khởi động
 @app.on_event("startup")
@@ -14,21 +19,30 @@ async def startup_event():
         predictor.model = None
 
 @app.post("/predict-skills/")
-async def predict_skills(course_title: str):
-    """Predict skills using DL model with fallback"""
+async def predict_skills(course_title: str | None = None, course_titles: list[str] | None = None):
+    """Predict skills using DL model with fallback; pass one course_title or a list of course_titles"""
+    if course_titles is None and course_title is None:
+        raise HTTPException(status_code=422, detail="Provide course_title or a list of course_titles")
+    titles = course_titles if course_titles is not None else [course_title]
+
     if predictor.model is not None:
-        # Use DL model
-        skills = predictor.predict(course_title)
+        # Use DL model, all titles in one batch
+        predictions = predictor.predict_batch(titles)
         method = "dl_model"
     else:
         # Fallback to rule-based
         from prototype_api import simple_skill_mapper
-        result = simple_skill_mapper(course_title)
-        skills = result['matched_skills']
+        predictions = [simple_skill_mapper(title)['matched_skills'] for title in titles]
         method = "rule_based"
-    
+
+    if course_titles is None:
+        return {
+            "course_title": course_title,
+            "predicted_skills": predictions[0],
+            "method_used": method
+        }
     return {
-        "course_title": course_title,
-        "predicted_skills": skills,
+        "results": [{"course_title": title, "predicted_skills": skills}
+                    for title, skills in zip(titles, predictions)],
         "method_used": method
-    }
\ No newline at end of file
+    }
@@ -1,11 +1,16 @@
 # ultra_simple_tfidf.py
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+import scipy.sparse as sp
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+from table_io import read_table
+from incremental_tfidf import load_incremental_tfidf
+from skill_index import load_or_build_skill_index
 
 print(" Loading data...")
-courses_df = pd.read_csv("data/Processed/course_data/cleaned_course_data.csv")
+courses_df = read_table("data/Processed/course_data/cleaned_course_data.csv")
 target_departments = [
     "Department of Computer Science and Engineering",
     "International Bachelor Program in Engineering",
@@ -37,13 +42,17 @@ print(" Training TF-IDF...")
 # Combine all text
 all_text = courses + skills
 
-# Create TF-IDF
-tfidf = TfidfVectorizer(max_features=1000, stop_words='english')
-all_vectors = tfidf.fit_transform(all_text).toarray()  
+# Create TF-IDF (updated from the previous run instead of refitted)
+tfidf = load_incremental_tfidf("data/Processed/tfidf_state_focused.joblib", max_features=1000, stop_words='english')
+if any(tfidf.sync(all_text)):
+    tfidf.save("data/Processed/tfidf_state_focused.joblib")
+all_vectors = tfidf.transform(all_text).toarray()  
 
 # Split vectors
 course_vectors = all_vectors[:len(courses)]
 skill_vectors = all_vectors[len(courses):]
+# Top-k search over the skill vectors (SKILL_INDEX_MODE=approximate: pruned postings)
+skill_index = load_or_build_skill_index("data/Processed/skill_index_focused.npz", sp.csr_matrix(skill_vectors))
 
 print(" Training completed")
 
@@ -55,36 +64,21 @@ test_courses = [
     "Materials Science"
 ]
 
-for course in test_courses:
-    # Transform course
-    course_vec = tfidf.transform([course]).toarray()
-    
-    # Calculate similarities
-    similarities = cosine_similarity(course_vec, skill_vectors)[0]
-    
-    # Get top 3
-    top_indices = np.argsort(similarities)[-3:][::-1]
-    
+# Get top 3 of each course
+for course, hit in zip(test_courses, skill_index.search(tfidf.transform(test_courses), 3)):
     print(f"\n {course}:")
-    for idx in top_indices:
-        if similarities[idx] > 0.1:
-            print(f"   - {skills[idx]} ({similarities[idx]:.3f})")
+    for match in hit:
+        if match['score'] > 0.1:
+            print(f"   - {skills[match['corpus_id']]} ({match['score']:.3f})")
 
 print(f"\nMapping all {len(courses)} courses...")
 
 results = []
-for i, course in enumerate(courses):
-    if i % 100 == 0:
-        print(f"   {i}/{len(courses)}")
-    
-    course_vec = tfidf.transform([course]).toarray()
-    similarities = cosine_similarity(course_vec, skill_vectors)[0]
-    top_indices = np.argsort(similarities)[-5:][::-1]
-    
+for course, hit in zip(courses, skill_index.search(course_vectors, 5)):
     matched_skills = []
-    for idx in top_indices:
-        if similarities[idx] > 0.1:
-            matched_skills.append(skills[idx])
+    for match in hit:
+        if match['score'] > 0.1:
+            matched_skills.append(skills[match['corpus_id']])
     
     results.append({
         'course': course,
@@ -13,6 +13,7 @@ from dotenv import load_dotenv
 
 current_dir = Path(__file__).resolve().parent
 sys.path.append(str(current_dir))
+sys.path.append(str(current_dir.parent / 'utils'))
 env_path = current_dir / '.env'
 load_dotenv(dotenv_path=env_path)
 
@@ -29,12 +30,17 @@ DATA_FILE = os.path.join(project_root, "data", "Processed", "course_data", "targ
 if not os.path.exists(DATA_FILE):
     print(f"Data file not found: {DATA_FILE}")
 
+from llm_cache import get_cache
+
 try:
     from engine import YZUAdvisorEngine
 except ImportError:
     from sourcecode.models.engine import YZUAdvisorEngine
 
-advisor = YZUAdvisorEngine(DATA_FILE)
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "sentence-transformers")
+ENCODER_THREADS = int(os.getenv("ENCODER_THREADS", "0")) or None
+
+advisor = YZUAdvisorEngine(DATA_FILE, backend=ENCODER_BACKEND, num_threads=ENCODER_THREADS)
 app = FastAPI(title="YZU Career Advisor API")
 
 app.add_middleware(
@@ -85,22 +91,32 @@ def generate_search_query_with_fallback(prompt_text):
         
     ]
     
+    generation_config = {
+        "temperature": 0.7,
+        "max_output_tokens": 300,
+    }
+    cache = get_cache()
+    
     for model_name in models_to_try:
         try:
+            # The same answers always produce the same prompt, so repeat requests skip the API
+            cached = cache.get(model_name, prompt_text, generation_config)
+            if cached is not None:
+                print(f"Cached query from model: {model_name}")
+                return cached
+
             print(f"Trying model: {model_name}")
             model = genai.GenerativeModel(model_name)
             
             response = model.generate_content(
                 prompt_text,
-                generation_config={
-                    "temperature": 0.7,
-                    "max_output_tokens": 300,
-                }
+                generation_config=generation_config
             )
             
             if response.text:
                 clean_text = response.text.strip().replace('"', '').replace("'", "")
                 print(f"Success with model: {model_name}")
+                cache.put(model_name, prompt_text, generation_config, clean_text)
                 return clean_text
             
         except Exception as e:
@@ -1,12 +1,17 @@
 # simple_model.py
+import os
+import sys
+import time
+import copy
+import hashlib
 import torch
 import torch.nn as nn
+from torch.utils.data import DataLoader
 import numpy as np
 import json
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import MultiLabelBinarizer
 import joblib
-from scipy import sparse  
 
 class SimpleCourseSkillModel(nn.Module):
     def __init__(self, input_dim, output_dim, hidden_dim=64):
@@ -21,14 +26,64 @@ class SimpleCourseSkillModel(nn.Module):
         )
     
     def forward(self, x):
+        if x.is_sparse:
+            # Sparse TF-IDF batches: only the non-zero features touch the first layer's weights
+            first = self.network[0]
+            return self.network[1:](torch.sparse.mm(x, first.weight.t()) + first.bias)
         return self.network(x)
 
+PREDICTOR_BACKENDS = ('eager', 'torchscript', 'compile')
+
+# Training defaults: vocabulary size, mini-batches, held-out split and early stopping
+MAX_FEATURES = 20000
+BATCH_SIZE = 64
+MAX_EPOCHS = 100
+VALIDATION_FRACTION = 0.1
+PATIENCE = 5
+CHECKPOINT_PATH = "models/simple_model_checkpoint.pt"
+
+def _sparse_tensor(matrix):
+    """scipy sparse matrix -> torch sparse COO float tensor"""
+    coo = matrix.tocoo()
+    indices = torch.from_numpy(np.vstack([coo.row, coo.col]).astype(np.int64))
+    # Rows of a CSR slice are already sorted and unique, so the checks and coalescing are skipped
+    return torch.sparse_coo_tensor(indices, torch.from_numpy(coo.data.astype(np.float32)), coo.shape,
+                                   check_invariants=False, is_coalesced=True)
+
+def _training_fingerprint(vectorizer, mlb, X, y, batch_size, validation_fraction):
+    """Hash of the feature columns, label columns and training rows a checkpoint belongs to"""
+    digest = hashlib.sha256()
+    vocabulary = sorted((term, int(column)) for term, column in vectorizer.vocabulary_.items())
+    digest.update(json.dumps(vocabulary, ensure_ascii=False).encode('utf-8'))
+    digest.update(json.dumps([str(c) for c in mlb.classes_], ensure_ascii=False).encode('utf-8'))
+    for matrix in (X, y):
+        for array in (matrix.indptr, matrix.indices, matrix.data):
+            digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(f"{batch_size}|{validation_fraction}".encode('utf-8'))
+    return digest.hexdigest()
+
+class _SparseBatches:
+    """DataLoader collate_fn: row indices -> (sparse features, dense labels) of those rows"""
+
+    def __init__(self, X, y):
+        self.X = X
+        self.y = y
+
+    def __call__(self, rows):
+        return _sparse_tensor(self.X[rows]), torch.from_numpy(self.y[rows].toarray().astype(np.float32))
+
 class SkillPredictor:
-    def __init__(self):
+    def __init__(self, backend='eager', num_threads=None):
+        if backend not in PREDICTOR_BACKENDS:
+            raise ValueError(f"Unknown predictor backend '{backend}'. Choose one of {PREDICTOR_BACKENDS}")
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.backend = backend
         self.vectorizer = None
         self.mlb = None
         self.model = None
         self.skill_list = []
+        self._inference_model = None
     
     def prepare_data(self, mapped_data):
         """Prepare data from mapped courses"""
@@ -43,84 +98,157 @@ class SkillPredictor:
         
         return courses, skills
     
-    def train(self, mapped_data):
-        """Train simple model on mapped data"""
+    def train(self, mapped_data, max_features=MAX_FEATURES, batch_size=BATCH_SIZE, max_epochs=MAX_EPOCHS,
+              validation_fraction=VALIDATION_FRACTION, patience=PATIENCE, num_workers=0, checkpoint_path=None):
+        """
+        Train the model on mapped data with sparse mini-batches. A held-out split
+        stops training after `patience` epochs without improvement and the best
+        weights are kept. With checkpoint_path, progress is saved after every epoch
+        and an interrupted run on the same data resumes from it; the checkpoint is
+        removed once training finishes.
+        """
         courses, skills = self.prepare_data(mapped_data)
         
         if len(courses) < 10:
             print(" Not enough data for training")
             return False
         
-        # Create TF-IDF features
-        self.vectorizer = TfidfVectorizer(max_features=100, stop_words='english')
-        X = self.vectorizer.fit_transform(courses)
+        # Create TF-IDF features (kept sparse; batches are sparse tensors)
+        self.vectorizer = TfidfVectorizer(max_features=max_features, stop_words='english')
+        X = self.vectorizer.fit_transform(courses).tocsr()
         
-        # Convert sparse matrix to dense array explicitly
-        if sparse.issparse(X):
-            X = X.toarray()  
-        else:
-            X = np.array(X)
-        
-        # Multi-label binarizer for skills
-        self.mlb = MultiLabelBinarizer()
-        y = self.mlb.fit_transform(skills)
+        # Multi-label binarizer for skills, sparse as well
+        self.mlb = MultiLabelBinarizer(sparse_output=True)
+        y = self.mlb.fit_transform(skills).tocsr()
         self.skill_list = self.mlb.classes_
         
         # Create simple neural network
         self.model = SimpleCourseSkillModel(X.shape[1], y.shape[1])
         
-        # Simple training (on CPU)
-        X_tensor = torch.FloatTensor(X)
-        y_tensor = torch.FloatTensor(y)
+        # Held-out split for early stopping (too few courses: train on everything)
+        order = np.random.default_rng(42).permutation(len(courses))
+        n_validation = int(len(courses) * validation_fraction) if len(courses) >= 20 else 0
+        validation_rows, train_rows = order[:n_validation], order[n_validation:]
+        collate = _SparseBatches(X, y)
+        loader = DataLoader(train_rows.tolist(), batch_size=batch_size, shuffle=True, collate_fn=collate,
+                            num_workers=num_workers, persistent_workers=num_workers > 0)
+        validation_batches = [collate(validation_rows[i:i + 1024]) for i in range(0, n_validation, 1024)]
         
         criterion = nn.BCEWithLogitsLoss()
         optimizer = torch.optim.Adam(self.model.parameters(), lr=0.001)
+        state = {"epoch": 0, "best_loss": float('inf'), "best_weights": None, "bad_epochs": 0}
+        
+        fingerprint = None
+        if checkpoint_path:
+            os.makedirs(os.path.dirname(checkpoint_path) or '.', exist_ok=True)
+            # Same vocabulary, skill labels and rows; otherwise the saved weights' columns do not line up
+            fingerprint = _training_fingerprint(self.vectorizer, self.mlb, X, y, batch_size, validation_fraction)
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            checkpoint = torch.load(checkpoint_path)
+            if checkpoint.get("fingerprint") != fingerprint:
+                print(" Checkpoint is from other training data, starting over")
+            else:
+                self.model.load_state_dict(checkpoint["model"])
+                optimizer.load_state_dict(checkpoint["optimizer"])
+                state = checkpoint["state"]
+                print(f" Resuming from checkpoint at epoch {state['epoch']}")
         
-        self.model.train()
-        for epoch in range(100):  # Quick training
-            optimizer.zero_grad()
-            outputs = self.model(X_tensor)
-            loss = criterion(outputs, y_tensor)
-            loss.backward()
-            optimizer.step()
+        while state["epoch"] < max_epochs and state["bad_epochs"] < patience:
+            self.model.train()
+            total, count = 0.0, 0
+            for features, labels in loader:
+                optimizer.zero_grad()
+                loss = criterion(self.model(features), labels)
+                loss.backward()
+                optimizer.step()
+                total += loss.item() * len(labels)
+                count += len(labels)
+            train_loss = total / count
+            
+            if validation_batches:
+                self.model.eval()
+                with torch.inference_mode():
+                    validation_loss = sum(criterion(self.model(f), l).item() * len(l)
+                                          for f, l in validation_batches) / n_validation
+            else:
+                validation_loss = train_loss
+            
+            if validation_loss < state["best_loss"] - 1e-4:
+                state.update(best_loss=validation_loss, bad_epochs=0,
+                             best_weights=copy.deepcopy(self.model.state_dict()))
+            else:
+                state["bad_epochs"] += 1
             
-            if epoch % 20 == 0:
-                print(f"Epoch {epoch}, Loss: {loss.item():.4f}")
+            if state["epoch"] % 10 == 0:
+                print(f"Epoch {state['epoch']}, Loss: {train_loss:.4f}, Validation loss: {validation_loss:.4f}")
+            state["epoch"] += 1
+            
+            if checkpoint_path:
+                tmp_file = checkpoint_path + '.tmp'
+                torch.save({"fingerprint": fingerprint, "model": self.model.state_dict(),
+                            "optimizer": optimizer.state_dict(), "state": state}, tmp_file)
+                os.replace(tmp_file, checkpoint_path)
         
-        print(" Model training completed")
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            # Finished: a later run starts a new training instead of resuming this one
+            os.remove(checkpoint_path)
+        if state["best_weights"] is not None:
+            self.model.load_state_dict(state["best_weights"])
+        self.model.eval()
+        self._inference_model = None
+        print(f" Model training completed after {state['epoch']} epochs "
+              f"(best validation loss {state['best_loss']:.4f})")
         return True
     
-    def predict(self, course_title, top_k=5):
-        """Predict skills for a course title"""
+    def inference_model(self):
+        """
+        The model in eval mode, traced to TorchScript or passed through torch.compile
+        when that backend is selected. Built once and reused until the model changes.
+        """
+        if self._inference_model is None:
+            self.model.eval()
+            module = self.model
+            example = torch.zeros(1, len(self.vectorizer.get_feature_names_out()))
+            try:
+                if self.backend == 'torchscript':
+                    with torch.inference_mode():
+                        module = torch.jit.freeze(torch.jit.trace(self.model, example))
+                elif self.backend == 'compile':
+                    module = torch.compile(self.model, dynamic=True)
+                    with torch.inference_mode():
+                        module(example)
+            except Exception as e:
+                print(f" Could not build {self.backend} model ({e}), using eager mode")
+                module = self.model
+            self._inference_model = module
+        return self._inference_model
+
+    def predict_batch(self, course_titles, top_k=5, threshold=0.3, batch_size=256):
+        """Predict skills for many course titles at once; one list of skills per title"""
         if self.vectorizer is None or self.model is None:
-            return []
-        
-        # Extract features
-        X = self.vectorizer.transform([course_title])
-        
-        # Convert sparse matrix to dense array
-        if sparse.issparse(X):
-            X = X.toarray()  # Và ở đây
-        else:
-            X = np.array(X)
-            
-        X_tensor = torch.FloatTensor(X)
-        
-        # Predict
-        self.model.eval()
-        with torch.no_grad():
-            outputs = self.model(X_tensor)
-            probabilities = torch.sigmoid(outputs).numpy()[0]
+            return [[] for _ in course_titles]
         
-        # Get top k skills
-        top_indices = np.argsort(probabilities)[-top_k:][::-1]
-        predicted_skills = []
+        model = self.inference_model()
+        X = self.vectorizer.transform(course_titles)
+        k = min(top_k, len(self.skill_list))
+        results = []
         
-        for idx in top_indices:
-            if probabilities[idx] > 0.3:  # Threshold
-                predicted_skills.append(self.skill_list[idx])
+        with torch.inference_mode():
+            for start in range(0, X.shape[0], batch_size):
+                # Only one batch of the sparse features is densified at a time
+                batch = torch.from_numpy(X[start:start + batch_size].toarray().astype(np.float32))
+                probabilities = torch.sigmoid(model(batch))
+                # topk instead of sorting every skill's probability
+                values, indices = torch.topk(probabilities, k, dim=1)
+                for row_values, row_indices in zip(values.tolist(), indices.tolist()):
+                    results.append([self.skill_list[idx] for p, idx in zip(row_values, row_indices)
+                                    if p > threshold])
         
-        return predicted_skills
+        return results
+    
+    def predict(self, course_title, top_k=5):
+        """Predict skills for a course title"""
+        return self.predict_batch([course_title], top_k)[0]
     
     def save_model(self, path="models/simple_model"):
         """Save model and preprocessors"""
@@ -148,6 +276,7 @@ class SkillPredictor:
             )
             self.model.load_state_dict(torch.load(f"{path}_weights.pth"))
             self.skill_list = self.mlb.classes_
+            self._inference_model = None
             
             print(" Model loaded successfully")
             return True
@@ -155,6 +284,26 @@ class SkillPredictor:
             print(f" Error loading model: {e}")
             return False
 
+def benchmark(predictor, course_titles, repeat=20):
+    """Titles per second of predict() in a loop vs predict_batch() on every backend"""
+    titles = list(course_titles) * repeat
+    start = time.perf_counter()
+    reference = [predictor.predict(t) for t in titles]
+    loop_time = time.perf_counter() - start
+    print(f"Benchmarking {len(titles)} titles, {torch.get_num_threads()} threads")
+    print(f"   predict() loop       {len(titles) / loop_time:,.0f} titles/s")
+    
+    for backend in PREDICTOR_BACKENDS:
+        predictor.backend = backend
+        predictor._inference_model = None
+        predictor.predict_batch(titles[:1])
+        start = time.perf_counter()
+        results = predictor.predict_batch(titles)
+        batch_time = time.perf_counter() - start
+        same = sum(r == e for r, e in zip(results, reference))
+        print(f"   predict_batch {backend:11s} {len(titles) / batch_time:,.0f} titles/s "
+              f"({loop_time / batch_time:.1f}x), {same}/{len(titles)} identical")
+
 # Quick test
 if __name__ == "__main__":
     # Load your mapped data
@@ -180,8 +329,9 @@ if __name__ == "__main__":
         ]
         print(" Using sample data for testing")
     
+    workers = int(sys.argv[sys.argv.index('--workers') + 1]) if '--workers' in sys.argv else 0
     predictor = SkillPredictor()
-    if predictor.train(data):
+    if predictor.train(data, num_workers=workers, checkpoint_path=CHECKPOINT_PATH):
         # Test prediction
         test_courses = [
             "Introduction to Python Programming",
@@ -195,5 +345,8 @@ if __name__ == "__main__":
             print(f"Predicted skills: {skills}")
             print("-" * 50)
         
+        if '--benchmark' in sys.argv:
+            benchmark(predictor, [d.get('cleaned_course_title', '') for d in data])
+        
         # Save model
         predictor.save_model()
\ No newline at end of file
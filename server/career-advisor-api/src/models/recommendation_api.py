@@ -4,6 +4,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from recommendation_model import CourseRecommender
 import uvicorn
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mapping'))
+from occupation_matrix import OccupationCourseMatrix, MATRIX_FILE
 
 app = FastAPI(title="Course Recommendation API", version="1.0")
 
@@ -27,6 +31,12 @@ else:
     print("Model not found. Please train the model first.")
     exit(1)
 
+# Occupation x course matrix built by src/mapping/occupation_matrix.py (optional)
+occupation_matrix = None
+if os.path.exists(MATRIX_FILE):
+    occupation_matrix = OccupationCourseMatrix(MATRIX_FILE)
+    print(f"Occupation matrix loaded ({len(occupation_matrix.occupation_codes)} occupations)")
+
 @app.get("/")
 async def root():
     return {
@@ -34,7 +44,8 @@ async def root():
         "status": "active",
         "model_info": {
             "courses": len(recommender.courses),
-            "skills": len(recommender.skills)
+            "skills": len(recommender.skills),
+            "occupations": len(occupation_matrix.occupation_codes) if occupation_matrix else 0
         }
     }
 
@@ -51,6 +62,20 @@ async def recommend_by_course(course_title: str, top_k: int = 5):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/recommend/occupation/{occupation_title:path}")
+async def recommend_by_occupation(occupation_title: str, top_k: int = 5):
+    """Recommend courses for a career goal (O*NET occupation title or code)"""
+    if occupation_matrix is None:
+        raise HTTPException(status_code=503, detail="Occupation matrix not built. Run src/mapping/occupation_matrix.py first.")
+    recommendations = occupation_matrix.recommend(occupation_title, top_k)
+    if recommendations is None:
+        raise HTTPException(status_code=404, detail=f"Unknown occupation: {occupation_title}")
+    return {
+        "input_occupation": occupation_title,
+        "recommendations": recommendations,
+        "total_recommendations": len(recommendations)
+    }
+
 @app.post("/recommend/skills")
 async def recommend_by_skills(skills: list[str], top_k: int = 5):
     """Recommend courses based on skills"""
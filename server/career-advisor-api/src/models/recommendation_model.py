@@ -3,10 +3,20 @@ import pandas as pd
 import numpy as np
 import json
 import os
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.decomposition import TruncatedSVD
 import joblib
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mapping'))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+from skill_vocabulary import load_vocabulary
+from incremental_tfidf import load_incremental_tfidf
+from hashing_tfidf import HashedTfidf, TFIDF_MODE
+
+TFIDF_STATE_FILE = 'data/Processed/tfidf_state_recommender.joblib'
+# Hashed title features when TFIDF_MODE=hashing; small enough to stay dense next to the skills
+RECOMMENDER_HASH_FEATURES = 2 ** 12
 
 class CourseRecommender:
     def __init__(self):
@@ -15,6 +25,21 @@ class CourseRecommender:
         self.course_skills_matrix = None
         self.tfidf = None
         self.svd = None
+        self.vocabulary = None
+        self.skill_to_index = {}
+    
+    def canonical_skills(self, skills_list):
+        """Maps skill surface forms onto the canonical vocabulary (unknown skills pass through)"""
+        if self.vocabulary is None:
+            self.vocabulary = load_vocabulary()
+        return self.vocabulary.canonicalize(skills_list)
+    
+    def index_skills(self):
+        """Column of each skill by canonical name; built once per train/load, not per request"""
+        # Models saved before the canonical vocabulary hold surface forms, so index them by canonical name
+        self.skill_to_index = {}
+        for idx, skill in enumerate(self.canonical_skills(self.skills)):
+            self.skill_to_index.setdefault(skill, idx)
         
     def load_training_data(self, training_file='data/Processed/training_data.json'):
         print("Loading training data...")
@@ -23,6 +48,8 @@ class CourseRecommender:
             training_data = json.load(f)
         
         self.courses = [item['course_title'] for item in training_data]
+        for item in training_data:
+            item['matched_skills'] = self.canonical_skills(item['matched_skills'])
         
         # Extract all unique skills
         all_skills = set()
@@ -51,10 +78,17 @@ class CourseRecommender:
     def train(self, training_file='data/Processed/training_data.json'):
         training_data = self.load_training_data(training_file)
         self.build_course_skills_matrix(training_data)
-        
-        # Use TF-IDF on course titles for content-based features
-        self.tfidf = TfidfVectorizer(max_features=500, stop_words='english')
-        course_tfidf = self.tfidf.fit_transform(self.courses)
+        self.index_skills()
+        
+        if TFIDF_MODE == 'hashing':
+            # Stateless hashed title features; the pickled model then holds only their IDF
+            self.tfidf = HashedTfidf(n_features=RECOMMENDER_HASH_FEATURES, stop_words='english').fit(self.courses)
+        else:
+            # Use TF-IDF on course titles for content-based features (updated, not refitted, between runs)
+            self.tfidf = load_incremental_tfidf(TFIDF_STATE_FILE, max_features=500, stop_words='english')
+            if any(self.tfidf.sync(self.courses)):
+                self.tfidf.save(TFIDF_STATE_FILE)
+        course_tfidf = self.tfidf.transform(self.courses)
         
         # Combine content-based and collaborative features
         combined_features = np.hstack([course_tfidf.toarray(), self.course_skills_matrix])
@@ -102,14 +136,13 @@ class CourseRecommender:
         
         # Create skill vector from input
         input_skills = np.zeros(len(self.skills))
-        skill_to_index = {skill: idx for idx, skill in enumerate(self.skills)}
-        
-        for skill in skills_list:
-            if skill in skill_to_index:
-                input_skills[skill_to_index[skill]] = 1
+        for skill in self.canonical_skills(skills_list):
+            if skill in self.skill_to_index:
+                input_skills[self.skill_to_index[skill]] = 1
         
         # Create input features (no course title)
-        input_tfidf = np.zeros((1, len(self.tfidf.get_feature_names_out())))
+        # Width of the title features (a fitted vocabulary or the hashed columns)
+        input_tfidf = np.zeros((1, self.svd.components_.shape[1] - len(self.skills)))
         input_features = np.hstack([input_tfidf, input_skills.reshape(1, -1)])
         
         # Transform to latent space
@@ -151,6 +184,7 @@ class CourseRecommender:
         self.courses = model_data['courses']
         self.skills = model_data['skills']
         self.course_embeddings = model_data['embeddings']
+        self.index_skills()
         print("Model loaded")
 
 # Train model
@@ -1,11 +1,20 @@
 # simple_tfidf_api.py
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+import scipy.sparse as sp
 import uvicorn
+import os
+import sys
+import hashlib
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mapping'))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+from skill_vocabulary import load_canonical_skills
+from table_io import read_table
+from incremental_tfidf import load_incremental_tfidf
+from hashing_tfidf import HashedTfidf, TFIDF_MODE, TFIDF_JOBS
+from skill_index import load_or_build_skill_index
 
 app = FastAPI(title="Course Skills API", version="1.0")
 
@@ -18,20 +27,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# TF-IDF state kept between runs, so only added or removed courses/skills are tokenized
+TFIDF_STATE_FILE = "data/Processed/tfidf_state_courses_skills.joblib"
+# Top-k search over the skill vectors (SKILL_INDEX_MODE=approximate: pruned postings, see src/utils/skill_index.py)
+SKILL_INDEX_FILE = "data/Processed/skill_index_courses_skills.npz"
+
 # Global variables for TF-IDF data
 courses = []
 skills = []
 tfidf = None
 course_vectors = None
 skill_vectors = None
+skill_index = None
 
 def initialize_tfidf():
-    global courses, skills, tfidf, course_vectors, skill_vectors
+    global courses, skills, tfidf, course_vectors, skill_vectors, skill_index
     
     print("Initializing TF-IDF model...")
     
     # Load courses
-    courses_df = pd.read_csv("data/Processed/course_data/cleaned_course_data.csv")
+    courses_df = read_table("data/Processed/course_data/cleaned_course_data.csv")
     target_departments = [
         "Department of Computer Science and Engineering",
         "International Bachelor Program in Engineering",
@@ -52,44 +67,63 @@ def initialize_tfidf():
 
     print(f"Loaded {len(courses)} courses")
 
-    # Load skills
-    with open("data/Processed/generated_master_skills.txt", 'r', encoding='utf-8') as f:
-        skills = [line.strip() for line in f if line.strip()][:5000]
+    # Load skills (canonical names, so ".NET" and ".Net" are one column)
+    skills = load_canonical_skills("data/Processed/generated_master_skills.txt",
+                                   "data/Processed/skill_vocabulary.json")[:5000]
 
     print(f"Loaded {len(skills)} skills")
 
-    # Train TF-IDF
     all_text = courses + skills
-    tfidf = TfidfVectorizer(max_features=1000, stop_words='english')
-    all_vectors = tfidf.fit_transform(all_text).toarray()
+    if TFIDF_MODE == 'hashing':
+        # Stateless hashed features: only the IDF is fitted, vectors stay sparse
+        tfidf = HashedTfidf(stop_words='english').fit(all_text, n_jobs=TFIDF_JOBS)
+        all_vectors = tfidf.transform(all_text, n_jobs=TFIDF_JOBS)
+    else:
+        # Train TF-IDF (incrementally: same result as refitting TfidfVectorizer on all_text)
+        tfidf = load_incremental_tfidf(TFIDF_STATE_FILE, max_features=1000, stop_words='english')
+        added, removed = tfidf.sync(all_text)
+        if added or removed:
+            tfidf.save(TFIDF_STATE_FILE)
+        print(f"TF-IDF corpus: {added} documents added, {removed} removed")
+        all_vectors = tfidf.transform(all_text).toarray()
     
     course_vectors = all_vectors[:len(courses)]
     skill_vectors = all_vectors[len(courses):]
+    # Rows are L2-normalized, so the dot products the index ranks by are cosine similarities
+    skill_index = load_or_build_skill_index(SKILL_INDEX_FILE, sp.csr_matrix(skill_vectors))
     
     print("TF-IDF model ready!")
 
-def find_skills_for_course(course_title, top_k=5, min_similarity=0.1):
+def tfidf_fingerprint():
+    """Version of the fitted TF-IDF state (terms, idf) and skill index; scores from another one are stale"""
+    digest = hashlib.sha256()
+    if TFIDF_MODE == 'hashing':
+        digest.update(repr(sorted(tfidf.params.items())).encode('utf-8'))
+        digest.update(tfidf.idf_columns.tobytes())
+        digest.update(tfidf.idf_values.tobytes())
+    else:
+        digest.update('\n'.join(tfidf.get_feature_names_out()).encode('utf-8'))
+        digest.update(np.asarray(tfidf.idf_, dtype=np.float64).tobytes())
+    digest.update(repr(sorted(skill_index.params.items())).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def find_skills_for_courses(course_titles, top_k=5, min_similarity=0.1):
+    """Matched skills of each title; all titles are searched in one batch"""
     if tfidf is None:
-        return []
+        return [[] for _ in course_titles]
     
-    # Transform course to TF-IDF
-    course_vec = tfidf.transform([course_title]).toarray()
+    # Transform courses to TF-IDF
+    course_vecs = tfidf.transform(list(course_titles))
     
-    # Calculate similarities
-    similarities = cosine_similarity(course_vec, skill_vectors)[0]
+    # Top matches by cosine similarity
+    hits = skill_index.search(course_vecs, top_k)
     
-    # Get top matches
-    top_indices = np.argsort(similarities)[-top_k:][::-1]
-    
-    results = []
-    for idx in top_indices:
-        if similarities[idx] > min_similarity:
-            results.append({
-                'skill': skills[idx],
-                'similarity': float(similarities[idx])
-            })
-    
-    return results
+    return [[{'skill': skills[match['corpus_id']], 'similarity': match['score']}
+             for match in hit if match['score'] > min_similarity]
+            for hit in hits]
+
+def find_skills_for_course(course_title, top_k=5, min_similarity=0.1):
+    return find_skills_for_courses([course_title], top_k, min_similarity)[0]
 
 # Initialize when starting
 initialize_tfidf()
@@ -149,8 +183,7 @@ async def get_skills(limit: int = 10):
 @app.post("/map-batch")
 async def map_batch(course_titles: list[str], top_k: int = 5, min_similarity: float = 0.1):
     results = []
-    for title in course_titles:
-        skills = find_skills_for_course(title, top_k, min_similarity)
+    for title, skills in zip(course_titles, find_skills_for_courses(course_titles, top_k, min_similarity)):
         results.append({
             "course_title": title,
             "matched_skills": skills
@@ -0,0 +1,304 @@
+import os
+import sys
+import csv
+import json
+import time
+import glob
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# --- CONFIGURATION ---
+# Runs the data pipeline scripts as one DAG, from the project root:
+#   python src/run_pipeline.py                  run every stage whose inputs changed
+#   python src/run_pipeline.py --dry-run        only show what would run
+#   python src/run_pipeline.py --force cleaner  rerun a stage (and whatever depends on its outputs)
+#   python src/run_pipeline.py --workers 2      stages running at the same time
+# A stage is skipped when its outputs exist and the fingerprints of its inputs match the last
+# successful run. Stages that do not depend on each other run concurrently. A stage with
+# "requires_any" is skipped (not failed) when none of those files exist, e.g. the O*NET tables.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+STATE_FILE = os.path.join(project_root, 'data', 'Processed', 'pipeline_state.json')
+LOG_DIR = os.path.join(project_root, 'data', 'Processed', 'pipeline_logs')
+DEFAULT_WORKERS = 2
+
+RAW_HTML = 'data/Raw/raw_html'
+COURSE_DATA = 'data/Processed/course_data'
+MASTER_SKILLS = 'data/Processed/generated_master_skills.txt'
+ONET_RAW = 'data/Raw/Data regarding occupation and position etc'
+# occupation_matrix.py needs at least one of the O*NET rating tables (anywhere under ONET_RAW)
+ONET_RATING_FILES = [f"{ONET_RAW}/**/{name}" for name in
+                     ("Skills.txt", "Knowledge.txt", "Abilities.txt", "Work Activities.txt", "Task Ratings.txt")]
+
+# Paths are relative to the project root, where every script is run from.
+# Edges come from the paths: a stage depends on the stages that write its inputs.
+STAGES = [
+    {"name": "scrape",
+     "command": ["src/data_pipeline/yzucurriculumscrapping.py"],
+     "inputs": [],
+     "outputs": [RAW_HTML]},
+    {"name": "html_to_csv",
+     "command": ["src/data_pipeline/html_to_csv.py", "--parallel"],
+     "inputs": [RAW_HTML],
+     "outputs": [f"{COURSE_DATA}/all_course_listings.csv"]},
+    {"name": "cleaner",
+     "command": ["src/data_pipeline/cleaner.py"],
+     "inputs": [f"{COURSE_DATA}/all_course_listings.csv"],
+     "outputs": [f"{COURSE_DATA}/cleaned_course_data.parquet", f"{COURSE_DATA}/cleaned_course_data.csv"]},
+    {"name": "finalcleaner",
+     "command": ["src/data_pipeline/finalcleaner.py"],
+     "inputs": [f"{COURSE_DATA}/cleaned_course_data.parquet"],
+     "outputs": [f"{COURSE_DATA}/final_cleaned_courses.parquet", f"{COURSE_DATA}/course_mapping_summary.parquet",
+                 f"{COURSE_DATA}/final_cleaned_courses.csv", f"{COURSE_DATA}/course_mapping_summary.csv"]},
+    {"name": "descriptions",
+     "command": ["src/data_pipeline/apicreatedescription_pro.py"],
+     "inputs": [f"{COURSE_DATA}/targeted_data.csv"],
+     "outputs": [f"{COURSE_DATA}/targeted_courses_final.json"]},
+    {"name": "run_mapping",
+     "command": ["src/mapping/run_mapping.py", "--incremental"],
+     "inputs": [f"{COURSE_DATA}/courses_with_descriptions.json", MASTER_SKILLS],
+     "outputs": [f"{COURSE_DATA}/final_mapped_data.json"]},
+    {"name": "occupation_matrix",
+     "command": ["src/mapping/occupation_matrix.py"],
+     "inputs": [ONET_RAW, f"{COURSE_DATA}/final_mapped_data.json", MASTER_SKILLS],
+     "outputs": ["data/Processed/occupation_course_matrix.npz"],
+     "requires_any": ONET_RATING_FILES},
+    {"name": "training_data",
+     "command": ["src/models/create_training_data.py"],
+     "inputs": [f"{COURSE_DATA}/cleaned_course_data.parquet", MASTER_SKILLS],
+     "outputs": ["data/Processed/training_data.json"]},
+    {"name": "train",
+     "command": ["src/models/recommendation_model.py"],
+     "inputs": ["data/Processed/training_data.json"],
+     "outputs": ["models/recommendation_model.pkl"]},
+]
+
+def _abs(path):
+    return os.path.join(project_root, path)
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _tree_files(directory):
+    """Sorted paths of the files under directory, relative to it (subfolders included)"""
+    files = []
+    for root, _, names in os.walk(directory):
+        files.extend(os.path.relpath(os.path.join(root, n), directory) for n in names)
+    return sorted(files)
+
+class Fingerprints:
+    """
+    sha1 of files and directories, reusing the stored hash of a file whose
+    mtime and size did not change (same check as html_to_csv.py).
+    """
+
+    def __init__(self, known):
+        self.known = known
+
+    def file(self, path):
+        stat = os.stat(path)
+        entry = self.known.get(path)
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            return entry["sha1"]
+        digest = _file_sha1(path)
+        self.known[path] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha1": digest}
+        return digest
+
+    def of(self, path):
+        """Fingerprint of a project path, or None when it does not exist"""
+        full = _abs(path)
+        if os.path.isdir(full):
+            h = hashlib.sha1()
+            for name in _tree_files(full):
+                h.update(f"{name}:{self.file(os.path.join(full, name))}\n".encode('utf-8'))
+            return h.hexdigest()
+        if os.path.isfile(full):
+            return self.file(full)
+        return None
+
+def load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {"files": {}, "stages": {}}
+
+def save_state(state):
+    tmp_file = STATE_FILE + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_file, STATE_FILE)
+
+def _latest_mtime(path):
+    full = _abs(path)
+    if os.path.isdir(full):
+        return max((os.path.getmtime(os.path.join(full, n)) for n in _tree_files(full)), default=0.0)
+    return os.path.getmtime(full)
+
+def stage_dependencies(stages):
+    """{stage name: names of the stages that write one of its inputs}"""
+    producers = {output: stage["name"] for stage in stages for output in stage["outputs"]}
+    return {stage["name"]: sorted({producers[i] for i in stage["inputs"] if i in producers} - {stage["name"]})
+            for stage in stages}
+
+def is_available(stage):
+    """False when the stage lists "requires_any" patterns and none of them matches a file"""
+    patterns = stage.get("requires_any")
+    if not patterns:
+        return True
+    return any(os.path.isfile(path) for pattern in patterns for path in glob.glob(_abs(pattern), recursive=True))
+
+def is_up_to_date(stage, record, fingerprints):
+    """
+    True when every output exists and the inputs and command match the last
+    successful run. Without a recorded run, outputs newer than all inputs count
+    as up to date (like make), so an existing checkout does not rerun everything.
+    """
+    if any(fingerprints.of(output) is None for output in stage["outputs"]):
+        return False
+    if record is not None:
+        return (record["command"] == stage["command"] and
+                record["inputs"] == {i: fingerprints.of(i) for i in stage["inputs"]})
+    if not stage["inputs"]:
+        return True
+    if any(fingerprints.of(i) is None for i in stage["inputs"]):
+        return True
+    newest_input = max(_latest_mtime(i) for i in stage["inputs"])
+    return all(_latest_mtime(o) >= newest_input for o in stage["outputs"])
+
+def count_rows(path):
+    """Rows of a Parquet/CSV/JSON/JSONL output or files in a directory; None for other artifacts"""
+    full = _abs(path)
+    if os.path.isdir(full):
+        return len(os.listdir(full))
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(full).metadata.num_rows
+    if path.endswith('.csv'):
+        # The Parquet copy written next to it knows its row count, when it is current
+        pq_path = os.path.splitext(full)[0] + '.parquet'
+        if os.path.exists(pq_path) and os.path.getmtime(pq_path) >= os.path.getmtime(full):
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(pq_path).metadata.num_rows
+        # Records, not lines: quoted fields may span lines; blank lines are skipped like read_csv does
+        with open(full, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            return max(0, sum(1 for row in csv.reader(f) if row) - 1)
+    if path.endswith('.jsonl'):
+        with open(full, 'rb') as f:
+            return sum(1 for _ in f)
+    if path.endswith('.json'):
+        with open(full, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return len(data) if isinstance(data, (list, dict)) else None
+    return None
+
+def run_stage(stage):
+    """Runs one stage script from the project root, its output going to LOG_DIR/<name>.log"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, f"{stage['name']}.log")
+    start = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        result = subprocess.run([sys.executable] + stage["command"], cwd=project_root,
+                                stdout=log, stderr=subprocess.STDOUT)
+    return result.returncode, time.perf_counter() - start, log_path
+
+def run_pipeline(stages=STAGES, workers=DEFAULT_WORKERS, force=(), dry_run=False):
+    state = load_state()
+    fingerprints = Fingerprints(state["files"])
+    dependencies = stage_dependencies(stages)
+    by_name = {stage["name"]: stage for stage in stages}
+    unknown = set(force) - set(by_name) - {"all"}
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}")
+
+    status = {}      # name -> 'ran' | 'skipped' | 'failed' | 'blocked' | 'would run' | 'no input'
+    timings = {}
+    rerun = set()    # stages that ran (or would), so their dependents rerun too
+    pending = [stage["name"] for stage in stages]
+    running = {}
+
+    def ready(name):
+        return all(dep in status for dep in dependencies[name])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            for name in [n for n in pending if ready(n)]:
+                pending.remove(name)
+                stage = by_name[name]
+                deps = dependencies[name]
+                if any(status[d] in ('failed', 'blocked') for d in deps):
+                    status[name] = 'blocked'
+                    continue
+                if not is_available(stage):
+                    status[name] = 'no input'
+                    print(f"-- Skipping {name}: none of its required files exist")
+                    continue
+                forced = name in force or 'all' in force or any(d in rerun for d in deps)
+                if not forced and is_up_to_date(stage, state["stages"].get(name), fingerprints):
+                    status[name] = 'skipped'
+                    continue
+                rerun.add(name)
+                if dry_run:
+                    status[name] = 'would run'
+                    continue
+                print(f"-> Running {name}: {' '.join(stage['command'])}")
+                # Inputs are fingerprinted before the run, so a change made meanwhile triggers the next one
+                inputs = {i: fingerprints.of(i) for i in stage["inputs"]}
+                running[executor.submit(run_stage, stage)] = (name, inputs)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, inputs = running.pop(future)
+                stage = by_name[name]
+                returncode, seconds, log_path = future.result()
+                timings[name] = seconds
+                missing = [o for o in stage["outputs"] if fingerprints.of(o) is None]
+                if returncode != 0 or missing:
+                    status[name] = 'failed'
+                    print(f"!!! {name} failed (exit code {returncode}{', missing ' + ', '.join(missing) if missing else ''}). "
+                          f"See {log_path}")
+                    continue
+                status[name] = 'ran'
+                state["stages"][name] = {
+                    "command": stage["command"],
+                    "inputs": inputs,
+                    "outputs": {o: fingerprints.of(o) for o in stage["outputs"]},
+                    "seconds": round(seconds, 3),
+                    "finished": time.time(),
+                }
+                print(f"   {name} finished in {seconds:.1f}s")
+                save_state(state)
+
+    save_state(state)
+    print_report(stages, status, timings)
+    return status
+
+def print_report(stages, status, timings):
+    print("\n--- Pipeline Summary ---")
+    print(f"{'Stage':18s} {'Status':10s} {'Seconds':>8s}  Rows")
+    for stage in stages:
+        name = stage["name"]
+        seconds = f"{timings[name]:.1f}" if name in timings else "-"
+        rows = []
+        for output in stage["outputs"]:
+            try:
+                count = count_rows(output)
+            except (OSError, ValueError):
+                count = None
+            if count is not None:
+                rows.append(f"{os.path.basename(output)}={count}")
+        print(f"{name:18s} {status.get(name, '-'):10s} {seconds:>8s}  {', '.join(rows)}")
+
+if __name__ == "__main__":
+    force = []
+    if '--force' in sys.argv:
+        force = sys.argv[sys.argv.index('--force') + 1].split(',')
+    workers = int(sys.argv[sys.argv.index('--workers') + 1]) if '--workers' in sys.argv else DEFAULT_WORKERS
+    statuses = run_pipeline(workers=workers, force=force, dry_run='--dry-run' in sys.argv)
+    sys.exit(1 if any(s in ('failed', 'blocked') for s in statuses.values()) else 0)
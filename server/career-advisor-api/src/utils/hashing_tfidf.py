@@ -0,0 +1,170 @@
+# hashing_tfidf.py
+import os
+import sys
+import json
+import time
+import pickle
+import tempfile
+import numpy as np
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+# Stateless TF-IDF features: terms are hashed into n_features columns, so there is no
+# vocabulary to fit, pickle or share, and any process can vectorize any text. The only
+# fitted state is the IDF of the hashed columns seen in the corpus (stored sparse, as
+# column indices + values). Columns never seen in the corpus get weight 0, like the terms
+# a fitted TfidfVectorizer does not know.
+#   TFIDF_MODE=hashing   use it in simple_tfidf_api.py and CourseRecommender (default: fitted)
+#   TFIDF_JOBS=<n>       processes used to hash large text lists
+#   python src/utils/hashing_tfidf.py    memory / load time / quality vs TfidfVectorizer(max_features=1000)
+TFIDF_MODE = os.getenv("TFIDF_MODE", "fitted")
+TFIDF_JOBS = int(os.getenv("TFIDF_JOBS", "1"))
+HASH_FEATURES = 2 ** 18
+PARALLEL_MIN_TEXTS = 5000    # Smaller lists are hashed in-process
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MAPPED_DATA_FILE = os.path.join(project_root, "data", "Processed", "course_data", "final_mapped_data.json")
+
+def _hash_counts(hasher, texts):
+    return hasher.transform(texts)
+
+class HashedTfidf:
+    """TF-IDF on hashed term counts; fit() only computes the IDF of the corpus"""
+
+    def __init__(self, n_features=HASH_FEATURES, sublinear_tf=False, **analyzer_params):
+        self.params = dict(analyzer_params, n_features=n_features, sublinear_tf=sublinear_tf)
+        self.sublinear_tf = sublinear_tf
+        self.hasher = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None, **analyzer_params)
+        self.idf_columns = np.zeros(0, dtype=np.int32)
+        self.idf_values = np.zeros(0, dtype=np.float32)
+        self.n_documents = 0
+
+    @property
+    def n_features(self):
+        return self.params["n_features"]
+
+    def counts(self, texts, n_jobs=1):
+        """Hashed term counts (CSR), in n_jobs processes for long lists; no shared state is needed"""
+        texts = list(texts)
+        if n_jobs <= 1 or len(texts) < PARALLEL_MIN_TEXTS:
+            return self.hasher.transform(texts)
+        size = -(-len(texts) // n_jobs)
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            parts = list(executor.map(_hash_counts, [self.hasher] * len(chunks), chunks))
+        return sp.vstack(parts).tocsr()
+
+    def fit(self, corpus, n_jobs=1):
+        X = self.counts(corpus, n_jobs)
+        df = np.bincount(X.indices, minlength=self.n_features)
+        self.idf_columns = np.flatnonzero(df).astype(np.int32)
+        self.n_documents = X.shape[0]
+        # Smoothed idf, as TfidfVectorizer computes it
+        self.idf_values = (np.log((1 + self.n_documents) / (1 + df[self.idf_columns])) + 1).astype(np.float32)
+        return self
+
+    def transform(self, texts, n_jobs=1):
+        """L2-normalized TF-IDF rows (CSR) of texts"""
+        X = self.counts(texts, n_jobs).astype(np.float64)
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1
+        if len(self.idf_columns) == 0:
+            return sp.csr_matrix(X.shape)
+        # Columns are looked up in the sparse IDF; unseen ones drop out
+        positions = np.minimum(np.searchsorted(self.idf_columns, X.indices), len(self.idf_columns) - 1)
+        known = self.idf_columns[positions] == X.indices
+        X.data *= np.where(known, self.idf_values[positions], 0)
+        X.eliminate_zeros()
+        return normalize(X)
+
+    def fit_transform(self, corpus, n_jobs=1):
+        return self.fit(corpus, n_jobs).transform(corpus, n_jobs)
+
+    def save(self, path):
+        tmp_file = path + '.tmp.npz'
+        np.savez(tmp_file, idf_columns=self.idf_columns, idf_values=self.idf_values,
+                 n_documents=np.asarray(self.n_documents), params=np.asarray(json.dumps(self.params)))
+        os.replace(tmp_file, path)
+
+def load_hashed_tfidf(path):
+    with np.load(path, allow_pickle=False) as data:
+        model = HashedTfidf(**json.loads(str(data["params"])))
+        model.idf_columns = data["idf_columns"]
+        model.idf_values = data["idf_values"]
+        model.n_documents = int(data["n_documents"])
+    return model
+
+def _top_k(similarity, k):
+    similarity = similarity.toarray() if sp.issparse(similarity) else similarity
+    return np.argsort(-similarity, axis=1, kind='stable')[:, :k]
+
+def benchmark(top_k=10, n_jobs=2):
+    """
+    Hashed vs fitted TfidfVectorizer(max_features=1000) on the simple_tfidf_api setup
+    (course titles + 5000 skills): artifact and vector memory, load time, and recall of
+    the LLM-mapped skills of each course in its top_k TF-IDF skills.
+    """
+    sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mapping'))
+    from skill_vocabulary import load_vocabulary
+
+    vocabulary = load_vocabulary()
+    skills = vocabulary.names[:5000]
+    with open(MAPPED_DATA_FILE, 'r', encoding='utf-8') as f:
+        mapped = json.load(f)
+    courses = [c["name"] for c in mapped]
+    skill_index = {s: i for i, s in enumerate(skills)}
+    truth = [{skill_index[s] for s in vocabulary.canonicalize([m["skill"] for m in c["mapped_skills"]]) if s in skill_index}
+             for c in mapped]
+    all_text = courses + skills
+    print(f"Benchmarking on {len(courses)} courses x {len(skills)} skills, top {top_k}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {}
+        for name in ("fitted", "hashing"):
+            start = time.perf_counter()
+            if name == "fitted":
+                model = TfidfVectorizer(max_features=1000, stop_words='english')
+                vectors = model.fit_transform(all_text).toarray()   # as simple_tfidf_api keeps them
+                artifact = os.path.join(tmp_dir, "tfidf.pkl")
+                with open(artifact, 'wb') as f:
+                    pickle.dump(model, f)
+            else:
+                model = HashedTfidf(stop_words='english')
+                vectors = model.fit_transform(all_text, n_jobs=n_jobs)
+                artifact = os.path.join(tmp_dir, "tfidf.npz")
+                model.save(artifact)
+            fit_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(20):
+                if name == "fitted":
+                    with open(artifact, 'rb') as f:
+                        pickle.load(f)
+                else:
+                    load_hashed_tfidf(artifact)
+            load_time = (time.perf_counter() - start) / 20
+
+            course_vectors, skill_vectors = vectors[:len(courses)], vectors[len(courses):]
+            vector_bytes = (skill_vectors.nbytes if name == "fitted" else
+                            skill_vectors.data.nbytes + skill_vectors.indices.nbytes + skill_vectors.indptr.nbytes)
+            top = _top_k(course_vectors @ skill_vectors.T, top_k)
+            hits = [len(truth[i] & set(top[i].tolist())) / len(truth[i]) for i in range(len(courses)) if truth[i]]
+            results[name] = top
+            print(f"   {name:8s} artifact {os.path.getsize(artifact) / 1e3:7.1f} KB, skill vectors {vector_bytes / 1e6:6.2f} MB, "
+                  f"load {load_time * 1000:6.2f} ms, fit+vectorize {fit_time * 1000:6.0f} ms, "
+                  f"recall@{top_k} {np.mean(hits):.3f}")
+
+        overlap = np.mean([len(set(a) & set(b)) / top_k for a, b in zip(results["fitted"].tolist(), results["hashing"].tolist())])
+        print(f"   top-{top_k} overlap between the two: {overlap:.3f}")
+
+    texts = all_text * 10
+    for jobs in (1, n_jobs):
+        start = time.perf_counter()
+        HashedTfidf(stop_words='english').fit_transform(texts, n_jobs=jobs)
+        print(f"   hashing {len(texts)} texts with {jobs} process(es): {(time.perf_counter() - start) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    benchmark()
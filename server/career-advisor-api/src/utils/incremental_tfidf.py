@@ -0,0 +1,235 @@
+# incremental_tfidf.py
+import os
+import time
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# TF-IDF model that is updated instead of refitted. It keeps the term counts of every
+# document and the document frequencies, so adding or removing documents only tokenizes
+# those documents; the IDF weights are recomputed from the counts (O(vocabulary)) and
+# vectors are rebuilt from stored counts (O(non-zeros)). The corpus is a multiset of texts,
+# like the list passed to TfidfVectorizer.fit: a text listed twice counts twice.
+# Results match TfidfVectorizer(**params).fit(corpus) (smooth_idf, l2 norm), including
+# max_features. Models are saved with joblib under data/Processed/tfidf_state_*.joblib.
+#   python src/utils/incremental_tfidf.py            consistency check + benchmark
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MASTER_SKILLS_FILE = os.path.join(project_root, "data", "Processed", "generated_master_skills.txt")
+DESCRIPTIONS_FILE = os.path.join(project_root, "data", "Processed", "course_data", "courses_with_descriptions.json")
+
+class IncrementalTfidf:
+    """
+    Drop-in for a fitted TfidfVectorizer (transform, get_feature_names_out,
+    vocabulary_, idf_) whose corpus can be changed with add/remove/sync.
+    """
+
+    def __init__(self, max_features=None, sublinear_tf=False, **analyzer_params):
+        self.params = dict(analyzer_params, max_features=max_features, sublinear_tf=sublinear_tf)
+        self.max_features = max_features
+        self.sublinear_tf = sublinear_tf
+        self.analyzer = TfidfVectorizer(**analyzer_params).build_analyzer()
+        self.term_ids = {}                         # term -> id, ids are never reused
+        self.terms = []
+        self.df = np.zeros(0, dtype=np.int64)      # documents containing each term
+        self.tf = np.zeros(0, dtype=np.int64)      # occurrences of each term in the corpus
+        self.documents = {}                        # text -> (term ids, counts)
+        self.multiplicity = {}                     # text -> times it is in the corpus
+        self.n_documents = 0
+        self._model = None                         # (features, column of each term id, idf), rebuilt on change
+
+    def __getstate__(self):
+        # The analyzer is a closure; it is rebuilt from the parameters when loading
+        state = dict(self.__dict__, analyzer=None, _model=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        analyzer_params = {k: v for k, v in self.params.items() if k not in ('max_features', 'sublinear_tf')}
+        self.analyzer = TfidfVectorizer(**analyzer_params).build_analyzer()
+
+    def _count(self, text, add_terms):
+        """(term ids, counts) of a text; unknown terms are registered when add_terms, else dropped"""
+        counts = {}
+        for term in self.analyzer(text):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                if not add_terms:
+                    continue
+                term_id = self.term_ids[term] = len(self.terms)
+                self.terms.append(term)
+            counts[term_id] = counts.get(term_id, 0) + 1
+        ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        return ids, values
+
+    def _grow(self):
+        if len(self.terms) > len(self.df):
+            extra = len(self.terms) - len(self.df)
+            self.df = np.concatenate([self.df, np.zeros(extra, dtype=np.int64)])
+            self.tf = np.concatenate([self.tf, np.zeros(extra, dtype=np.int64)])
+
+    def add(self, texts):
+        """Adds documents to the corpus"""
+        for text in texts:
+            if text not in self.documents:
+                self.documents[text] = self._count(text, add_terms=True)
+                self._grow()
+            ids, counts = self.documents[text]
+            self.df[ids] += 1
+            self.tf[ids] += counts
+            self.multiplicity[text] = self.multiplicity.get(text, 0) + 1
+            self.n_documents += 1
+        self._model = None
+        return self
+
+    def remove(self, texts):
+        """Removes one occurrence of each text from the corpus (KeyError if it is not in it)"""
+        for text in texts:
+            if not self.multiplicity.get(text):
+                raise KeyError(f"Document not in corpus: {text!r}")
+            ids, counts = self.documents[text]
+            self.df[ids] -= 1
+            self.tf[ids] -= counts
+            self.multiplicity[text] -= 1
+            self.n_documents -= 1
+            if not self.multiplicity[text]:
+                del self.multiplicity[text]
+                del self.documents[text]
+        self._model = None
+        return self
+
+    def sync(self, corpus):
+        """Makes the corpus equal to the given list of texts; returns (added, removed) counts"""
+        wanted = {}
+        for text in corpus:
+            wanted[text] = wanted.get(text, 0) + 1
+        to_remove = [t for t, n in self.multiplicity.items() for _ in range(n - wanted.get(t, 0))]
+        to_add = [t for t, n in wanted.items() for _ in range(n - self.multiplicity.get(t, 0))]
+        if to_remove:
+            self.remove(to_remove)
+        if to_add:
+            self.add(to_add)
+        return len(to_add), len(to_remove)
+
+    def fit(self, corpus):
+        """Same as sync, returning the model like TfidfVectorizer.fit"""
+        self.sync(corpus)
+        return self
+
+    def _features(self):
+        """Active features in TfidfVectorizer order, their column per term id, and idf"""
+        if self._model is None:
+            active = np.flatnonzero(self.df > 0)
+            # Sorted by term, like TfidfVectorizer's vocabulary
+            active = active[np.argsort(np.asarray([self.terms[i] for i in active], dtype=object), kind='stable')]
+            if self.max_features is not None and len(active) > self.max_features:
+                # Same selection (and tie order) as TfidfVectorizer._limit_features
+                keep = np.zeros(len(active), dtype=bool)
+                keep[(-self.tf[active]).argsort()[:self.max_features]] = True
+                active = active[keep]
+            columns = np.full(len(self.terms), -1, dtype=np.int64)
+            columns[active] = np.arange(len(active))
+            idf = np.log((1 + self.n_documents) / (1 + self.df[active])) + 1
+            self._model = (active, columns, idf)
+        return self._model
+
+    @property
+    def vocabulary_(self):
+        active, _, _ = self._features()
+        return {self.terms[i]: col for col, i in enumerate(active.tolist())}
+
+    @property
+    def idf_(self):
+        return self._features()[2]
+
+    def get_feature_names_out(self):
+        active, _, _ = self._features()
+        return np.asarray([self.terms[i] for i in active], dtype=object)
+
+    def transform(self, texts):
+        """L2-normalized TF-IDF rows (CSR) of texts; corpus documents reuse their stored counts"""
+        active, columns, idf = self._features()
+        ids, counts = [], []
+        for text in texts:
+            document = self.documents.get(text)
+            document_ids, document_counts = document if document is not None else self._count(text, add_terms=False)
+            ids.append(document_ids)
+            counts.append(document_counts)
+        lengths = np.fromiter((len(i) for i in ids), dtype=np.int64, count=len(ids))
+        rows = np.repeat(np.arange(len(ids)), lengths)
+        cols = columns[np.concatenate(ids)] if ids else np.zeros(0, dtype=np.int64)
+        values = np.concatenate(counts).astype(np.float64) if counts else np.zeros(0)
+        keep = cols >= 0
+        matrix = sp.csr_matrix((values[keep], (rows[keep], cols[keep])), shape=(len(texts), len(active)))
+        matrix.sort_indices()
+        if self.sublinear_tf:
+            np.log(matrix.data, matrix.data)
+            matrix.data += 1
+        matrix = matrix @ sp.diags(idf)
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sp.diags(1 / norms) @ matrix
+
+    def fit_transform(self, corpus):
+        return self.fit(corpus).transform(corpus)
+
+    def save(self, path):
+        tmp_file = path + '.tmp'
+        joblib.dump(self, tmp_file)
+        os.replace(tmp_file, path)
+
+def load_incremental_tfidf(path, **params):
+    """Model saved at path when it was built with the same parameters, else a new empty one"""
+    model = IncrementalTfidf(**params)
+    if os.path.exists(path):
+        try:
+            saved = joblib.load(path)
+            if saved.params == model.params:
+                return saved
+        except Exception as e:
+            print(f"Could not load TF-IDF state '{path}' ({e}), starting fresh")
+    return model
+
+def check_consistency(model, corpus, texts=None):
+    """Max absolute difference between the model and a TfidfVectorizer refitted on corpus"""
+    reference = TfidfVectorizer(**model.params).fit(corpus)
+    if list(reference.get_feature_names_out()) != list(model.get_feature_names_out()):
+        raise AssertionError("Vocabulary differs from a full refit")
+    texts = corpus if texts is None else texts
+    difference = abs(reference.transform(texts) - model.transform(texts))
+    return float(difference.max()) if difference.nnz else 0.0
+
+def benchmark(texts, sizes=(1000, 4000, 16000), batch=50, **params):
+    """Cost of replacing `batch` documents incrementally vs refitting, as the corpus grows"""
+    print(f"Benchmarking updates of {batch} documents ({params})")
+    for size in sizes:
+        corpus = [texts[i % len(texts)] + ("" if i < len(texts) else f" v{i // len(texts)}") for i in range(size)]
+        model = IncrementalTfidf(**params).fit(corpus)
+        updated = corpus[batch:] + [f"{t} updated" for t in corpus[:batch]]
+
+        start = time.perf_counter()
+        model.sync(updated)
+        update = time.perf_counter() - start
+        model.transform(updated)
+        incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        TfidfVectorizer(**params).fit_transform(updated)
+        refit = time.perf_counter() - start
+
+        error = check_consistency(model, updated)
+        print(f"   {size:6d} docs: incremental {incremental * 1000:7.1f} ms (update {update * 1000:5.1f} ms), "
+              f"refit {refit * 1000:7.1f} ms "
+              f"({refit / incremental:.1f}x), max diff {error:.1e}")
+
+if __name__ == "__main__":
+    import json
+    with open(MASTER_SKILLS_FILE, 'r', encoding='utf-8') as f:
+        skills = [line.strip() for line in f if line.strip()]
+    with open(DESCRIPTIONS_FILE, 'r', encoding='utf-8') as f:
+        descriptions = [c["description"] for c in json.load(f) if c.get("description")]
+    for name, texts in (("skill names", skills), ("course descriptions", descriptions)):
+        print(f"\n--- {name} ---")
+        for params in ({"max_features": 1000, "stop_words": 'english'}, {}):
+            benchmark(texts, sizes=(1000, 5000, 20000), **params)
@@ -0,0 +1,140 @@
+# llm_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Shared cache of LLM responses, keyed by a hash of (model, prompt, generation params).
+#   LLM_CACHE_MODE=readwrite  look up first, store new answers (default)
+#   LLM_CACHE_MODE=replay     read-only; a prompt that was never recorded raises CacheMiss
+#   LLM_CACHE_MODE=off        always call the API
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CACHE_FILE = os.path.join(project_root, "data", "Processed", "llm_cache.sqlite")
+DEFAULT_MAX_MB = 200
+
+class CacheMiss(LookupError):
+    """Raised in replay mode for a prompt that has no recorded response"""
+
+def cache_key(model, prompt, params=None):
+    """prompt is a string or a list of chat messages; params holds temperature, max_tokens, etc."""
+    payload = json.dumps({"model": model, "prompt": prompt, "params": params or {}},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """
+    Content-addressed response store in SQLite.
+
+    Entries are evicted least-recently-used first once the stored responses
+    exceed max_bytes. Safe to share between threads.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, mode="readwrite", max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        if mode not in ("readwrite", "replay", "off"):
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+
+        if mode == "replay":
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Replay mode needs an existing cache at {path}")
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        elif mode == "readwrite":
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    response TEXT,
+                    size INTEGER,
+                    created REAL,
+                    last_used REAL
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON responses(last_used)")
+            self.conn.commit()
+
+        self.total_bytes = 0
+        if self.conn is not None:
+            self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @property
+    def replay(self):
+        return self.mode == "replay"
+
+    def get(self, model, prompt, params=None):
+        """Returns the cached response text, or None (CacheMiss in replay mode)"""
+        if self.conn is None:
+            return None
+        key = cache_key(model, prompt, params)
+        with self.lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.hits += 1
+                if self.mode == "readwrite":
+                    self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self.conn.commit()
+                return row[0]
+            self.misses += 1
+
+        if self.replay:
+            raise CacheMiss(f"No recorded response for model '{model}' (key {key[:12]})")
+        return None
+
+    def put(self, model, prompt, params, response):
+        """Stores a response; callers only store answers they accepted as valid"""
+        if self.mode != "readwrite" or response is None:
+            return
+        key = cache_key(model, prompt, params)
+        size = len(response.encode('utf-8'))
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (key, model, response, size, now, now))
+            self.total_bytes += size - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # Drop the least recently used entries until we are back under 90% of the limit
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            doomed.append((key,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self):
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses, "bytes": self.total_bytes}
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+_shared_cache = None
+
+def get_cache():
+    """The process-wide cache, configured from LLM_CACHE_MODE, LLM_CACHE_FILE and LLM_CACHE_MAX_MB"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = LLMCache(
+            path=os.getenv("LLM_CACHE_FILE", DEFAULT_CACHE_FILE),
+            mode=os.getenv("LLM_CACHE_MODE", "readwrite"),
+            max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", str(DEFAULT_MAX_MB))) * 1024 * 1024),
+        )
+    return _shared_cache
@@ -0,0 +1,107 @@
+# rate_limiter.py
+import time
+import asyncio
+import threading
+
+class TokenBucket:
+    """
+    Refills `rate` units every `period` seconds, holding at most `capacity`.
+
+    reserve() takes the units immediately (the bucket may go into debt) and
+    returns how long the caller has to wait, so concurrent callers queue up
+    in arrival order instead of all waking at once.
+    """
+
+    def __init__(self, rate, period=60.0, capacity=None):
+        self.rate_per_sec = rate / period
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_per_sec)
+        self.updated = now
+
+    def reserve(self, amount=1):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate_per_sec
+
+    def refund(self, amount):
+        """Gives back units that were reserved but not used (negative amount charges extra)"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits for an LLM API,
+    plus a shared pause that grows after 429 responses and shrinks on success.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute=None,
+                 initial_backoff=2.0, max_backoff=120.0, burst=None):
+        # burst=1 spaces requests evenly at the RPM instead of allowing a full minute at once
+        self.requests = TokenBucket(requests_per_minute, capacity=burst)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.backoff = initial_backoff
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _reserve(self, tokens):
+        wait = self.requests.reserve(1)
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def _pause_remaining(self):
+        return max(0.0, self.paused_until - time.monotonic())
+
+    async def acquire(self, tokens=0):
+        wait = self._reserve(tokens)
+        while True:
+            delay = max(wait, self._pause_remaining())
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+            wait = 0
+
+    def acquire_sync(self, tokens=0, stop=None):
+        """Blocks until a request may be sent; returns False early once the optional stop Event is set"""
+        wait = self._reserve(tokens)
+        while True:
+            delay = max(wait, self._pause_remaining())
+            if delay <= 0:
+                return True
+            if stop is None:
+                time.sleep(delay)
+            elif stop.wait(delay):
+                return False
+            wait = 0
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Corrects the token bucket once the real usage of a call is known"""
+        if self.tokens is not None and actual_tokens is not None:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+
+    def record_rate_limited(self, retry_after=None):
+        """Pauses every caller after a 429, for retry-after or the current backoff"""
+        with self.lock:
+            delay = max(self.backoff, float(retry_after or 0))
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.backoff = min(self.max_backoff, self.backoff * 2)
+            return delay
+
+    def record_success(self):
+        with self.lock:
+            self.backoff = max(self.initial_backoff, self.backoff / 2)
+
+def estimate_tokens(*texts):
+    """Rough token count (about 4 characters per token) used before the real usage is known"""
+    return sum(len(str(t)) for t in texts) // 4 + 1
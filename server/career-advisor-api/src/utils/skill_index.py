@@ -0,0 +1,303 @@
+# skill_index.py
+import os
+import sys
+import json
+import time
+import hashlib
+import numpy as np
+import scipy.sparse as sp
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import normalize
+
+# Top-k skill search shared by the mappers (run_mapping.py, simple_tfidf_api.py,
+# prototype_map_courses.py). An index is built once from the skill vectors and answers
+# many course queries; search() returns semantic_search-style hits
+# [[{'corpus_id', 'score'}, ...], ...], best first (ties by skill position).
+#   dense vectors (SBERT embeddings), scores are cosine similarities
+#     exact        one matrix product against every skill
+#     approximate  IVF: skills are clustered with k-means; a query is scored against the
+#                  centroids and only the skills of its n_probe nearest clusters are ranked
+#   sparse vectors (L2-normalized TF-IDF rows), scores are dot products
+#     exact        query x (term -> skill postings)
+#     approximate  each term keeps only its max_postings highest-weighted skills, so common
+#                  terms ("data", "management") no longer touch thousands of skills
+# Approximate indexes are saved as data/Processed/skill_index_*.npz and reused while the
+# skill vectors and parameters are the same; exact ones are the vectors themselves.
+#   SKILL_INDEX_MODE=exact|approximate   (default: exact)
+#   SKILL_INDEX_PROBES=<n>               clusters searched per query (default 8)
+#   python src/utils/skill_index.py      recall@k and query speed, exact vs approximate
+SKILL_INDEX_MODE = os.getenv("SKILL_INDEX_MODE", "exact")
+SKILL_INDEX_PROBES = int(os.getenv("SKILL_INDEX_PROBES", "8"))
+INDEX_MODES = ("exact", "approximate")
+MAX_POSTINGS = 256         # Skills kept per term in the pruned TF-IDF index
+KMEANS_SEED = 42
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MASTER_SKILLS_FILE = os.path.join(project_root, "data", "Processed", "generated_master_skills.txt")
+DESCRIPTIONS_FILE = os.path.join(project_root, "data", "Processed", "course_data", "courses_with_descriptions.json")
+
+def _check_mode(mode):
+    if mode not in INDEX_MODES:
+        raise ValueError(f"Unknown skill index mode '{mode}', expected one of {INDEX_MODES}")
+
+def vectors_fingerprint(vectors):
+    """Content hash of a dense array or sparse matrix of skill vectors"""
+    digest = hashlib.sha256()
+    if sp.issparse(vectors):
+        vectors = vectors.tocsr()
+        digest.update(f"sparse{vectors.shape}".encode('utf-8'))
+        for array in (vectors.indptr, vectors.indices, vectors.data):
+            digest.update(np.ascontiguousarray(array).tobytes())
+    else:
+        vectors = np.ascontiguousarray(vectors)
+        digest.update(f"dense{vectors.shape}{vectors.dtype}".encode('utf-8'))
+        digest.update(vectors.tobytes())
+    return digest.hexdigest()
+
+def _row_hits(columns, values, top_k):
+    """Hits for one query from its candidate skills (columns) and their scores"""
+    if len(values) > top_k:
+        # Scores above the k-th best, then the tied ones at the lowest skill positions
+        kth = -np.partition(-values, top_k - 1)[top_k - 1]
+        above = np.flatnonzero(values > kth)
+        tied = np.flatnonzero(values == kth)
+        tied = tied[np.argsort(columns[tied], kind='stable')][:top_k - len(above)]
+        keep = np.concatenate([above, tied])
+        columns, values = columns[keep], values[keep]
+    order = np.lexsort((columns, -values))
+    return [{'corpus_id': c, 'score': v} for c, v in zip(columns[order].tolist(), values[order].tolist())]
+
+def _prune_rows(matrix, k):
+    """CSR copy keeping the k largest entries of each row (in column order)"""
+    lengths = np.diff(matrix.indptr)
+    if not len(lengths) or lengths.max() <= k:
+        return matrix
+    rows = np.repeat(np.arange(matrix.shape[0]), lengths)
+    order = np.lexsort((matrix.indices, -matrix.data, rows))
+    rank = np.arange(len(order)) - matrix.indptr[rows[order]]
+    keep = order[rank < k]
+    pruned = sp.csr_matrix((matrix.data[keep], (rows[keep], matrix.indices[keep])), shape=matrix.shape)
+    pruned.sort_indices()
+    return pruned
+
+class DenseSkillIndex:
+    """Cosine top-k over dense skill embeddings, exact or IVF"""
+
+    kind = "dense"
+
+    def __init__(self, embeddings, mode="exact", n_lists=None, n_probe=SKILL_INDEX_PROBES):
+        _check_mode(mode)
+        self.mode = mode
+        self.n_probe = n_probe
+        self.embeddings = normalize(np.asarray(embeddings, dtype=np.float32))
+        self.centroids = np.zeros((0, self.embeddings.shape[1]), dtype=np.float32)
+        self.list_indptr = np.zeros(1, dtype=np.int64)
+        self.list_members = np.zeros(0, dtype=np.int32)
+        if mode == "approximate" and len(self.embeddings):
+            self._build_lists(n_lists or max(1, int(np.sqrt(len(self.embeddings)))))
+
+    @property
+    def params(self):
+        return {"kind": self.kind, "mode": self.mode, "n_lists": len(self.centroids)}
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def _build_lists(self, n_lists):
+        n_lists = min(n_lists, len(self.embeddings))
+        kmeans = KMeans(n_clusters=n_lists, n_init=1, random_state=KMEANS_SEED).fit(self.embeddings)
+        self.centroids = normalize(kmeans.cluster_centers_).astype(np.float32)
+        # Skills of list l are list_members[list_indptr[l]:list_indptr[l + 1]], in skill order
+        self.list_members = np.argsort(kmeans.labels_, kind='stable').astype(np.int32)
+        self.list_indptr = np.concatenate([[0], np.cumsum(np.bincount(kmeans.labels_, minlength=n_lists))])
+
+    def search(self, queries, top_k=10, n_probe=None):
+        """Top-k hits for each query embedding (rows of a 2-D array or tensor)"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        # normalize() validates its input; for a few queries that costs more than the search
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+        if self.mode == "exact" or len(self.centroids) == 0:
+            all_skills = np.arange(len(self.embeddings))
+            return [_row_hits(all_skills, row, top_k) for row in queries @ self.embeddings.T]
+
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+        if len(queries) * n_probe <= len(self.centroids):
+            # Few queries rarely share a list: each one is scored against its own candidates
+            hits = []
+            for query, lists in zip(queries, probes.tolist()):
+                members = np.concatenate([self.list_members[self.list_indptr[l]:self.list_indptr[l + 1]] for l in lists])
+                hits.append(_row_hits(members, self.embeddings[members] @ query, top_k))
+            return hits
+
+        # Each probed list is scored in one product against all the queries probing it
+        candidates = [[] for _ in range(len(queries))]
+        for list_id in np.unique(probes):
+            rows = np.flatnonzero((probes == list_id).any(axis=1))
+            members = self.list_members[self.list_indptr[list_id]:self.list_indptr[list_id + 1]]
+            for row, scores in zip(rows.tolist(), queries[rows] @ self.embeddings[members].T):
+                candidates[row].append((members, scores))
+        return [_row_hits(np.concatenate([m for m, _ in parts]), np.concatenate([v for _, v in parts]), top_k)
+                for parts in candidates]
+
+    def arrays(self):
+        return {"embeddings": self.embeddings, "centroids": self.centroids,
+                "list_indptr": self.list_indptr, "list_members": self.list_members}
+
+class SparseSkillIndex:
+    """Dot-product top-k over L2-normalized sparse (TF-IDF) skill vectors, exact or with pruned postings"""
+
+    kind = "sparse"
+
+    def __init__(self, skill_vectors, mode="exact", max_postings=MAX_POSTINGS):
+        _check_mode(mode)
+        self.mode = mode
+        self.max_postings = max_postings if mode == "approximate" else None
+        # Term x skill postings: row t holds the skills containing term t and their weights
+        postings = sp.csr_matrix(skill_vectors).T.tocsr()
+        if self.max_postings is not None:
+            postings = _prune_rows(postings, self.max_postings)
+        self.postings = postings
+
+    @property
+    def params(self):
+        return {"kind": self.kind, "mode": self.mode, "max_postings": self.max_postings}
+
+    def __len__(self):
+        return self.postings.shape[1]
+
+    def search(self, queries, top_k=10):
+        """Top-k hits for each query vector (rows of a sparse or dense matrix from the same vectorizer)"""
+        scores = (sp.csr_matrix(queries) @ self.postings).tocsr()
+        scores.sort_indices()
+        return [_row_hits(scores.indices[start:end], scores.data[start:end], top_k)
+                for start, end in zip(scores.indptr[:-1], scores.indptr[1:])]
+
+    def arrays(self):
+        return {"postings_data": self.postings.data, "postings_indices": self.postings.indices,
+                "postings_indptr": self.postings.indptr, "postings_shape": np.asarray(self.postings.shape)}
+
+def build_skill_index(skill_vectors, mode=SKILL_INDEX_MODE, **params):
+    """SparseSkillIndex for sparse matrices, DenseSkillIndex for anything else"""
+    if sp.issparse(skill_vectors):
+        return SparseSkillIndex(skill_vectors, mode, **params)
+    return DenseSkillIndex(skill_vectors, mode, **params)
+
+def save_skill_index(index, path, fingerprint=""):
+    tmp_file = path + '.tmp.npz'
+    np.savez(tmp_file, fingerprint=np.asarray(fingerprint), params=np.asarray(json.dumps(index.params)),
+             n_probe=np.asarray(getattr(index, "n_probe", 0)), **index.arrays())
+    os.replace(tmp_file, path)
+
+def load_skill_index(path):
+    """(index, fingerprint) saved at path"""
+    with np.load(path, allow_pickle=False) as data:
+        params = json.loads(str(data["params"]))
+        if params["kind"] == "dense":
+            index = DenseSkillIndex.__new__(DenseSkillIndex)
+            index.mode, index.n_probe = params["mode"], int(data["n_probe"])
+            for name in ("embeddings", "centroids", "list_indptr", "list_members"):
+                setattr(index, name, data[name])
+        else:
+            index = SparseSkillIndex.__new__(SparseSkillIndex)
+            index.mode, index.max_postings = params["mode"], params["max_postings"]
+            index.postings = sp.csr_matrix((data["postings_data"], data["postings_indices"], data["postings_indptr"]),
+                                           shape=tuple(data["postings_shape"]))
+        return index, str(data["fingerprint"])
+
+def load_or_build_skill_index(path, skill_vectors, mode=SKILL_INDEX_MODE, **params):
+    """
+    Index of skill_vectors in the given mode. Approximate indexes are read from path when
+    they were built from the same vectors, else built and saved there; exact ones are
+    always built, since they are only the (normalized) vectors.
+    """
+    _check_mode(mode)
+    if mode == "exact":
+        return build_skill_index(skill_vectors, mode, **params)
+
+    # Build parameters are part of the fingerprint; n_probe is only used when searching
+    build_params = json.dumps({k: v for k, v in params.items() if k != "n_probe"}, sort_keys=True)
+    fingerprint = hashlib.sha256(f"{vectors_fingerprint(skill_vectors)}|{mode}|{build_params}".encode('utf-8')).hexdigest()
+    if os.path.exists(path):
+        try:
+            index, saved_fingerprint = load_skill_index(path)
+            if saved_fingerprint == fingerprint:
+                print(f"Using saved skill index: {path}")
+                if "n_probe" in params:
+                    index.n_probe = params["n_probe"]
+                return index
+        except Exception as e:
+            print(f"Could not load skill index '{path}' ({e}), rebuilding")
+
+    start = time.perf_counter()
+    index = build_skill_index(skill_vectors, mode, **params)
+    save_skill_index(index, path, fingerprint)
+    print(f"Built {index.kind} skill index ({len(index)} skills) in {time.perf_counter() - start:.1f}s: {path}")
+    return index
+
+def recall_at_k(exact_hits, approximate_hits):
+    """Share of the exact top-k skills the approximate search also returns"""
+    found = [len({h['corpus_id'] for h in e} & {h['corpus_id'] for h in a}) / len(e)
+             for e, a in zip(exact_hits, approximate_hits) if e]
+    return float(np.mean(found)) if found else 1.0
+
+def _time_search(index, queries, top_k, repeat=3, **params):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        hits = index.search(queries, top_k, **params)
+    return hits, (time.perf_counter() - start) / repeat
+
+def benchmark(top_k=10, batch_size=256):
+    """
+    Exact vs approximate search of course descriptions against the whole master skills list.
+    Sparse: TF-IDF as in prototype_map_courses.py. Dense: a 256-dim LSA projection of the
+    same TF-IDF stands in for SBERT embeddings, so no encoder has to be downloaded.
+    """
+    from sklearn.decomposition import TruncatedSVD
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from incremental_tfidf import IncrementalTfidf
+
+    with open(MASTER_SKILLS_FILE, 'r', encoding='utf-8') as f:
+        skills = [line.strip() for line in f if line.strip()]
+    with open(DESCRIPTIONS_FILE, 'r', encoding='utf-8') as f:
+        courses = [f"{c['name']}. {c['description']}" for c in json.load(f) if c.get("description")]
+    print(f"Benchmarking {len(courses)} course queries against {len(skills)} skills, top {top_k}")
+
+    tfidf = IncrementalTfidf(stop_words='english').fit(skills + courses)
+    skill_vectors, course_vectors = tfidf.transform(skills), tfidf.transform(courses)
+    print(f"\n--- sparse TF-IDF ({skill_vectors.shape[1]} terms) ---")
+    exact, exact_time = _time_search(SparseSkillIndex(skill_vectors), course_vectors, top_k)
+    print(f"   exact                    {exact_time * 1000:7.1f} ms")
+    for max_postings in (64, 256, 1024):
+        index = SparseSkillIndex(skill_vectors, "approximate", max_postings=max_postings)
+        hits, search_time = _time_search(index, course_vectors, top_k)
+        print(f"   pruned to {max_postings:5d} postings {search_time * 1000:7.1f} ms ({exact_time / search_time:4.1f}x), "
+              f"{index.postings.nnz} of {skill_vectors.nnz} kept, recall@{top_k} {recall_at_k(exact, hits):.3f}")
+
+    svd = TruncatedSVD(n_components=256, random_state=KMEANS_SEED).fit(skill_vectors)
+    skill_embeddings = svd.transform(skill_vectors).astype(np.float32)
+    course_embeddings = svd.transform(course_vectors).astype(np.float32)
+    batches = [course_embeddings[i:i + batch_size] for i in range(0, len(course_embeddings), batch_size)]
+    print(f"\n--- dense ({skill_embeddings.shape[1]} dims, batches of {batch_size}) ---")
+
+    def search_all(index, **params):
+        start = time.perf_counter()
+        hits = [hit for batch in batches for hit in index.search(batch, top_k, **params)]
+        single_start = time.perf_counter()
+        for query in course_embeddings[:200]:
+            index.search(query, top_k, **params)
+        return hits, single_start - start, (time.perf_counter() - single_start) / 200
+
+    exact, exact_time, exact_single = search_all(DenseSkillIndex(skill_embeddings))
+    print(f"   exact            batched {exact_time * 1000:7.1f} ms, single query {exact_single * 1000:6.2f} ms")
+    start = time.perf_counter()
+    index = DenseSkillIndex(skill_embeddings, "approximate")
+    print(f"   IVF with {len(index.centroids)} lists built in {time.perf_counter() - start:.1f}s")
+    for n_probe in (4, 8, 16, 32):
+        hits, search_time, single = search_all(index, n_probe=n_probe)
+        print(f"   n_probe {n_probe:3d}      batched {search_time * 1000:7.1f} ms, single query {single * 1000:6.2f} ms "
+              f"({exact_single / single:4.1f}x), recall@{top_k} {recall_at_k(exact, hits):.3f}")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,78 @@
+# table_io.py
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Typed columnar copies of the course tables passed between pipeline stages.
+# Writers store <name>.parquet next to <name>.csv (categoricals and dtypes kept); readers
+# take the Parquet file when it is at least as new as the CSV and fall back to the CSV.
+#   TABLE_CSV_EXPORT=0  skip the CSV export and write Parquet only
+#   python src/utils/table_io.py --benchmark [path.csv]
+CSV_EXPORT = os.getenv("TABLE_CSV_EXPORT", "1") != "0"
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCHMARK_FILE = os.path.join(project_root, "data", "Processed", "course_data", "cleaned_course_data.csv")
+
+def parquet_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+def write_table(df, csv_path, export_csv=None, **csv_kwargs):
+    """Writes df as Parquet beside csv_path, plus the CSV itself unless the export is off"""
+    if CSV_EXPORT if export_csv is None else export_csv:
+        df.to_csv(csv_path, index=False, **csv_kwargs)
+    # Nullable 'string' columns are stored as plain text, so they read back with NaN like read_csv
+    nullable = {col: object for col, dtype in df.dtypes.items()
+                if isinstance(dtype, pd.StringDtype) and dtype.na_value is pd.NA}
+    if nullable:
+        df = df.astype(nullable)
+    # Written last, so it is never older than the CSV export
+    tmp_file = parquet_path(csv_path) + '.tmp'
+    df.to_parquet(tmp_file, engine='pyarrow', index=False)
+    os.replace(tmp_file, parquet_path(csv_path))
+
+def read_table(csv_path, columns=None):
+    """
+    Loads a table written by write_table. Missing values come back as NaN, like
+    read_csv, so str(value) checks in the consumers behave the same.
+    """
+    pq_path = parquet_path(csv_path)
+    if os.path.exists(pq_path) and (not os.path.exists(csv_path) or
+                                    os.path.getmtime(pq_path) >= os.path.getmtime(csv_path)):
+        # memory_map lets pyarrow read the column buffers straight from the page cache
+        df = pd.read_parquet(pq_path, engine='pyarrow', columns=columns, memory_map=True)
+        # Older pandas returns text columns as object with None for missing values
+        text_columns = df.columns[df.dtypes == object]
+        if len(text_columns):
+            df[text_columns] = df[text_columns].where(df[text_columns].notna(), np.nan)
+        return df
+    return pd.read_csv(csv_path, usecols=columns, low_memory=False)
+
+def benchmark(csv_path=BENCHMARK_FILE, repeat=20, runs=5):
+    """Load time of a table as CSV and as Parquet, stacked `repeat` times to stand in for more semesters"""
+    df = read_table(csv_path)
+    df = pd.concat([df] * repeat, ignore_index=True)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stacked_csv = os.path.join(tmp_dir, os.path.basename(csv_path))
+        write_table(df, stacked_csv, export_csv=True)
+        print(f"Benchmarking on {len(df)} rows ({len(df) // repeat} rows x {repeat})...")
+
+        results = {}
+        for label, load in [("read_csv", lambda: pd.read_csv(stacked_csv, low_memory=False)),
+                            ("read_table", lambda: read_table(stacked_csv))]:
+            best = float('inf')
+            for _ in range(runs):
+                start = time.perf_counter()
+                loaded = load()
+                best = min(best, time.perf_counter() - start)
+            results[label] = best
+            print(f"   {label:10s} {best * 1000:.1f} ms ({len(loaded) / best:,.0f} rows/s)")
+
+        print(f"CSV {os.path.getsize(stacked_csv) / 1e6:.2f} MB, Parquet {os.path.getsize(parquet_path(stacked_csv)) / 1e6:.2f} MB. "
+              f"Speedup: {results['read_csv'] / results['read_table']:.1f}x")
+    return results
+
+if __name__ == "__main__":
+    paths = [a for a in sys.argv[1:] if not a.startswith('--')]
+    benchmark(paths[0] if paths else BENCHMARK_FILE)